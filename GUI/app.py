@@ -8,12 +8,21 @@ if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
 # from src.real_time_gen_deploy import start_background_generator
-from src.people_counter import start_background_generator
+# Light imports only: ultralytics/torch are loaded by the counter, never on the rendering path
+from src.settings import COUNTER_MODE
+from src.availability import counter_state_label
+from src.counter_daemon import ensure_running, start_in_thread
 
 # Initialize the background task (cached resource)
 @st.cache_resource
 def init_background_task():
-    return start_background_generator()
+    if COUNTER_MODE == "thread":
+        # Counter inside this Streamlit process (one per replica), loaded in the background
+        return start_in_thread()
+    if COUNTER_MODE == "daemon":
+        # One standalone counter per host, shared by all replicas
+        return ensure_running()
+    return None
 
 init_background_task()
 
@@ -188,6 +197,11 @@ with left:
         )
     st.markdown("</div>", unsafe_allow_html=True)
 
+    # Model readiness (the counter loads in the background)
+    state_label = counter_state_label()
+    if state_label:
+        st.caption(state_label)
+
 with right:
     # Replace the hero card with the image
     # Using st.image directly
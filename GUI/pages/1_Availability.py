@@ -1,5 +1,4 @@
 import streamlit as st
-import csv
 import urllib.parse
 from datetime import datetime
 from zoneinfo import ZoneInfo
@@ -12,36 +11,21 @@ if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
 from src.lib_configs import LIBRARIES
+from src.availability import counter_state_label, get_counter_state
+from src.settings import TICK_INTERVAL
+from src.snapshot_service import get_snapshot
 
 st.set_page_config(page_title="Cornell Libraries – Availabilities", layout="wide")
 
 # ---------- DATA MODEL ----------
-# LIBRARIES is now imported from src.lib_configs
-# The structure is:
-# {
-#   "name": str,
-#   "floors": [
-#       {"floor": int, "capacity": int, "occupied": int},
-#       ...
-#   ]
-# }
-
-# Store original LIBRARIES as base template (with capacities)
-LIBRARIES_BASE = LIBRARIES.copy()
-
-
-def level_and_color(rate: float):
-    if rate < 0.4:
-        return "Low", "#22c55e", "green"
-    if rate < 0.7:
-        return "Medium", "#fbbf24", "orange"
-    return "High", "#ef4444", "red"
-
-
-def library_totals(lib: dict):
-    cap = sum(f["capacity"] for f in lib["floors"])
-    occ = sum(f["occupied"] for f in lib["floors"])
-    return cap, occ, cap - occ
+# Occupancy comes from the process-wide snapshot service (src.snapshot_service):
+# one immutable OccupancySnapshot per data version, shared by every session,
+# with per-floor rates, per-library totals, status levels and the ranked
+# recommendation already computed. Sessions only store the selected library.
+#
+# The page is live: a fragment re-runs every TICK_INTERVAL seconds and rewrites
+# only the placeholders (card captions, floor rows, timestamps) whose text
+# changed since they were last drawn, instead of re-running the whole page.
 
 
 def get_google_maps_url(address: str) -> str:
@@ -60,76 +44,70 @@ def get_google_maps_url(address: str) -> str:
     return f"https://www.google.com/maps/search/?api=1&query={encoded_address}"
 
 
-def get_latest_occupancy_from_csv(csv_path: str = "data/library_occupancy.csv") -> dict:
-    """
-    Read the latest row from the occupancy CSV file.
-    Returns a dictionary mapping column names to occupancy values, or None if file doesn't exist.
-    """
-    csv_file = Path(__file__).parent.parent.parent / csv_path
-    
-    if not csv_file.exists():
-        return None
-    
-    try:
-        with open(csv_file, 'r') as f:
-            reader = csv.DictReader(f)
-            rows = list(reader)
-            if not rows:
-                return None
-            # Return the last row (most recent)
-            return rows[-1]
-    except (KeyError, ValueError, IndexError, IOError):
-        return None
-
-
-def update_libraries_from_csv(libraries: list, csv_data: dict) -> list:
+def card_caption(lib) -> str:
+    return (
+        f"{len(lib.floors)} floors · "
+        f"{lib.occupied} seats used · "
+        f"{lib.available} available · "
+        f":{lib.status_color}[{lib.level}]"
+    )
+
+
+def last_updated_text(snapshot) -> str:
+    # Display the actual timestamp of the snapshot if available
+    if snapshot.timestamp:
+        try:
+            csv_time = datetime.fromisoformat(snapshot.timestamp)
+            return f"Last updated: {csv_time.strftime('%I:%M:%S %p')} ({csv_time.strftime('%Y-%m-%d')})"
+        except (ValueError, TypeError):
+            return f"Last updated: {datetime.now(ZoneInfo('America/New_York')).strftime('%I:%M:%S %p')}"
+    return f"Last updated: {datetime.now(ZoneInfo('America/New_York')).strftime('%I:%M:%S %p')} (using static data)"
+
+
+def counter_state_text() -> str:
+    # Counter still loading (or failed): the numbers may be from an earlier run
+    counter_state = get_counter_state()
+    if counter_state and counter_state["state"] != "ready":
+        return counter_state_label()
+    return ""
+
+
+def status_text(sel) -> str:
+    return (
+        f"**Status:** "
+        f":{sel.status_color}[{sel.level}] (about {int(sel.rate*100)}% of seats are currently occupied)."
+    )
+
+
+# Floor grid: Floor | People | Available | Status
+FLOOR_COLUMNS = [1, 1, 1, 1]
+
+
+def floor_cells(sel) -> dict:
     """
-    Update the libraries data structure with occupancy values from CSV.
-    
-    Args:
-        libraries: The LIBRARIES list with capacity data
-        csv_data: Dictionary from CSV with column names as keys and occupancy as values
-    
-    Returns:
-        Updated libraries list with occupancy values from CSV
+    Markdown cells of the total row and every floor row of a library, keyed by row.
+    Floors the counter shed show their reused earlier count muted and marked stale.
     """
-    if csv_data is None:
-        return libraries
-    
-    # Create a copy to avoid modifying the original
-    updated_libraries = []
-    
-    for lib in libraries:
-        updated_lib = {
-            "name": lib["name"],
-            "floors": []
-        }
-        # Preserve address if it exists
-        if "address" in lib:
-            updated_lib["address"] = lib["address"]
-        
-        for floor_data in lib["floors"]:
-            # Construct the column name as it appears in CSV
-            col_name = f"{lib['name']} Floor {floor_data['floor']}"
-            
-            # Get occupancy from CSV, fall back to original if not found
-            if col_name in csv_data:
-                try:
-                    occupied = int(csv_data[col_name])
-                except (ValueError, TypeError):
-                    occupied = floor_data.get("occupied", 0)
-            else:
-                occupied = floor_data.get("occupied", 0)
-            
-            updated_lib["floors"].append({
-                "floor": floor_data["floor"],
-                "capacity": floor_data["capacity"],
-                "occupied": occupied
-            })
-        
-        updated_libraries.append(updated_lib)
-    
-    return updated_libraries
+    cells = {"total": (
+        "**Total**", f"**{sel.occupied}**", f"**{sel.available}**", f":{sel.status_color}[{sel.level}]"
+    )}
+    for f in sel.floors:
+        occupied = f":gray[{f.occupied} (stale)]" if f.stale else str(f.occupied)
+        cells[f.floor] = (str(f.floor), occupied, str(f.available), f":{f.status_color}[{f.level}]")
+    return cells
+
+
+def render_caption(slot, text):
+    if text:
+        slot.caption(text)
+    else:
+        slot.empty()
+
+
+def render_row(slot, cells):
+    with slot.container():
+        for column, cell in zip(st.columns(FLOOR_COLUMNS), cells):
+            column.markdown(cell)
 
 
 # ---------- CSS ----------
@@ -164,27 +142,53 @@ st.markdown(
 # ---------- STATE ----------
 if "selected_library" not in st.session_state:
     st.session_state["selected_library"] = LIBRARIES[0]["name"]
-if "last_csv_timestamp" not in st.session_state:
-    st.session_state["last_csv_timestamp"] = None
-if "libraries_data" not in st.session_state:
-    st.session_state["libraries_data"] = None
-
-# ---------- LOAD DATA FROM CSV ----------
-# Check if we need to refresh data (on first load or when refresh button is clicked)
-if st.session_state["libraries_data"] is None:
-    # First load - read from CSV
-    csv_data = get_latest_occupancy_from_csv()
-    if csv_data:
-        # Update libraries with latest occupancy data
-        st.session_state["libraries_data"] = update_libraries_from_csv(LIBRARIES_BASE, csv_data)
-        st.session_state["last_csv_timestamp"] = csv_data.get("timestamp", None)
-    else:
-        # Fall back to static data if CSV doesn't exist
-        st.session_state["libraries_data"] = LIBRARIES_BASE
-        st.session_state["last_csv_timestamp"] = None
 
-# Use the loaded data
-LIBRARIES = st.session_state["libraries_data"]
+# ---------- LOAD LATEST SNAPSHOT ----------
+# Shared snapshot of the newest row (the configured static data if there is none yet)
+snapshot = get_snapshot()
+
+# ---------- LIVE PLACEHOLDERS ----------
+# key -> (placeholder, render function), created in the layout below
+slots = {}
+# key -> value last drawn into the placeholder
+drawn = {}
+live = {"version": None, "state": None}
+
+
+def slot(key, render):
+    slots[key] = (st.empty(), render)
+
+
+def draw(key, value):
+    """
+    Render value into its placeholder unless it is already showing it.
+    """
+    if key in slots and drawn.get(key) != value:
+        placeholder, render = slots[key]
+        render(placeholder, value)
+        drawn[key] = value
+
+
+def update(snapshot):
+    """
+    Bring every placeholder up to date with `snapshot`; unchanged ones are left alone.
+    """
+    state_text = counter_state_text()
+    if snapshot.version == live["version"] and state_text == live["state"]:
+        return
+    if not slots:
+        # Fragment run inside the full page run, before the layout below exists
+        return
+    live["version"], live["state"] = snapshot.version, state_text
+    for lib in snapshot.libraries:
+        draw(f"card:{lib.name}", card_caption(lib))
+    sel = snapshot.by_name[st.session_state["selected_library"]]
+    draw("updated", last_updated_text(snapshot))
+    draw("state", state_text)
+    for row, cells in floor_cells(sel).items():
+        draw(f"row:{row}", cells)
+    draw("status", status_text(sel))
+
 
 # ---------- TOP BAR ----------
 cols_top = st.columns([1, 2, 1])
@@ -194,57 +198,47 @@ with cols_top[0]:
 with cols_top[1]:
     st.markdown("## Availability Snapshots")
 with cols_top[2]:
-    if st.button("🔄 Refresh", use_container_width=True):
-        # Force refresh by reading CSV and updating from base LIBRARIES
-        csv_data = get_latest_occupancy_from_csv()
-        if csv_data:
-            st.session_state["libraries_data"] = update_libraries_from_csv(LIBRARIES_BASE, csv_data)
-            st.session_state["last_csv_timestamp"] = csv_data.get("timestamp", None)
-            st.rerun()
-        else:
-            st.warning("CSV file not found. Using static data.")
-            st.session_state["libraries_data"] = LIBRARIES_BASE
-            st.session_state["last_csv_timestamp"] = None
-            st.rerun()
+    st.caption(f"🔄 Live · updates every {TICK_INTERVAL:g} s")
 
 st.write("")  # spacer
 
 # ---------- LEFT / RIGHT LAYOUT ----------
 list_col, detail_col = st.columns([2, 3], gap="large")
 
+
+# --- Recommendation Tab/Section ---
+# Re-runs on its own every tick, then refreshes the placeholders that changed
+@st.fragment(run_every=TICK_INTERVAL)
+def live_section():
+    current = get_snapshot()
+    best_lib = current.best
+    best_name = best_lib.name
+    best_avail = best_lib.available
+
+    st.caption("🌟 RECOMMENDATION")
+    with st.container(border=True):
+        st.markdown(f"**{best_name}**")
+        st.markdown(f"Has the most space right now: <span style='color:#22c55e; font-weight:bold'>{best_avail}</span> seats.", unsafe_allow_html=True)
+
+        if st.button("Go to " + best_name, key="btn_rec"):
+            st.session_state["selected_library"] = best_name
+            st.rerun()
+
+    update(current)
+
+
 # ---------- LEFT: LIBRARY BUTTONS ----------
 with list_col:
     # Use a scrollable container with fixed height
     with st.container(height=650):
         
-        # --- Recommendation Tab/Section ---
-        best_lib = max(LIBRARIES, key=lambda l: library_totals(l)[2])
-        best_name = best_lib["name"]
-        _, _, best_avail = library_totals(best_lib)
-        
-        st.caption("🌟 RECOMMENDATION")
-        with st.container(border=True):
-            st.markdown(f"**{best_name}**")
-            st.markdown(f"Has the most space right now: <span style='color:#22c55e; font-weight:bold'>{best_avail}</span> seats.", unsafe_allow_html=True)
-            
-            if st.button("Go to " + best_name, key="btn_rec"):
-                st.session_state["selected_library"] = best_name
-                st.rerun()
+        live_section()
                 
         st.divider()
         st.caption("📚 ALL LIBRARIES")
         
-        for lib in LIBRARIES:
-            name = lib["name"]
-
-            # Example summary info for the card
-            total_capacity = sum(f["capacity"] for f in lib["floors"])
-            total_occupied = sum(f["occupied"] for f in lib["floors"])
-            available = total_capacity - total_occupied
-            n_floors = len(lib["floors"])
-
-            rate = total_occupied / total_capacity if total_capacity else 0
-            lvl, _, status_color = level_and_color(rate)
+        for lib in snapshot.libraries:
+            name = lib.name
             # One "card" per library
             with st.container(border=True):  # border=True if you’re on a recent Streamlit
                 clicked = st.button(
@@ -254,79 +248,37 @@ with list_col:
                 )
 
                 # Info inside the same card, under the button text
-                st.caption(
-                    f"{n_floors} floors · "
-                    f"{total_occupied} seats used · "
-                    f"{available} available · "
-                    f":{status_color}[{lvl}]"
-                )
+                slot(f"card:{name}", render_caption)
 
             if clicked:
                 st.session_state["selected_library"] = name
 
 # ---------- RIGHT: DETAILS + FLOOR GRID ----------
 with detail_col:
-    sel = next(l for l in LIBRARIES if l["name"] == st.session_state["selected_library"])
-    total_cap, total_occ, total_avail = library_totals(sel)
+    sel = snapshot.by_name[st.session_state["selected_library"]]
 
-    rate = total_occ / total_cap if total_cap else 0
-    lvl, _, status_color = level_and_color(rate)
-
-    st.markdown(f"### {sel['name']}")
-    
-    # Display the actual timestamp from CSV if available
-    if st.session_state["last_csv_timestamp"]:
-        try:
-            csv_time = datetime.fromisoformat(st.session_state["last_csv_timestamp"])
-            st.caption(f"Last updated: {csv_time.strftime('%I:%M:%S %p')} ({csv_time.strftime('%Y-%m-%d')})")
-        except (ValueError, TypeError):
-            st.caption(f"Last updated: {datetime.now(ZoneInfo('America/New_York')).strftime('%I:%M:%S %p')}")
-    else:
-        st.caption(f"Last updated: {datetime.now(ZoneInfo('America/New_York')).strftime('%I:%M:%S %p')} (using static data)")
+    st.markdown(f"### {sel.name}")
+    slot("updated", render_caption)
+    slot("state", render_caption)
 
     # ----- table-like grid for floors (now directly under the header) -----
-    rows_md = []
-
-    # total row
-    rows_md.append(
-        f"**Total** | **{total_occ}** | **{total_avail}** | "
-        f":{status_color}[{lvl}]"
-    )
-
-    # per-floor rows
-    for f in sel["floors"]:
-        floor_cap = f["capacity"]
-        floor_occ = f["occupied"]
-        floor_avail = floor_cap - floor_occ
-        floor_rate = floor_occ / floor_cap if floor_cap else 0
-        fl_lvl, _, fl_color = level_and_color(floor_rate)
-
-        rows_md.append(
-            f"{f['floor']} | {floor_occ} | {floor_avail} | "
-            f":{fl_color}[{fl_lvl}]"
-        )
-
-    table_md = (
-        "Floor | People | Available | Status\n"
-        "---|---:|---:|---\n" + "\n".join(rows_md)
-    )
-
     st.markdown("#### Floor occupancy")
-    st.markdown(table_md)
-    st.write(
-        f"**Status:** "
-        f":{status_color}[{lvl}] (about {int(rate*100)}% of seats are currently occupied)."
-    )
+    for column, title in zip(st.columns(FLOOR_COLUMNS), ("Floor", "People", "Available", "Status")):
+        column.markdown(f"**{title}**")
+    slot("row:total", render_row)
+    for f in sel.floors:
+        slot(f"row:{f.floor}", render_row)
+    slot("status", lambda placeholder, text: placeholder.write(text))
     
     # Go There button - show if address is available
-    if "address" in sel and sel["address"]:
+    if sel.address:
         st.write("")  # spacer
-        maps_url = get_google_maps_url(sel["address"])
+        maps_url = get_google_maps_url(sel.address)
         st.link_button("🗺️ Go There", maps_url, use_container_width=True)
-        st.caption(f"📍 {sel['address']}")
+        st.caption(f"📍 {sel.address}")
     
     # line comes AFTER the table now
     st.markdown("---")
-    
-    
-    
+
+# Fill every placeholder from the snapshot this run started with
+update(snapshot)
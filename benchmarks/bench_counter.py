@@ -0,0 +1,247 @@
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Throughput benchmark for the people counter at synthetic scale
+# Builds a LIBRARIES-style layout with the requested number of floors, and an
+# image tree for it by linking the frames of the real data/lib_images floors
+# round-robin, then measures for every backend and batch size:
+#   - count_people_in_images: images/s and per-cycle p50/p95 latency
+#   - the full tick (count + build_row + CSV/binlog append): p50/p95 latency
+#   - peak RSS of the process running the configuration
+# Each configuration runs in its own spawned process so peak RSS is not
+# inherited from the previous one. Results are written as JSON; with
+# --baseline the run fails (exit code 1) when a configuration got slower or
+# bigger than the baseline by more than --tolerance.
+#
+#   python benchmarks/bench_counter.py --floors 10 100 --backends torch onnx --batch-sizes 0 8
+#
+# The frame gate and result/frame caches are off: replicated frames would hit
+# them and hide the cost of inference.
+
+PROJECT_ROOT = Path(__file__).parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+FLOORS_PER_LIBRARY = 5
+FLOOR_CAPACITY = 150
+DEFAULT_CYCLES = 9
+DEFAULT_TOLERANCE = 0.10
+# Lower is better for these, higher for images_per_sec
+LATENCY_KEYS = ("count_p95_ms", "tick_p95_ms", "peak_rss_mib")
+
+
+def build_scaled_libraries(n_floors: int) -> list:
+    """
+    LIBRARIES-style configuration with n_floors floors, FLOORS_PER_LIBRARY per library.
+    """
+    libraries = []
+    for start in range(0, n_floors, FLOORS_PER_LIBRARY):
+        floors = min(FLOORS_PER_LIBRARY, n_floors - start)
+        libraries.append({
+            "name": f"Bench Library {start // FLOORS_PER_LIBRARY + 1}",
+            "floors": [{"floor": f, "capacity": FLOOR_CAPACITY, "occupied": 0} for f in range(1, floors + 1)],
+            "address": "",
+        })
+    return libraries
+
+
+def build_image_tree(root: Path, libraries: list, source=PROJECT_ROOT / "data/lib_images"):
+    """
+    Populate root/{Library}/floor{N}/frame{i}.png by linking (or copying) the
+    frames of the real floors round-robin.
+    """
+    source_floors = sorted(p for p in Path(source).glob("*/floor*") if any(p.glob("frame*.png")))
+    if not source_floors:
+        raise FileNotFoundError(f"No frames found under {source}")
+    i = 0
+    for library in libraries:
+        for floor in library["floors"]:
+            target = root / library["name"] / f"floor{floor['floor']}"
+            target.mkdir(parents=True, exist_ok=True)
+            for frame in source_floors[i % len(source_floors)].glob("frame*.png"):
+                try:
+                    os.symlink(frame.resolve(), target / frame.name)
+                except OSError:
+                    shutil.copy2(frame, target / frame.name)
+            i += 1
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def peak_rss_mib() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _run_config(config: dict, images_root: str, cycles: int, outbox):
+    """
+    Benchmark one (floors, backend, batch size) configuration; runs in a spawned process.
+    """
+    os.environ["FUTURELIBS_FRAME_SOURCE"] = "demo"
+    from src import inference_backends, occupancy_store, people_counter
+    from src.batcher import MicroBatcher
+    from src.frame_sources import FrameIndex
+    from src.lib_configs import build_registry
+
+    try:
+        registry = build_registry(build_scaled_libraries(config["floors"]))
+        frames = FrameIndex(images_root, registry)
+        backend, _, variant = config["backend"].partition(":")
+        model, _ = inference_backends.load_model(PROJECT_ROOT / "models/yolo11n.pt", backend, variant == "int8")
+        batcher = None
+        if config["batch_size"] > 0:
+            batcher = MicroBatcher(
+                lambda images: people_counter.infer_people(model, images),
+                config["batch_size"], people_counter.BATCH_MAX_WAIT_MS / 1000,
+            )
+
+        def count(frame_index):
+            return people_counter.count_people_in_images(
+                model, frame_index, batcher=batcher, registry=registry, frames=frames
+            )
+
+        count(1)  # warm-up
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_file = Path(tmp) / "occupancy.csv"
+            fieldnames = list(registry.fieldnames)
+            count_times, tick_times, images = [], [], 0
+            for cycle in range(cycles):
+                start = time.perf_counter()
+                counts = count(cycle % 9 + 1)
+                counted = time.perf_counter()
+                row = people_counter.build_row(datetime.now().replace(microsecond=0), counts, registry=registry)
+                occupancy_store.save_snapshot(csv_file, row, fieldnames, backends=["binlog"])
+                done = time.perf_counter()
+                count_times.append(counted - start)
+                tick_times.append(done - start)
+                images += len(counts)
+
+        outbox.put({
+            **config,
+            "cycles": cycles,
+            "images_per_cycle": images / cycles,
+            "images_per_sec": images / sum(count_times),
+            "count_p50_ms": 1000 * percentile(count_times, 0.50),
+            "count_p95_ms": 1000 * percentile(count_times, 0.95),
+            "tick_p50_ms": 1000 * percentile(tick_times, 0.50),
+            "tick_p95_ms": 1000 * percentile(tick_times, 0.95),
+            "peak_rss_mib": peak_rss_mib(),
+        })
+    except Exception as e:
+        outbox.put({**config, "error": str(e)})
+
+
+def run_benchmarks(floor_counts: list, backends: list, batch_sizes: list, cycles: int = DEFAULT_CYCLES) -> list:
+    """
+    Run every (floors, backend, batch size) combination and return the result rows.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for n_floors in floor_counts:
+        images_root = Path(tempfile.mkdtemp(prefix=f"bench_counter_{n_floors}_"))
+        try:
+            build_image_tree(images_root, build_scaled_libraries(n_floors))
+            for backend in backends:
+                for batch_size in batch_sizes:
+                    config = {"floors": n_floors, "backend": backend, "batch_size": batch_size}
+                    outbox = ctx.Queue()
+                    worker = ctx.Process(target=_run_config, args=(config, str(images_root), cycles, outbox))
+                    worker.start()
+                    while True:
+                        try:
+                            result = outbox.get(timeout=1)
+                            break
+                        except queue.Empty:
+                            if not worker.is_alive():
+                                result = {**config, "error": f"worker exited with code {worker.exitcode}"}
+                                break
+                    worker.join()
+                    results.append(result)
+                    print(format_result(result))
+        finally:
+            shutil.rmtree(images_root, ignore_errors=True)
+    return results
+
+
+def format_result(result: dict) -> str:
+    name = f"{result['floors']:>5} floors  {result['backend']:<14} batch {result['batch_size'] or 'tick':>4}"
+    if "error" in result:
+        return f"{name}  failed: {result['error']}"
+    return (f"{name}  {result['images_per_sec']:8.1f} img/s  count p50/p95 {result['count_p50_ms']:8.0f}/"
+            f"{result['count_p95_ms']:<8.0f} ms  tick p50/p95 {result['tick_p50_ms']:8.0f}/{result['tick_p95_ms']:<8.0f} ms"
+            f"  peak RSS {result['peak_rss_mib']:7.0f} MiB")
+
+
+def check_regressions(results: list, baseline: list, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """
+    Compare results to a baseline run; returns a description of every regression.
+    """
+    def key(row):
+        return row["floors"], row["backend"], row["batch_size"]
+
+    previous = {key(row): row for row in baseline if "error" not in row}
+    regressions = []
+    for row in results:
+        base = previous.get(key(row))
+        if base is None:
+            continue
+        if "error" in row:
+            regressions.append(f"{key(row)}: failed ({row['error']})")
+            continue
+        if row["images_per_sec"] < base["images_per_sec"] * (1 - tolerance):
+            regressions.append(f"{key(row)}: images_per_sec {row['images_per_sec']:.1f} < baseline {base['images_per_sec']:.1f}")
+        for metric in LATENCY_KEYS:
+            if row[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f"{key(row)}: {metric} {row[metric]:.1f} > baseline {base[metric]:.1f}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="People counter throughput benchmark")
+    parser.add_argument("--floors", type=int, nargs="+", default=[10, 100], help="Floor counts to simulate")
+    parser.add_argument("--backends", nargs="+", default=["torch"],
+                        help="Inference backends: torch, onnx, openvino, optionally with ':int8'")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[0, 8],
+                        help="Micro-batch sizes (0 = the whole tick as one batch)")
+    parser.add_argument("--cycles", type=int, default=DEFAULT_CYCLES, help="Timed cycles per configuration")
+    parser.add_argument("--output", type=Path, help="Result JSON (default benchmarks/results/counter_<time>.json)")
+    parser.add_argument("--baseline", type=Path, help="Earlier result JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed relative regression")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.floors, args.backends, args.batch_sizes, args.cycles)
+
+    output = args.output or PROJECT_ROOT / f"benchmarks/results/counter_{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"created": datetime.now().isoformat(timespec="seconds"), "results": results}, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = check_regressions(results, baseline, args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Cold-start benchmark for the dashboard
+# Every measurement runs in a fresh interpreter, like a hosted instance waking up:
+#   - import time of the modules on the page rendering path, and whether any
+#     of them pulled in the inference stack (ultralytics, torch, cv2)
+#   - time to first paint: wall time from spawning the interpreter until a
+#     page script has run to completion once (streamlit.testing AppTest, so
+#     no browser is needed), with the people counter not started
+# The run fails (exit code 1) when an import exceeds --import-budget, a page
+# exceeds --paint-budget, or a page-path module imports the inference stack.
+#
+#   python benchmarks/bench_startup.py --repeats 5
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Modules imported by GUI/app.py and the pages
+PAGE_MODULES = ("src.settings", "src.availability", "src.counter_daemon")
+PAGES = ("GUI/app.py", "GUI/pages/1_Availability.py")
+HEAVY_MODULES = ("ultralytics", "torch", "cv2")
+DEFAULT_REPEATS = 5
+DEFAULT_IMPORT_BUDGET = 0.5
+DEFAULT_PAINT_BUDGET = 4.0
+PAINT_TIMEOUT = 60
+
+IMPORT_PROBE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print(json.dumps({"seconds": time.perf_counter() - start, "heavy": [m for m in sys.argv[2:] if m in sys.modules]}))
+"""
+
+PAINT_PROBE = """
+import json, sys
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(sys.argv[1], default_timeout=float(sys.argv[2]))
+app.run()
+print(json.dumps({"exceptions": [str(e.value) for e in app.exception]}))
+"""
+
+
+def _python(code: str, *args) -> tuple:
+    """
+    Run code in a fresh interpreter from the project root with the counter off.
+    Returns (wall seconds, parsed JSON of the last output line).
+    """
+    env = {**os.environ, "FUTURELIBS_COUNTER_MODE": "off", "PYTHONPATH": str(PROJECT_ROOT)}
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", code, *args], cwd=PROJECT_ROOT, env=env, capture_output=True, text=True
+    )
+    seconds = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed")
+    return seconds, json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def measure_import(module: str, repeats: int = DEFAULT_REPEATS) -> dict:
+    samples, heavy = [], set()
+    for _ in range(repeats):
+        _, result = _python(IMPORT_PROBE, module, *HEAVY_MODULES)
+        samples.append(result["seconds"])
+        heavy.update(result["heavy"])
+    return {"module": module, "median_s": statistics.median(samples), "max_s": max(samples), "heavy": sorted(heavy)}
+
+
+def measure_first_paint(page: str, repeats: int = DEFAULT_REPEATS) -> dict:
+    samples, exceptions = [], []
+    for _ in range(repeats):
+        seconds, result = _python(PAINT_PROBE, page, str(PAINT_TIMEOUT))
+        samples.append(seconds)
+        exceptions = result["exceptions"]
+    return {"page": page, "median_s": statistics.median(samples), "max_s": max(samples), "exceptions": exceptions}
+
+
+def check_budgets(imports: list, pages: list, import_budget: float, paint_budget: float) -> list:
+    """
+    Return a description of every budget violation.
+    """
+    violations = []
+    for result in imports:
+        if result["heavy"]:
+            violations.append(f"{result['module']} imports {', '.join(result['heavy'])}")
+        if result["median_s"] > import_budget:
+            violations.append(f"{result['module']} import {result['median_s']:.3f}s > budget {import_budget:.3f}s")
+    for result in pages:
+        if result["exceptions"]:
+            violations.append(f"{result['page']} raised: {result['exceptions'][0]}")
+        if result["median_s"] > paint_budget:
+            violations.append(f"{result['page']} first paint {result['median_s']:.2f}s > budget {paint_budget:.2f}s")
+    return violations
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Dashboard import time and time-to-first-paint benchmark")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="Cold processes per measurement")
+    parser.add_argument("--import-budget", type=float, default=DEFAULT_IMPORT_BUDGET, help="Seconds per page-path module")
+    parser.add_argument("--paint-budget", type=float, default=DEFAULT_PAINT_BUDGET, help="Seconds to first paint per page")
+    parser.add_argument("--skip-paint", action="store_true", help="Only measure imports (no Streamlit needed)")
+    parser.add_argument("--output", type=Path, help="Result JSON (default benchmarks/results/startup_<time>.json)")
+    args = parser.parse_args(argv)
+
+    imports = []
+    for module in PAGE_MODULES:
+        result = measure_import(module, args.repeats)
+        imports.append(result)
+        heavy = f"  (imports {', '.join(result['heavy'])})" if result["heavy"] else ""
+        print(f"import {module:<24} median {1000 * result['median_s']:7.1f} ms  max {1000 * result['max_s']:7.1f} ms{heavy}")
+
+    pages = []
+    if not args.skip_paint:
+        for page in PAGES:
+            result = measure_first_paint(page, args.repeats)
+            pages.append(result)
+            print(f"first paint {page:<28} median {result['median_s']:6.2f} s  max {result['max_s']:6.2f} s")
+
+    output = args.output or PROJECT_ROOT / f"benchmarks/results/startup_{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"created": datetime.now().isoformat(timespec="seconds"), "imports": imports, "pages": pages}, f, indent=2)
+    print(f"Results written to {output}")
+
+    violations = check_budgets(imports, pages, args.import_budget, args.paint_budget)
+    for message in violations:
+        print(f"OVER BUDGET {message}")
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
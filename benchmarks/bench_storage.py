@@ -0,0 +1,303 @@
+import argparse
+import csv
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Storage microbenchmarks for the occupancy write and read paths
+# For every storage backend, with a seeded history of N rows (default 500,
+# 10k and 1M at the configured column count) and with growing column counts
+# (default 100 and 1000 columns at 10k rows), every simulated tick
+#   - appends one snapshot the way the counter does (append_row_to_csv ->
+#     occupancy_store.save_snapshot with only that backend enabled; the CSV
+#     store is always written)
+#   - reads the newest snapshot back from that backend
+# and, for the CSV store that the dashboard reads, also times the page and
+# generator read paths: get_latest_occupancy_from_csv, get_last_timestamp and
+# build_snapshot (the OccupancySnapshot every page process builds once per new
+# row). The latest-row memo of occupancy_store is dropped before each of the
+# two reads, so they measure a cold tail read rather than a memo hit; the memo
+# hit is timed on its own as read_latest_row_memoized.
+# Reported per operation: ops/s and p50/p95/p99 latency, plus bytes written
+# per tick (growth of the data directory).
+#
+#   python benchmarks/bench_storage.py --rows 500 10000 1000000 --columns 100 1000
+#
+# Every store is bounded by retention (two rotated CSV segments, RAW_RETENTION
+# of raw rows in the binary log, SQLite and rollups), so its seeded history is
+# capped at what it would hold in production; the rows a backend actually
+# holds are reported as stored_rows next to the requested N.
+# sqlite and rollups map columns through the configured registry and are only
+# run at the configured column count. A new backend is benchmarked by adding
+# it to save_snapshot and a latest-snapshot reader to LATEST_READERS.
+
+PROJECT_ROOT = Path(__file__).parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.bench_counter import build_scaled_libraries
+from src import availability, occupancy_db, occupancy_log, occupancy_rollups, occupancy_store
+from src.snapshot_service import OccupancySnapshot
+from src.lib_configs import LIBRARIES, REGISTRY, build_registry
+from src.real_time_gen import get_last_timestamp
+
+BACKENDS = ("csv", "binlog", "sqlite", "rollups")
+REGISTRY_BACKENDS = ("sqlite", "rollups")
+TICK = timedelta(seconds=5)
+DEFAULT_TICKS = 200
+DEFAULT_COLUMN_HISTORY = 10000
+SEED_CHUNK = 20000
+DEFAULT_TOLERANCE = 0.10
+
+
+def _rollups_latest(csv_file: Path, now: datetime):
+    return occupancy_rollups.read_rollups(occupancy_store.rollups_path_for(csv_file), "1min", now - timedelta(hours=1), now)
+
+
+# Backend -> function(csv_file, now) reading the newest snapshot back
+LATEST_READERS = {
+    "csv": lambda csv_file, now: occupancy_store.read_latest_row(csv_file),
+    "binlog": lambda csv_file, now: occupancy_log.latest_record(occupancy_store.log_path_for(csv_file)),
+    "sqlite": lambda csv_file, now: occupancy_db.latest_row(occupancy_store.db_path_for(csv_file)),
+    "rollups": _rollups_latest,
+}
+
+
+def make_layout(n_columns: int):
+    """
+    (libraries, registry) with n_columns floors; the configured layout if it matches.
+    """
+    if n_columns == len(REGISTRY):
+        return LIBRARIES, REGISTRY
+    libraries = build_scaled_libraries(n_columns)
+    return libraries, build_registry(libraries)
+
+
+def iter_rows(registry, n_rows: int, end: datetime, rng: random.Random):
+    """
+    n_rows snapshot rows 5 seconds apart, the last one at `end`.
+    """
+    start = end - (n_rows - 1) * TICK
+    for i in range(n_rows):
+        row = {"timestamp": (start + i * TICK).isoformat()}
+        for column, capacity in zip(registry.columns, registry.capacities):
+            row[column] = rng.randint(0, capacity)
+        yield row
+
+
+def _chunks(rows, size: int):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def seed_history(csv_file: Path, registry, n_rows: int, backend: str, end: datetime, rng: random.Random):
+    """
+    Lay out n_rows of history the way the store keeps it on disk: full CSV
+    segments plus the active file, and the backend's own file.
+
+    Returns:
+        Number of rows the backend holds (the CSV rows for "csv")
+    """
+    fieldnames = list(registry.fieldnames)
+    segment_rows = occupancy_store.SEGMENT_ROWS
+    csv_rows = min(n_rows, segment_rows * occupancy_store.MAX_SEGMENTS + (n_rows % segment_rows or segment_rows))
+    rows = list(iter_rows(registry, csv_rows, end, rng))
+
+    # Oldest rows go to numbered segments, the remainder to the active file
+    active_count = len(rows) % segment_rows or min(len(rows), segment_rows)
+    segments = list(_chunks(rows[:len(rows) - active_count], segment_rows))
+    files = [occupancy_store._segment_path(csv_file, seq) for seq in range(1, len(segments) + 1)]
+    for path, chunk in zip(files + [csv_file], segments + [rows[len(rows) - active_count:]]):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, lineterminator="\n")
+            writer.writeheader()
+            writer.writerows(chunk)
+
+    if backend == "csv":
+        return len(rows)
+    retained = min(n_rows, int(occupancy_store.RAW_RETENTION / TICK))
+    if backend == "binlog":
+        log_file = occupancy_store.log_path_for(csv_file)
+        for chunk in _chunks(iter_rows(registry, retained, end, rng), SEED_CHUNK):
+            occupancy_log.append_rows(log_file, chunk, fieldnames, occupancy_store.RAW_RETENTION)
+        return len(occupancy_log.open_log(log_file))
+    recent = list(iter_rows(registry, retained, end, rng))
+    if backend == "sqlite":
+        occupancy_db.append_rows(occupancy_store.db_path_for(csv_file), recent)
+    else:
+        occupancy_rollups.update_rollups(occupancy_store.rollups_path_for(csv_file), recent)
+    return retained
+
+
+def _drop_latest_cache():
+    # Every reader would otherwise hit the row memoized by the read before it
+    with occupancy_store._latest_lock:
+        occupancy_store._latest_cache.clear()
+
+
+def _dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.iterdir() if p.is_file())
+
+
+def _summarize(samples: list) -> dict:
+    ordered = sorted(samples)
+
+    def pct(q):
+        return 1e6 * ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "ops_per_sec": len(ordered) / sum(ordered) if sum(ordered) else 0.0,
+        "p50_us": pct(0.50),
+        "p95_us": pct(0.95),
+        "p99_us": pct(0.99),
+        "max_us": 1e6 * ordered[-1],
+    }
+
+
+def bench_backend(backend: str, n_rows: int, n_columns: int, ticks: int = DEFAULT_TICKS, seed: int = 0) -> dict:
+    """
+    Seed a temporary store and time `ticks` appends and reads for one backend.
+    """
+    libraries, registry = make_layout(n_columns)
+    fieldnames = list(registry.fieldnames)
+    rng = random.Random(seed)
+    now = datetime.now().replace(microsecond=0)
+    workdir = Path(tempfile.mkdtemp(prefix="bench_storage_"))
+    csv_file = workdir / "library_occupancy.csv"
+    backends = [] if backend == "csv" else [backend]
+    timings = {}
+
+    def timed(name, function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        timings.setdefault(name, []).append(time.perf_counter() - start)
+        return result
+
+    try:
+        stored_rows = seed_history(csv_file, registry, n_rows, backend, now, rng)
+        size_before = _dir_size(workdir)
+        for version, row in enumerate(iter_rows(registry, ticks, now + ticks * TICK, rng), 1):
+            timed("append_row_to_csv", occupancy_store.save_snapshot, csv_file, row, fieldnames, backends)
+            tick_time = datetime.fromisoformat(row["timestamp"])
+            timed("latest_read", LATEST_READERS[backend], csv_file, tick_time)
+            if backend == "csv":
+                timed("read_latest_row_memoized", occupancy_store.read_latest_row, csv_file)
+                _drop_latest_cache()
+                timed("get_last_timestamp", get_last_timestamp, csv_file)
+                _drop_latest_cache()
+                latest = timed("get_latest_occupancy_from_csv", availability.get_latest_occupancy_from_csv, csv_file)
+                timed("build_snapshot", OccupancySnapshot, version, latest, libraries, registry)
+        bytes_per_tick = (_dir_size(workdir) - size_before) / ticks
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "backend": backend,
+        "rows": n_rows,
+        "stored_rows": stored_rows,
+        "columns": n_columns,
+        "ticks": ticks,
+        "bytes_per_tick": bytes_per_tick,
+        "ops": {name: _summarize(samples) for name, samples in timings.items()},
+    }
+
+
+def run_benchmarks(row_counts: list, column_counts: list, backends: list, ticks: int = DEFAULT_TICKS) -> list:
+    """
+    History scaling at the configured column count, then column scaling at
+    DEFAULT_COLUMN_HISTORY rows, for every backend.
+    """
+    configs = [(n_rows, len(REGISTRY)) for n_rows in row_counts]
+    configs += [(DEFAULT_COLUMN_HISTORY, n) for n in column_counts if n != len(REGISTRY)]
+    results = []
+    for n_rows, n_columns in configs:
+        for backend in backends:
+            if backend in REGISTRY_BACKENDS and n_columns != len(REGISTRY):
+                continue
+            result = bench_backend(backend, n_rows, n_columns, ticks)
+            results.append(result)
+            for line in format_result(result):
+                print(line)
+    return results
+
+
+def format_result(result: dict) -> list:
+    lines = [f"{result['backend']:<8} {result['rows']:>8} rows ({result['stored_rows']:>7} stored) "
+             f"{result['columns']:>5} columns  {result['bytes_per_tick']:10.0f} bytes/tick"]
+    for name, op in result["ops"].items():
+        lines.append(f"    {name:<30}{op['ops_per_sec']:12.0f} ops/s   p50 {op['p50_us']:9.0f} us   "
+                     f"p95 {op['p95_us']:9.0f} us   p99 {op['p99_us']:9.0f} us")
+    return lines
+
+
+def check_regressions(results: list, baseline: list, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """
+    Compare results to a baseline run; returns a description of every regression.
+    """
+    def key(result):
+        return result["backend"], result["rows"], result["columns"]
+
+    previous = {key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        base = previous.get(key(result))
+        if base is None:
+            continue
+        if result["bytes_per_tick"] > base["bytes_per_tick"] * (1 + tolerance):
+            regressions.append(f"{key(result)}: bytes_per_tick {result['bytes_per_tick']:.0f} > baseline {base['bytes_per_tick']:.0f}")
+        for name, op in result["ops"].items():
+            base_op = base["ops"].get(name)
+            if base_op is None:
+                continue
+            if op["ops_per_sec"] < base_op["ops_per_sec"] * (1 - tolerance):
+                regressions.append(f"{key(result)} {name}: {op['ops_per_sec']:.0f} ops/s < baseline {base_op['ops_per_sec']:.0f}")
+            if op["p99_us"] > base_op["p99_us"] * (1 + tolerance):
+                regressions.append(f"{key(result)} {name}: p99 {op['p99_us']:.0f} us > baseline {base_op['p99_us']:.0f}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Occupancy storage microbenchmarks")
+    parser.add_argument("--rows", type=int, nargs="+", default=[500, 10000, 1000000], help="History lengths to seed")
+    parser.add_argument("--columns", type=int, nargs="+", default=[100, 1000],
+                        help=f"Extra column counts (at {DEFAULT_COLUMN_HISTORY} rows)")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--ticks", type=int, default=DEFAULT_TICKS, help="Appends timed per configuration")
+    parser.add_argument("--output", type=Path, help="Result JSON (default benchmarks/results/storage_<time>.json)")
+    parser.add_argument("--baseline", type=Path, help="Earlier result JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed relative regression")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.rows, args.columns, args.backends, args.ticks)
+
+    output = args.output or PROJECT_ROOT / f"benchmarks/results/storage_{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"created": datetime.now().isoformat(timespec="seconds"), "results": results}, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = check_regressions(results, baseline, args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+import sys
+from pathlib import Path
+
+try:
+    from .lib_configs import REGISTRY
+    from . import occupancy_shm, occupancy_store
+    from .readiness import COUNTER_READINESS
+    from .settings import COUNTER_MODE, SNAPSHOT_SHM
+except ImportError:
+    project_root = Path(__file__).parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+    from src.lib_configs import REGISTRY
+    from src import occupancy_shm, occupancy_store
+    from src.readiness import COUNTER_READINESS
+    from src.settings import COUNTER_MODE, SNAPSHOT_SHM
+
+# Occupancy read path of the Availability page
+# Kept free of Streamlit so the page logic can be reused and benchmarked
+# (benchmarks/bench_storage.py) without running the dashboard.
+
+# One reader per page process, shared by all sessions
+_snapshot_reader = occupancy_shm.SnapshotReader(
+    occupancy_shm.snapshot_name(Path(__file__).parent.parent, SNAPSHOT_SHM), REGISTRY.fieldnames
+)
+
+
+def get_latest_occupancy(csv_path="data/library_occupancy.csv") -> dict:
+    """
+    Latest occupancy row: from the counter daemon's shared-memory snapshot when
+    one is published, otherwise from the occupancy CSV file.
+    Returns a dictionary mapping column names to occupancy values, or None if there is no data.
+    """
+    row = _snapshot_reader.read()
+    if row is not None:
+        return row
+    return get_latest_occupancy_from_csv(csv_path)
+
+
+def get_counter_state() -> dict:
+    """
+    Readiness of the people counter (see readiness) as {"state", "since"},
+    or None if this app does not run one and no daemon publishes its state.
+    """
+    if COUNTER_MODE == "thread":
+        return COUNTER_READINESS.snapshot()
+    status = _snapshot_reader.status()
+    if status is not None and status["state"] is not None:
+        return {"state": status["state"], "since": status["state_since"]}
+    # The daemon has just been spawned and has not published yet
+    return {"state": "loading", "since": None} if COUNTER_MODE == "daemon" else None
+
+
+# Shown on the pages while the counter is not (yet) counting
+COUNTER_STATE_LABELS = {
+    "loading": "🟡 Loading the occupancy model…",
+    "warming": "🟠 Warming up the occupancy model…",
+    "ready": "🟢 Live occupancy counting",
+    "failed": "🔴 The occupancy model failed to load; showing the last saved data",
+}
+
+
+def counter_state_label() -> str:
+    """
+    Human-readable readiness of the people counter, or None if unknown.
+    """
+    state = get_counter_state()
+    return COUNTER_STATE_LABELS.get(state["state"]) if state else None
+
+
+def get_latest_occupancy_from_csv(csv_path="data/library_occupancy.csv") -> dict:
+    """
+    Read the latest row from the occupancy CSV file.
+    Relative paths are resolved against the project root.
+    Returns a dictionary mapping column names to occupancy values, or None if file doesn't exist.
+    """
+    csv_file = Path(__file__).parent.parent / csv_path
+
+    try:
+        # Tail read of the last row, shared across sessions until the file changes
+        return occupancy_store.read_latest_row(csv_file)
+    except (KeyError, ValueError, IndexError, IOError):
+        return None
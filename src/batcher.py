@@ -0,0 +1,146 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+# Deadline-aware micro-batching for inference
+# Frames are submitted one by one and collected by a single batching thread,
+# which runs them through the model in chunks of at most max_batch frames. A
+# chunk is started as soon as it is full, or when its oldest frame has waited
+# max_wait seconds, whichever comes first. Each frame's Future resolves as
+# soon as its own chunk completes, so one slow chunk does not hold back the
+# floors that were already counted, and memory is bounded by max_batch.
+
+# Number of recent batches kept for the wait-time percentiles
+STATS_WINDOW = 1024
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Collects single inference requests into bounded batches.
+    """
+
+    def __init__(self, run_batch, max_batch: int, max_wait: float, name: str = "micro-batcher"):
+        """
+        Args:
+            run_batch: Function mapping a list of inputs to a list of results (same order)
+            max_batch: Maximum number of inputs per call of run_batch
+            max_wait: Seconds the oldest pending input may wait before a partial batch is run
+        """
+        self.run_batch = run_batch
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        self._inbox = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes = {}
+        self._waits = deque(maxlen=STATS_WINDOW)
+        self._run_times = deque(maxlen=STATS_WINDOW)
+        self.batches = 0
+        self.items = 0
+        self.failures = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item) -> Future:
+        """
+        Queue one input; the returned Future resolves to its result.
+        """
+        future = Future()
+        self._inbox.put((time.monotonic(), item, future))
+        return future
+
+    def map(self, items: list) -> list:
+        """
+        Submit several inputs and wait for all of their results.
+        """
+        futures = [self.submit(item) for item in items]
+        return [future.result() for future in futures]
+
+    def _run(self):
+        pending = []
+        while True:
+            timeout = None
+            if pending:
+                timeout = max(0.0, pending[0][0] + self.max_wait - time.monotonic())
+            try:
+                entry = self._inbox.get(timeout=timeout)
+            except queue.Empty:
+                entry = None
+            if entry is _STOP:
+                while pending:
+                    self._run_chunk(pending[:self.max_batch])
+                    pending = pending[self.max_batch:]
+                return
+            if entry is not None:
+                pending.append(entry)
+            # Take whatever else is already waiting without blocking
+            while len(pending) < self.max_batch:
+                try:
+                    entry = self._inbox.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    self._inbox.put(_STOP)
+                    break
+                pending.append(entry)
+
+            while pending and (
+                len(pending) >= self.max_batch or time.monotonic() - pending[0][0] >= self.max_wait
+            ):
+                self._run_chunk(pending[:self.max_batch])
+                pending = pending[self.max_batch:]
+
+    def _run_chunk(self, chunk: list):
+        started = time.monotonic()
+        try:
+            results = self.run_batch([item for _, item, _ in chunk])
+            error = None
+        except Exception as e:
+            results, error = None, e
+        finished = time.monotonic()
+
+        with self._lock:
+            self.batches += 1
+            self.items += len(chunk)
+            self._batch_sizes[len(chunk)] = self._batch_sizes.get(len(chunk), 0) + 1
+            self._waits.extend(started - enqueued for enqueued, _, _ in chunk)
+            self._run_times.append(finished - started)
+            if error is not None:
+                self.failures += 1
+
+        for i, (_, _, future) in enumerate(chunk):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(results[i])
+
+    def stats(self) -> dict:
+        """
+        Batch size distribution and queue wait / batch run times (ms) over recent batches.
+        """
+        with self._lock:
+            waits = np.array(self._waits) * 1000
+            run_times = np.array(self._run_times) * 1000
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "failures": self.failures,
+                "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+                "batch_sizes": dict(sorted(self._batch_sizes.items())),
+                "wait_ms_p50": float(np.percentile(waits, 50)) if waits.size else 0.0,
+                "wait_ms_p95": float(np.percentile(waits, 95)) if waits.size else 0.0,
+                "wait_ms_max": float(waits.max()) if waits.size else 0.0,
+                "run_ms_p50": float(np.percentile(run_times, 50)) if run_times.size else 0.0,
+            }
+
+    def close(self):
+        """
+        Run everything still pending and stop the batching thread.
+        """
+        self._inbox.put(_STOP)
+        self._thread.join()
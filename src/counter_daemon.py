@@ -0,0 +1,206 @@
+import argparse
+import atexit
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+try:
+    from .lib_configs import REGISTRY
+    from . import occupancy_shm, occupancy_store
+    from .readiness import COUNTER_READINESS
+    from .settings import SNAPSHOT_SHM
+except ImportError:
+    project_root = Path(__file__).parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+    from src.lib_configs import REGISTRY
+    from src import occupancy_shm, occupancy_store
+    from src.readiness import COUNTER_READINESS
+    from src.settings import SNAPSHOT_SHM
+
+# Standalone people counter process
+# Exactly one counter runs per host (per checkout): a process becomes the
+# leader by taking an exclusive lock on data/counter.lock, which the OS
+# releases when the process dies, so a standby (--standby) or the next spawn
+# takes over without stale-pid checks. The leader runs the people counter and
+# publishes its snapshot to shared memory (occupancy_shm) as floor counts
+# complete, where the Streamlit page processes read it; the CSV store is
+# written once per tick as before.
+#
+#   python -m src.counter_daemon            # exit if a leader is already running
+#   python -m src.counter_daemon --standby  # wait and take over when the leader exits
+#
+# GUI/app.py spawns it with ensure_running() (settings.COUNTER_MODE = "daemon").
+
+PROJECT_ROOT = Path(__file__).parent.parent
+LOCK_FILE = PROJECT_ROOT / "data/counter.lock"
+LOG_FILE = PROJECT_ROOT / "data/counter_daemon.log"
+OCCUPANCY_CSV = PROJECT_ROOT / "data/library_occupancy.csv"
+STANDBY_POLL = 1.0
+# Seconds before a leader whose model failed to load tries again
+RETRY_AFTER = 60
+
+
+def _try_lock(f) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def acquire_leadership(lock_path=LOCK_FILE, wait: bool = False):
+    """
+    Take the counter leader lock.
+
+    Args:
+        lock_path: Lock file shared by all candidates on this host
+        wait: Block until the current leader exits instead of giving up
+
+    Returns:
+        The open lock file (keep it open to stay leader), or None if another
+        process is the leader
+    """
+    lock_path = Path(lock_path)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    f = open(lock_path, "a+")
+    while not _try_lock(f):
+        if not wait:
+            f.close()
+            return None
+        time.sleep(STANDBY_POLL)
+    # Record the leader for humans; the lock itself is the source of truth
+    f.seek(0)
+    f.truncate()
+    f.write(f"{os.getpid()}\n")
+    f.flush()
+    return f
+
+
+def leader_running(lock_path=LOCK_FILE) -> bool:
+    """
+    True if some process currently holds the leader lock.
+    """
+    lock_path = Path(lock_path)
+    if not lock_path.exists():
+        return False
+    with open(lock_path, "a+") as f:
+        # Closing the file releases the probe lock again
+        return not _try_lock(f)
+
+
+def ensure_running(lock_path=LOCK_FILE):
+    """
+    Spawn a detached counter daemon unless a leader is already running.
+    Replicas racing here are safe: the daemon re-checks the lock and the loser exits.
+
+    Returns:
+        The Popen of the spawned daemon, or None if a leader was already running
+    """
+    if leader_running(lock_path):
+        return None
+    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(LOG_FILE, "ab") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "src.counter_daemon"],
+            cwd=PROJECT_ROOT,
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            env={**os.environ, "PYTHONUNBUFFERED": "1"},
+            start_new_session=True,
+        )
+    print(f"🚀 Started people counter daemon (pid {process.pid}, log {LOG_FILE})")
+    return process
+
+
+def _import_counter():
+    # Heavy (ultralytics, torch): only ever imported off the page rendering path
+    try:
+        from .people_counter import start_background_generator
+    except ImportError:
+        from src.people_counter import start_background_generator
+    return start_background_generator
+
+
+def start_in_thread():
+    """
+    Import and start the people counter in a background thread of this process
+    (settings.COUNTER_MODE = "thread") without blocking the caller; progress is
+    reported through readiness.COUNTER_READINESS.
+    """
+    def start():
+        # COUNTER_READINESS starts out as "loading", which covers the import
+        try:
+            _import_counter()()
+        except Exception as e:
+            COUNTER_READINESS.set("failed", str(e))
+
+    thread = threading.Thread(target=start, name="people-counter-start", daemon=True)
+    thread.start()
+    return thread
+
+
+def run(standby: bool = False) -> int:
+    """
+    Become the leader and run the people counter until the process is signalled.
+    A model that fails to load is retried every RETRY_AFTER seconds.
+    """
+    lock = acquire_leadership(wait=standby)
+    if lock is None:
+        print("People counter daemon already running; exiting.")
+        return 0
+    print(f"👑 People counter leader (pid {os.getpid()})")
+
+    writer = occupancy_shm.SnapshotWriter(occupancy_shm.snapshot_name(PROJECT_ROOT, SNAPSHOT_SHM), REGISTRY.fieldnames)
+    atexit.register(writer.close)
+    atexit.register(lock.close)
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda signum, frame: sys.exit(0))
+
+    # Pages get the last persisted row right away instead of waiting for the first tick
+    try:
+        latest = occupancy_store.read_latest_row(OCCUPANCY_CSV)
+    except (OSError, ValueError):
+        latest = None
+    if latest:
+        writer.publish(latest)
+    # Pages show loading/warming/ready/failed while the model comes up
+    COUNTER_READINESS.subscribe(writer.set_state)
+
+    while True:
+        try:
+            # Imported here: standbys and losing candidates never load torch or the model
+            loop = _import_counter()(publish=writer.publish)
+            while loop.is_alive():
+                loop.join(1)
+        except Exception as e:
+            COUNTER_READINESS.set("failed", str(e))
+        print(f"❌ People counter stopped; retrying in {RETRY_AFTER}s")
+        time.sleep(RETRY_AFTER)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Standalone people counter (one leader per host)")
+    parser.add_argument("--standby", action="store_true", help="Wait for the leader lock instead of exiting")
+    args = parser.parse_args(argv)
+    return run(args.standby)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
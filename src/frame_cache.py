@@ -0,0 +1,116 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# Decoded frame cache in front of the people detector
+# Reading, decoding and letterboxing a PNG costs far more than looking it up
+# again, and the counter sees the same files over and over (the demo rotates
+# through nine frames per floor; replays walk archived frames repeatedly).
+# Frames are kept as letterboxed uint8 arrays together with their content
+# hash, keyed by (path, mtime_ns) so a rewritten file is decoded again. The
+# total size is bounded by a byte budget; least recently used frames go first.
+
+# Model input size; frames are letterboxed to IMGSZ x IMGSZ like ultralytics does
+IMGSZ = 640
+PAD_VALUE = 114
+
+
+def letterbox(image: np.ndarray, size: int = IMGSZ) -> np.ndarray:
+    """
+    Resize a BGR image to fit a size x size square, keeping the aspect ratio
+    and padding the borders with gray (same as ultralytics' LetterBox).
+    """
+    h, w = image.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = round(w * scale), round(h * scale)
+    if (new_w, new_h) != (w, h):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top = (size - new_h) // 2
+    left = (size - new_w) // 2
+    return cv2.copyMakeBorder(
+        image, top, size - new_h - top, left, size - new_w - left,
+        cv2.BORDER_CONSTANT, value=(PAD_VALUE, PAD_VALUE, PAD_VALUE),
+    )
+
+
+def decode_frame(path, size: int = IMGSZ):
+    """
+    Read an image file once, returning (content_hash, letterboxed BGR image).
+    The image is None if the file cannot be decoded.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return digest, None
+    image = letterbox(image, size)
+    # Cached arrays are shared between ticks, so nobody may modify them in place
+    image.setflags(write=False)
+    return digest, image
+
+
+class FrameCache:
+    """
+    Byte-bounded LRU cache of decoded, letterboxed frames.
+    """
+
+    def __init__(self, max_bytes: int, size: int = IMGSZ):
+        self.max_bytes = max_bytes
+        self.size = size
+        self._entries = OrderedDict()  # (path, mtime_ns) -> (digest, image)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def load(self, path, mtime_ns: int = None):
+        """
+        Return (content_hash, letterboxed image) for a file, decoding it only
+        if this version of the file (path, mtime) is not cached. Pass the
+        mtime_ns known from the frame index; the file is only stat'ed without it.
+        """
+        path = str(path)
+        if mtime_ns is None:
+            mtime_ns = os.stat(path).st_mtime_ns
+        key = (path, mtime_ns)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        entry = decode_frame(path, self.size)
+        if entry[1] is None or entry[1].nbytes > self.max_bytes:
+            return entry
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = entry
+                self._bytes += entry[1].nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+        return entry
+
+    def stats(self) -> dict:
+        """
+        Hit/miss/eviction counters and memory use since the cache was created.
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
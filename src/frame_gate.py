@@ -0,0 +1,98 @@
+import threading
+
+import cv2
+import numpy as np
+
+# Change-detection gate in front of the people detector
+# Quiet cameras produce near-identical frames for long stretches. Before a
+# frame is sent to YOLO the gate checks, per camera:
+#   1. exact repeat    - same content hash as the last inferred frame
+#   2. small change    - mean absolute difference of a downscaled grayscale
+#                        thumbnail against the last inferred frame is below
+#                        the camera's threshold
+# On a hit the camera's previous count is reused. The reference frame is only
+# replaced after a real inference, so slow drift still triggers eventually,
+# and MAX_REUSE bounds how many ticks a count can be carried forward.
+
+THUMBNAIL_SIZE = 32
+DEFAULT_THRESHOLD = 0.02  # fraction of the full 0-255 range
+MAX_REUSE = 60
+
+
+def thumbnail(image: np.ndarray) -> np.ndarray:
+    """
+    Downscaled grayscale copy of a BGR image used for difference checks.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    return cv2.resize(gray, (THUMBNAIL_SIZE, THUMBNAIL_SIZE), interpolation=cv2.INTER_AREA)
+
+
+class FrameGate:
+    """
+    Per-camera change detector that decides whether a frame needs inference.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, thresholds: dict = None, max_reuse: int = MAX_REUSE):
+        """
+        Args:
+            threshold: Default difference threshold for all cameras
+            thresholds: Optional per-camera overrides, keyed like the CSV columns
+            max_reuse: Force inference after this many consecutive reused counts
+        """
+        self.threshold = threshold
+        self.thresholds = dict(thresholds or {})
+        self.max_reuse = max_reuse
+        self._state = {}
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    def check(self, key: str, digest: str, image: np.ndarray):
+        """
+        Return the previous count for `key` if the frame has not meaningfully
+        changed, otherwise None (the frame must be inferred).
+        """
+        with self._lock:
+            state = self._state.get(key)
+            if state is None or state["reused"] >= self.max_reuse:
+                self.misses += 1
+                return None
+
+            if digest is not None and digest == state["digest"]:
+                self.exact_hits += 1
+                state["reused"] += 1
+                return state["count"]
+
+            reference = state["thumbnail"]
+        diff = float(np.mean(cv2.absdiff(thumbnail(image), reference))) / 255.0
+
+        with self._lock:
+            if diff < self.thresholds.get(key, self.threshold):
+                self.similar_hits += 1
+                state["reused"] += 1
+                return state["count"]
+            self.misses += 1
+            return None
+
+    def update(self, key: str, digest: str, image: np.ndarray, count: int):
+        """
+        Record a freshly inferred frame as the new reference for `key`.
+        """
+        reference = thumbnail(image)
+        with self._lock:
+            self._state[key] = {"digest": digest, "thumbnail": reference, "count": count, "reused": 0}
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters since the gate was created.
+        """
+        with self._lock:
+            total = self.exact_hits + self.similar_hits + self.misses
+            hits = self.exact_hits + self.similar_hits
+            return {
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+            }
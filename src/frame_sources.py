@@ -0,0 +1,334 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+
+try:
+    from .lib_configs import REGISTRY
+except ImportError:
+    project_root = Path(__file__).parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+    from src.lib_configs import REGISTRY
+
+# Camera frame source index
+# data/lib_images/{Library}/floor{N}/ is scanned once, then kept up to date by
+# a watcher thread: inotify on Linux, otherwise polling one directory mtime
+# per floor (a directory's mtime changes whenever a file is added or removed).
+# The counter then finds a floor's frame by name, or the newest frame it has
+# not processed yet, with a dictionary lookup instead of per-tick stat calls.
+#   "demo"  - the fixed frame1..frame9.png images are cycled (the default)
+#   "spool" - cameras drop new frames into the floor directories and each
+#             frame is counted once, newest first; older unprocessed frames
+#             of the same floor are skipped
+# In spool mode a frame handed out by newest_unprocessed is only claimed: the
+# counter marks it processed once its count is persisted, or releases it when
+# decoding or inference failed, so it is retried (at most MAX_FRAME_ATTEMPTS
+# times). Processed and superseded frames are dropped from the index, so it
+# only holds the frames still waiting to be counted.
+
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg")
+POLL_INTERVAL = 1.0
+# Spool frames that failed this often are given up on
+MAX_FRAME_ATTEMPTS = 3
+
+# inotify constants (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+_EVENT_HEADER = struct.Struct("iIII")
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+
+def _load_inotify():
+    """
+    Return libc with the inotify functions, or None where they are unavailable.
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class FrameIndex:
+    """
+    In-memory index of the frames available for every registry floor.
+    """
+
+    def __init__(self, root=None, registry=REGISTRY, poll_interval: float = POLL_INTERVAL):
+        self.root = Path(root) if root is not None else Path(__file__).parent.parent / "data/lib_images"
+        self.registry = registry
+        self.poll_interval = poll_interval
+        self.mode = None
+        self._lock = threading.Lock()
+        # image_prefix is "{library}/floor{N}/frame": directory plus demo frame stem
+        prefixes = [record.image_prefix.rsplit("/", 1) for record in registry.floors]
+        self._dirs = [self.root / directory for directory, _ in prefixes]
+        self._stems = [stem for _, stem in prefixes]
+        # per floor: frame name -> (mtime_ns, path), without processed spool frames
+        self._frames = [{} for _ in registry.floors]
+        # per floor: (mtime_ns, name) of the newest indexed frame
+        self._newest = [None] * len(registry.floors)
+        # per floor: (mtime_ns, name) of the newest frame counted
+        self._processed = [None] * len(registry.floors)
+        # per floor: ((mtime_ns, name), path) of the frame handed out and not yet settled
+        self._claimed = [None] * len(registry.floors)
+        # (floor, mtime_ns, name) -> failed attempts
+        self._failures = {}
+        self._dir_mtimes = [None] * len(registry.floors)
+        self._thread = None
+        for index in range(len(registry.floors)):
+            self._scan(index)
+
+    def _scan(self, index: int):
+        """
+        Rebuild the index of one floor directory.
+        """
+        directory = self._dirs[index]
+        frames = {}
+        try:
+            self._dir_mtimes[index] = directory.stat().st_mtime_ns
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.name.lower().endswith(IMAGE_SUFFIXES):
+                        frames[entry.name] = (entry.stat().st_mtime_ns, entry.path)
+        except FileNotFoundError:
+            self._dir_mtimes[index] = None
+        with self._lock:
+            processed = self._processed[index]
+            if processed is not None:
+                frames = {name: entry for name, entry in frames.items() if (entry[0], name) > processed}
+            self._frames[index] = frames
+            self._newest[index] = self._find_newest(frames)
+
+    @staticmethod
+    def _find_newest(frames: dict):
+        if not frames:
+            return None
+        return max((mtime_ns, name) for name, (mtime_ns, _) in frames.items())
+
+    def _update_file(self, index: int, name: str):
+        if not name.lower().endswith(IMAGE_SUFFIXES):
+            return
+        path = self._dirs[index] / name
+        try:
+            entry = (path.stat().st_mtime_ns, str(path))
+        except FileNotFoundError:
+            entry = None
+        with self._lock:
+            frames = self._frames[index]
+            newest = self._newest[index]
+            if entry is None:
+                frames.pop(name, None)
+                if newest is not None and newest[1] == name:
+                    self._newest[index] = self._find_newest(frames)
+                return
+            marker = (entry[0], name)
+            processed = self._processed[index]
+            if processed is not None and marker <= processed:
+                # Older than a frame already counted: superseded
+                return
+            frames[name] = entry
+            if newest is None or marker > newest:
+                self._newest[index] = marker
+            elif newest[1] == name:
+                self._newest[index] = self._find_newest(frames)
+
+    def frame_path(self, index: int, name: str):
+        """
+        Path of frame `name` (e.g. "frame3.png") for a floor, or None if it does not exist.
+        """
+        with self._lock:
+            entry = self._frames[index].get(name)
+        return entry[1] if entry is not None else None
+
+    def demo_frame(self, index: int, image_index: int):
+        """
+        Path of the i-th demo frame (frame{image_index}.png) for a floor, or None.
+        """
+        return self.frame_path(index, f"{self._stems[index]}{image_index}.png")
+
+    def newest_unprocessed(self, index: int):
+        """
+        (path, mtime_ns) of the newest frame of a floor that has not been counted or
+        handed out yet, or None. The frame is claimed until mark_processed or
+        release is called for it.
+        """
+        with self._lock:
+            newest = self._newest[index]
+            if newest is None:
+                return None
+            claimed = self._claimed[index]
+            if claimed is not None and newest <= claimed[0]:
+                return None
+            path = self._frames[index][newest[1]][1]
+            self._claimed[index] = (newest, path)
+        return path, newest[0]
+
+    def _marker(self, index: int, path: str):
+        claimed = self._claimed[index]
+        if claimed is not None and claimed[1] == path:
+            return claimed[0]
+        name = os.path.basename(path)
+        entry = self._frames[index].get(name)
+        return (entry[0], name) if entry is not None and entry[1] == path else None
+
+    def _settle(self, index: int, marker):
+        """
+        Record `marker` as counted and drop it and every older frame of the floor.
+        """
+        processed = self._processed[index]
+        if processed is None or marker > processed:
+            self._processed[index] = marker
+        claimed = self._claimed[index]
+        if claimed is not None and claimed[0] <= marker:
+            self._claimed[index] = None
+        frames = self._frames[index]
+        for stale in [(mtime_ns, name) for name, (mtime_ns, _) in frames.items() if (mtime_ns, name) <= marker]:
+            del frames[stale[1]]
+            self._failures.pop((index, *stale), None)
+        newest = self._newest[index]
+        if newest is not None and newest <= marker:
+            self._newest[index] = self._find_newest(frames)
+
+    def mark_processed(self, index: int, path: str):
+        """
+        A claimed spool frame was counted: never hand it out again, nor anything older.
+        """
+        with self._lock:
+            marker = self._marker(index, path)
+            if marker is not None:
+                self._settle(index, marker)
+
+    def release(self, index: int, path: str):
+        """
+        A claimed spool frame could not be counted; hand it out again on the next
+        call, unless it has now failed MAX_FRAME_ATTEMPTS times.
+        """
+        with self._lock:
+            marker = self._marker(index, path)
+            claimed = self._claimed[index]
+            if claimed is not None and claimed[1] == path:
+                self._claimed[index] = None
+            if marker is None:
+                return
+            key = (index, *marker)
+            self._failures[key] = self._failures.get(key, 0) + 1
+            if self._failures[key] < MAX_FRAME_ATTEMPTS:
+                return
+            del self._failures[key]
+            self._settle(index, marker)
+        print(f"Skipping frame {path} after {MAX_FRAME_ATTEMPTS} failed attempts")
+
+    def start(self):
+        """
+        Start the background watcher (inotify if available, otherwise polling).
+        """
+        if self._thread is not None:
+            return self
+        libc = _load_inotify()
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC) if libc is not None else -1
+        if fd >= 0:
+            self.mode = "inotify"
+            target, args = self._watch_inotify, (libc, fd)
+        else:
+            self.mode = "polling"
+            target, args = self._watch_polling, ()
+        self._thread = threading.Thread(target=target, args=args, name="frame-index-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def _watch_polling(self):
+        while True:
+            time.sleep(self.poll_interval)
+            for index, directory in enumerate(self._dirs):
+                try:
+                    mtime = directory.stat().st_mtime_ns
+                except FileNotFoundError:
+                    mtime = None
+                if mtime != self._dir_mtimes[index]:
+                    self._scan(index)
+
+    def _watch_inotify(self, libc, fd: int):
+        watches = {}
+        missing = set(range(len(self._dirs)))
+
+        def add_missing_watches():
+            for index in list(missing):
+                wd = libc.inotify_add_watch(fd, str(self._dirs[index]).encode(), WATCH_MASK)
+                if wd >= 0:
+                    watches[wd] = index
+                    missing.discard(index)
+                    # Pick up anything written before the watch existed
+                    self._scan(index)
+
+        def drop_watch(wd: int):
+            # The directory was deleted, moved or unmounted; watch it again once it is back
+            index = watches.pop(wd, None)
+            if index is not None:
+                missing.add(index)
+                self._scan(index)
+
+        add_missing_watches()
+        while True:
+            ready, _, _ = select.select([fd], [], [], self.poll_interval)
+            if missing:
+                add_missing_watches()
+            if not ready:
+                continue
+            try:
+                data = os.read(fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                wd, mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + name_len]
+                offset += _EVENT_HEADER.size + name_len
+                if mask & IN_Q_OVERFLOW:
+                    for index in range(len(self._dirs)):
+                        self._scan(index)
+                    continue
+                if mask & IN_IGNORED:
+                    drop_watch(wd)
+                    continue
+                if mask & IN_MOVE_SELF:
+                    # The watch would follow the moved directory; IN_IGNORED follows the removal
+                    libc.inotify_rm_watch(fd, wd)
+                    continue
+                index = watches.get(wd)
+                if index is not None and name:
+                    self._update_file(index, name.rstrip(b"\0").decode("utf-8", "replace"))
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def get_frame_index() -> FrameIndex:
+    """
+    Process-wide frame index over data/lib_images, started on first use.
+    """
+    global _default_index
+    with _default_lock:
+        if _default_index is None:
+            _default_index = FrameIndex().start()
+        return _default_index
@@ -0,0 +1,236 @@
+import hashlib
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from ultralytics import YOLO
+
+# Pluggable inference backends for the people counter
+#   "torch"    - the PyTorch weights as shipped (models/yolo11n.pt)
+#   "onnx"     - ONNX Runtime, exported to models/yolo11n-<fingerprint>.onnx
+#   "openvino" - OpenVINO, exported to models/yolo11n-<fingerprint>_openvino_model/
+# With int8=True the exported model is quantized (OpenVINO via NNCF during
+# export, calibrated on the library camera frames; ONNX via onnxruntime
+# dynamic quantization, which needs no calibration data). Exported artifacts
+# are cached next to the weights under a name that carries a fingerprint of
+# the weights and every export parameter, e.g. yolo11n_int8-3f2a9c01d4e7.onnx,
+# so new weights, another input size or int8 setting never reuse a stale
+# export; superseded artifacts are deleted. Every backend is wrapped in an
+# ultralytics YOLO object, so count_people_in_images produces the same
+# per-floor counts no matter which one is used.
+
+BACKENDS = ("torch", "onnx", "openvino")
+
+# Input size used for export; must match people_counter.INFERENCE_PARAMS
+EXPORT_IMGSZ = 640
+
+# Bump when the export recipe below changes, to invalidate cached artifacts
+EXPORT_RECIPE = 1
+
+# Frames the OpenVINO int8 export calibrates on
+CALIBRATION_IMAGES = "data/lib_images/*/floor*/frame*.png"
+
+
+def calibration_images(project_root=None) -> list:
+    """
+    Camera frames used to calibrate int8 quantization, sorted.
+    """
+    project_root = Path(project_root or Path(__file__).parent.parent)
+    return sorted(project_root.glob(CALIBRATION_IMAGES))
+
+
+def export_fingerprint(model_path, backend: str, int8: bool = False) -> str:
+    """
+    Short hash of the weights file and the export parameters of an artifact.
+    """
+    digest = hashlib.sha256()
+    with open(model_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    params = {"recipe": EXPORT_RECIPE, "backend": backend, "imgsz": EXPORT_IMGSZ, "int8": int8, "dynamic": True}
+    if backend == "openvino" and int8:
+        params["calibration"] = [f"{p.parent.parent.name}/{p.parent.name}/{p.name}:{p.stat().st_size}" for p in calibration_images()]
+    digest.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+def _artifact_name(stem: str, backend: str, tag: str) -> str:
+    if backend == "onnx":
+        return f"{stem}-{tag}.onnx"
+    return f"{stem}-{tag}_openvino_model"
+
+
+def exported_model_path(model_path, backend: str, int8: bool = False) -> Path:
+    """
+    Where the exported artifact for a backend lives (file or directory).
+    """
+    model_path = Path(model_path)
+    if backend == "torch":
+        return model_path
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend} (expected one of {', '.join(BACKENDS)})")
+    stem = f"{model_path.stem}_int8" if int8 else model_path.stem
+    return model_path.with_name(_artifact_name(stem, backend, export_fingerprint(model_path, backend, int8)))
+
+
+def _remove_stale_artifacts(model_path: Path, backend: str, int8: bool, keep: Path):
+    stem = f"{model_path.stem}_int8" if int8 else model_path.stem
+    # Fingerprinted exports of earlier weights/parameters, and unversioned ones
+    candidates = list(model_path.parent.glob(_artifact_name(stem, backend, "*")))
+    candidates.append(model_path.with_name(f"{stem}.onnx" if backend == "onnx" else f"{stem}_openvino_model"))
+    for path in candidates:
+        if path == keep or not path.exists():
+            continue
+        try:
+            if path.is_dir():
+                shutil.rmtree(path)
+            else:
+                path.unlink()
+            print(f"Removed stale {backend} export {path.name}")
+        except OSError as e:
+            print(f"Error removing stale export {path}: {e}")
+
+
+def _export_openvino_int8(model) -> Path:
+    """
+    OpenVINO int8 export calibrated on the library camera frames (NNCF needs
+    representative images; the ultralytics default would download COCO).
+    """
+    images = calibration_images()
+    if not images:
+        raise RuntimeError(f"OpenVINO int8 export needs calibration frames ({CALIBRATION_IMAGES}); none found")
+    with tempfile.TemporaryDirectory() as tmp:
+        # Copied so the dataset scan writes its label cache here, not into data/
+        folder = Path(tmp) / "images"
+        folder.mkdir()
+        for i, path in enumerate(images):
+            shutil.copyfile(path, folder / f"{i:05d}{path.suffix}")
+        dataset = Path(tmp) / "calibration.yaml"
+        dataset.write_text(json.dumps({
+            "path": tmp, "train": folder.name, "val": folder.name, "names": dict(model.names),
+        }))
+        return Path(model.export(format="openvino", imgsz=EXPORT_IMGSZ, dynamic=True, int8=True, data=str(dataset)))
+
+
+def export_model(model_path, backend: str, int8: bool = False) -> Path:
+    """
+    Export the PyTorch weights for a backend unless an artifact for the same
+    weights and export parameters is cached. Returns the artifact path.
+    """
+    model_path = Path(model_path)
+    target = exported_model_path(model_path, backend, int8)
+    if backend == "torch" or target.exists():
+        return target
+
+    print(f"🚀 Exporting {model_path.name} to {backend}{' (int8)' if int8 else ''}...")
+    model = YOLO(str(model_path))
+    if backend == "onnx":
+        # Dynamic batch so a whole tick can be sent in one call
+        exported = Path(model.export(format="onnx", imgsz=EXPORT_IMGSZ, dynamic=True, simplify=True))
+        if int8:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantize_dynamic(str(exported), str(target), weight_type=QuantType.QUInt8)
+            exported.unlink()
+            exported = target
+    elif int8:
+        exported = _export_openvino_int8(model)
+    else:
+        exported = Path(model.export(format="openvino", imgsz=EXPORT_IMGSZ, dynamic=True))
+
+    if exported != target:
+        exported.rename(target)
+    _remove_stale_artifacts(model_path, backend, int8, target)
+    return target
+
+
+def load_model(model_path, backend: str = "torch", int8: bool = False):
+    """
+    Load the detector for the selected backend, exporting it first if needed.
+
+    Returns:
+        (model, artifact_path) - artifact_path identifies the weights actually
+        used, e.g. for the result cache fingerprint
+    """
+    artifact = export_model(model_path, backend, int8)
+    model = YOLO(str(artifact), task="detect")
+    return model, artifact
+
+
+def compare_backends(model_path, image_paths: list, backends=None, runs: int = 3) -> list:
+    """
+    Measure per-image latency and count agreement of each backend against
+    the PyTorch baseline on the same images.
+
+    Args:
+        model_path: Path to the PyTorch weights
+        image_paths: Images to run (e.g. one frame per floor)
+        backends: List of (backend, int8) pairs, defaults to every combination
+        runs: Timed repetitions after one warm-up pass
+
+    Returns:
+        List of result dictionaries, baseline first
+    """
+    project_root = Path(__file__).parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+    from src import people_counter
+
+    if backends is None:
+        backends = [("torch", False), ("onnx", False), ("onnx", True), ("openvino", False), ("openvino", True)]
+    keys = [str(p) for p in image_paths]
+    _, images, _ = people_counter.load_images(keys, keys)
+
+    results = []
+    baseline = None
+    for backend, int8 in backends:
+        try:
+            model, artifact = load_model(model_path, backend, int8)
+        except Exception as e:
+            print(f"Skipping {backend}{' int8' if int8 else ''}: {e}")
+            continue
+
+        people = people_counter.infer_people(model, images)  # warm-up
+        batch_times = []
+        single_times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            people = people_counter.infer_people(model, images)
+            batch_times.append((time.perf_counter() - start) / len(images))
+            start = time.perf_counter()
+            for image in images:
+                people_counter.infer_people(model, [image])
+            single_times.append((time.perf_counter() - start) / len(images))
+
+        if baseline is None:
+            baseline = people
+        agree = sum(a == b for a, b in zip(people, baseline))
+        results.append({
+            "backend": backend,
+            "int8": int8,
+            "artifact": str(artifact),
+            "ms_per_image_batched": 1000 * min(batch_times),
+            "ms_per_image_single": 1000 * min(single_times),
+            "count_agreement": agree / len(images) if images else 1.0,
+            "mean_abs_count_diff": sum(abs(a - b) for a, b in zip(people, baseline)) / len(images) if images else 0.0,
+        })
+    return results
+
+
+if __name__ == "__main__":
+    # Compare all backends on frame1 of every floor:
+    #   python src/inference_backends.py [output.json]
+    project_root = Path(__file__).parent.parent
+    frames = sorted((project_root / "data/lib_images").glob("*/floor*/frame1.png"))
+    rows = compare_backends(project_root / "models/yolo11n.pt", frames)
+
+    print(f"{'backend':<16}{'batched ms/img':>16}{'single ms/img':>16}{'agreement':>12}{'mean |diff|':>14}")
+    for row in rows:
+        name = row["backend"] + (" int8" if row["int8"] else "")
+        print(f"{name:<16}{row['ms_per_image_batched']:>16.1f}{row['ms_per_image_single']:>16.1f}"
+              f"{row['count_agreement']:>12.0%}{row['mean_abs_count_diff']:>14.2f}")
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "w") as f:
+            json.dump(rows, f, indent=2)
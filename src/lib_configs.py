@@ -1,5 +1,10 @@
 # Library configuration data
 # This file contains the LIBRARIES constant used across the application
+# and the compiled REGISTRY built from it
+
+from array import array
+from types import MappingProxyType
+from typing import NamedTuple
 
 LIBRARIES = [
     {
@@ -68,3 +73,87 @@ LIBRARIES = [
     },
 ]
 
+
+
+# ---------- COMPILED REGISTRY ----------
+# LIBRARIES above is the human-edited source of truth. The registry below is
+# compiled from it once at import time and gives every module O(1) lookups
+# (column name, capacity, image path, library -> floors) through a stable
+# floor index, instead of re-walking the nested dicts and rebuilding
+# "{name} Floor {n}" strings on every tick.
+
+
+class FloorRecord(NamedTuple):
+    index: int            # stable floor index = position in REGISTRY.columns
+    library: str
+    library_index: int
+    floor: int
+    capacity: int
+    column: str           # CSV column name, "{library} Floor {floor}"
+    image_prefix: str     # "{library}/floor{floor}/frame" relative to data/lib_images
+    gate_threshold: float  # per-camera change threshold, or None for the default
+
+
+class LibraryRegistry:
+    """
+    Immutable, array-backed view of a LIBRARIES configuration.
+    """
+
+    __slots__ = (
+        "floors", "columns", "fieldnames", "capacities", "column_index", "floor_index",
+        "library_names", "library_index", "library_floors", "addresses",
+    )
+
+    def __init__(self, libraries: list):
+        floors = []
+        library_floors = []
+        for library_index, lib in enumerate(libraries):
+            indices = []
+            for floor_data in lib["floors"]:
+                index = len(floors)
+                floors.append(FloorRecord(
+                    index=index,
+                    library=lib["name"],
+                    library_index=library_index,
+                    floor=floor_data["floor"],
+                    capacity=floor_data["capacity"],
+                    column=f"{lib['name']} Floor {floor_data['floor']}",
+                    image_prefix=f"{lib['name']}/floor{floor_data['floor']}/frame",
+                    gate_threshold=floor_data.get("gate_threshold"),
+                ))
+                indices.append(index)
+            library_floors.append(tuple(indices))
+
+        set_ = object.__setattr__
+        set_(self, "floors", tuple(floors))
+        set_(self, "columns", tuple(f.column for f in floors))
+        set_(self, "fieldnames", ("timestamp",) + tuple(f.column for f in floors))
+        set_(self, "capacities", array("i", (f.capacity for f in floors)))
+        set_(self, "column_index", MappingProxyType({f.column: f.index for f in floors}))
+        set_(self, "floor_index", MappingProxyType({(f.library, f.floor): f.index for f in floors}))
+        set_(self, "library_names", tuple(lib["name"] for lib in libraries))
+        set_(self, "library_index", MappingProxyType({lib["name"]: i for i, lib in enumerate(libraries)}))
+        set_(self, "library_floors", tuple(library_floors))
+        set_(self, "addresses", tuple(lib.get("address") for lib in libraries))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("LibraryRegistry is immutable")
+
+    def __len__(self):
+        return len(self.floors)
+
+    def column_name(self, library: str, floor: int) -> str:
+        """
+        CSV column name for a library floor.
+        """
+        return self.columns[self.floor_index[(library, floor)]]
+
+
+def build_registry(libraries: list) -> LibraryRegistry:
+    """
+    Compile a LIBRARIES-style configuration (e.g. a scaled benchmark layout).
+    """
+    return LibraryRegistry(libraries)
+
+
+REGISTRY = build_registry(LIBRARIES)
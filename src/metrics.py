@@ -0,0 +1,291 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Lightweight metrics for the people counter (standard library only)
+# Histograms, counters and gauges, optionally with labels, kept in one
+# registry that can be
+#   - scraped in Prometheus text format from a local HTTP port (/metrics)
+#   - written periodically to a JSON file, including p50/p95 over the most
+#     recent WINDOW observations of every histogram
+# Counters and gauges can also be backed by a function, evaluated at export
+# time, so existing stats() methods (caches, gate, scheduler) and queue sizes
+# are exported without extra bookkeeping on the hot path.
+
+# Default latency buckets in seconds (upper bounds)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Observations kept per histogram series for the rolling percentiles in the JSON file
+WINDOW = 1024
+
+
+def _label_key(label_names: tuple, labels: dict) -> tuple:
+    return tuple(str(labels.get(name, "")) for name in label_names)
+
+
+def _format_labels(label_names: tuple, key: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(label_names, key)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, help_text: str, label_names: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}
+        self._functions = {}
+
+    def set_function(self, function, **labels):
+        """
+        Back a series by a function returning its current value (None = no value).
+        """
+        with self._lock:
+            self._functions[_label_key(self.label_names, labels)] = function
+
+    def _series(self) -> dict:
+        with self._lock:
+            series = dict(self._values)
+            functions = dict(self._functions)
+        for key, function in functions.items():
+            try:
+                value = function()
+            except Exception:
+                value = None
+            if value is not None:
+                series[key] = float(value)
+        return series
+
+    def prometheus_lines(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self._series().items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value:g}")
+        return lines
+
+    def snapshot(self):
+        series = self._series()
+        if not self.label_names:
+            return series.get((), 0.0)
+        return {",".join(key): value for key, value in sorted(series.items())}
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing count.
+    """
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """
+    Value that can go up and down.
+    """
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(self.label_names, labels)] = float(value)
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values (cumulative buckets, sum and count).
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {
+                    "buckets": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0, "recent": deque(maxlen=WINDOW),
+                }
+            state["buckets"][bisect_left(self.buckets, value)] += 1
+            state["sum"] += value
+            state["count"] += 1
+            state["recent"].append(value)
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe the wall time spent in a with-block.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _states(self) -> dict:
+        with self._lock:
+            return {
+                key: {"buckets": list(s["buckets"]), "sum": s["sum"], "count": s["count"], "recent": list(s["recent"])}
+                for key, s in self._values.items()
+            }
+
+    def prometheus_lines(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, state in sorted(self._states().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state["buckets"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = _format_labels(self.label_names, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {state['sum']:g}")
+            lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+    def snapshot(self):
+        result = {}
+        for key, state in sorted(self._states().items()):
+            recent = state["recent"]
+            result[",".join(key)] = {
+                "count": state["count"],
+                "sum": state["sum"],
+                "mean": state["sum"] / state["count"] if state["count"] else 0.0,
+                "p50": _percentile(recent, 0.50),
+                "p95": _percentile(recent, 0.95),
+                "max": max(recent) if recent else 0.0,
+            }
+        return result if self.label_names else result.get("", {})
+
+
+class MetricsRegistry:
+    """
+    Named collection of metrics with Prometheus and JSON export.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help_text: str, label_names: tuple, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, label_names, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str, label_names: tuple = ()) -> Counter:
+        return self._get(Counter, name, help_text, label_names)
+
+    def gauge(self, name: str, help_text: str, label_names: tuple = ()) -> Gauge:
+        return self._get(Gauge, name, help_text, label_names)
+
+    def histogram(self, name: str, help_text: str, label_names: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help_text, label_names, buckets=buckets)
+
+    def render_prometheus(self) -> str:
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.prometheus_lines())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """
+        All metrics as a JSON-serializable dictionary.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {"timestamp": time.time(), "metrics": {metric.name: metric.snapshot() for metric in metrics}}
+
+    def write_json(self, path):
+        """
+        Atomically replace `path` with the current snapshot.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def start_json_writer(self, path, interval: float) -> threading.Thread:
+        """
+        Rewrite the JSON snapshot file every `interval` seconds in a daemon thread.
+        """
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write_json(path)
+                except OSError as e:
+                    print(f"Could not write metrics file {path}: {e}")
+
+        thread = threading.Thread(target=run, name="metrics-json-writer", daemon=True)
+        thread.start()
+        return thread
+
+    def serve(self, port: int, host: str = "127.0.0.1"):
+        """
+        Serve /metrics (Prometheus text) and /metrics.json on a local HTTP port
+        from a daemon thread. Returns the server, or None if the port is taken.
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] == "/metrics":
+                    body = registry.render_prometheus().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif self.path.split("?")[0] == "/metrics.json":
+                    body = json.dumps(registry.snapshot()).encode("utf-8")
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            print(f"Could not start metrics endpoint on {host}:{port}: {e}")
+            return None
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+# Process-wide registry used by the people counter
+METRICS = MetricsRegistry()
@@ -0,0 +1,489 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import sys
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from email.utils import formatdate
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+from zoneinfo import ZoneInfo
+
+try:
+    from .lib_configs import REGISTRY
+    from . import occupancy_db, occupancy_log, occupancy_rollups, occupancy_store
+    from .settings import API_HOST, API_PORT, TICK_INTERVAL
+    from .availability import get_latest_occupancy_from_csv
+    from .snapshot_service import SnapshotService, get_snapshot
+except ImportError:
+    project_root = Path(__file__).parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+    from src.lib_configs import REGISTRY
+    from src import occupancy_db, occupancy_log, occupancy_rollups, occupancy_store
+    from src.settings import API_HOST, API_PORT, TICK_INTERVAL
+    from src.availability import get_latest_occupancy_from_csv
+    from src.snapshot_service import SnapshotService, get_snapshot
+
+# Read-only JSON API over the occupancy store
+# For the digital signage and the campus mobile app. Stdlib asyncio only, one
+# event loop, HTTP/1.1 keep-alive:
+#   GET /occupancy/latest                         every library and floor
+#   GET /occupancy/{library}                      one library (URL-encoded name)
+#   GET /occupancy/history?floor=&from=&to=       counts of one floor over time
+#       floor       column name, e.g. "Olin Library Floor 2"
+#       from, to    ISO timestamps (America/New_York wall clock like the CSV);
+#                   default: the hour before the newest row
+#       resolution  raw, 1min, 15min, 1h or auto (default: raw for short
+#                   windows, otherwise the finest rollup tier that fits)
+#
+# Current occupancy comes from the shared snapshot service (the counter
+# daemon's shared memory, or the CSV store). Every response carries an ETag
+# derived from the snapshot timestamp and body, and bodies are encoded once
+# per snapshot, so a kiosk polling with If-None-Match gets a bodiless 304
+# until the counter publishes new counts (the daemon publishes floors before
+# their row is persisted, so the timestamp alone does not identify the
+# content). History ETags are computed from the query before the store is
+# read, and closed windows that end before the newest row never change, so
+# their ETag does not depend on it.
+#
+#   python -m src.occupancy_api --port 8080
+
+PROJECT_ROOT = Path(__file__).parent.parent
+OCCUPANCY_CSV = PROJECT_ROOT / "data/library_occupancy.csv"
+TIMEZONE = ZoneInfo("America/New_York")
+
+# Default history window when `from` is omitted
+DEFAULT_WINDOW = timedelta(hours=1)
+# Longest raw series returned; longer windows must use a rollup resolution
+MAX_RAW_POINTS = 20000
+# Encoded history responses kept for identical polls
+HISTORY_CACHE_ENTRIES = 256
+# Idle keep-alive connections are closed after this many seconds
+KEEPALIVE_TIMEOUT = 30
+# Request line plus headers
+MAX_HEADER_BYTES = 16384
+
+REASONS = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _etag(*parts) -> str:
+    digest = hashlib.sha1("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    RFC 9110 weak comparison of an If-None-Match header against our ETag.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _encode(payload) -> bytes:
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def _parse_time(value: str, name: str):
+    """
+    Parse an ISO timestamp query parameter into a naive New York wall-clock datetime.
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPError(400, f"Invalid '{name}' timestamp: {value}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(TIMEZONE).replace(tzinfo=None)
+    return parsed
+
+
+# ---------- CURRENT OCCUPANCY ----------
+
+def floor_payload(floor) -> dict:
+    return {
+        "floor": floor.floor,
+        "capacity": floor.capacity,
+        "occupied": floor.occupied,
+        "available": floor.available,
+        "rate": round(floor.rate, 4),
+        "level": floor.level,
+        "stale": floor.stale,
+    }
+
+
+def library_payload(lib) -> dict:
+    return {
+        "name": lib.name,
+        "address": lib.address,
+        "capacity": lib.capacity,
+        "occupied": lib.occupied,
+        "available": lib.available,
+        "rate": round(lib.rate, 4),
+        "level": lib.level,
+        "floors": [floor_payload(f) for f in lib.floors],
+    }
+
+
+class LatestResponses:
+    """
+    Encoded /occupancy/latest and /occupancy/{library} bodies with their ETags,
+    built at most once per snapshot version.
+    """
+
+    def __init__(self, snapshots=get_snapshot):
+        self._snapshots = snapshots
+        self._version = None
+        self._responses = {}
+
+    def get(self, library: str = None) -> tuple:
+        """
+        Args:
+            library: Library name, or None for every library
+
+        Returns:
+            (etag, body) of the current snapshot
+        """
+        snapshot = self._snapshots()
+        if snapshot.version != self._version:
+            self._version = snapshot.version
+            self._responses = {}
+        key = library or ""
+        response = self._responses.get(key)
+        if response is None:
+            # No row yet: the configured static data, tagged as such
+            stamp = snapshot.timestamp or f"static-{snapshot.version}"
+            if library is None:
+                payload = {
+                    "timestamp": snapshot.timestamp,
+                    "recommendation": list(snapshot.recommendation),
+                    "libraries": [library_payload(lib) for lib in snapshot.libraries],
+                }
+            else:
+                lib = snapshot.by_name.get(library)
+                if lib is None:
+                    raise HTTPError(404, f"Unknown library: {library}")
+                payload = {"timestamp": snapshot.timestamp, **library_payload(lib)}
+            body = _encode(payload)
+            response = (_etag(stamp, key, hashlib.sha1(body).hexdigest()), body)
+            self._responses[key] = response
+        return response
+
+    def latest_timestamp(self):
+        return self._snapshots().timestamp
+
+
+# ---------- HISTORY ----------
+
+def _raw_from_log(log_file: Path, column: str, start, end):
+    window = occupancy_log.read_window(log_file, start, end)
+    if column not in (window.dtype.names or ()):
+        return None
+    return [
+        {"timestamp": occupancy_log.from_epoch(epoch).isoformat(), "count": count}
+        for epoch, count in zip(window["timestamp"].tolist(), window[column].tolist())
+    ]
+
+
+def _raw_from_db(db_file: Path, floor_record, start, end) -> list:
+    rows = occupancy_db.query_range(db_file, floor_record.library, floor_record.floor, start, end)
+    return [{"timestamp": timestamp, "count": count} for timestamp, _, count in rows]
+
+
+def _raw_from_csv(csv_file: Path, column: str, start, end) -> list:
+    lo = start.isoformat() if start else None
+    hi = end.isoformat() if end else None
+    points = []
+    for row in occupancy_store.read_rows(csv_file):
+        timestamp = row.get("timestamp")
+        if not timestamp or (lo and timestamp < lo) or (hi and timestamp >= hi):
+            continue
+        try:
+            points.append({"timestamp": timestamp, "count": int(row[column])})
+        except (KeyError, ValueError, TypeError):
+            continue
+    return points
+
+
+def read_history(csv_file: Path, floor_record, start, end, resolution: str) -> list:
+    """
+    Counts of one floor in [start, end), read from the fastest store that has them:
+    the binary log or the SQLite database if it reaches back to `start`,
+    otherwise the CSV segments for raw points;
+    the rollup database for the 1min/15min/1h resolutions (only buckets that
+    lie entirely within the window).
+
+    Returns:
+        Raw points as {"timestamp", "count"}, or rollup buckets as
+        {"bucket", "min", "max", "mean", "last"}
+    """
+    if resolution != "raw":
+        rollups_file = occupancy_store.rollups_path_for(csv_file)
+        if not rollups_file.exists():
+            # The "rollups" storage backend is not enabled
+            return []
+        rows = occupancy_rollups.read_rollups(
+            rollups_file, resolution, start, end, floor_record.library, floor_record.floor
+        )
+        if end is not None:
+            # A bucket starting before `end` may also hold counts from after it
+            width = occupancy_rollups.TIERS[resolution][0]
+            rows = [row for row in rows if datetime.fromisoformat(row["bucket"]) + width <= end]
+        return [{key: row[key] for key in ("bucket", "min", "max", "mean", "last")} for row in rows]
+
+    # The log and the database only keep RAW_RETENTION; the CSV segments may
+    # reach further back, so a store is only used if it covers `start`
+    log_file = occupancy_store.log_path_for(csv_file)
+    if log_file.exists():
+        first = occupancy_log.first_timestamp(log_file)
+        if first is not None and first <= start:
+            points = _raw_from_log(log_file, floor_record.column, start, end)
+            if points is not None:
+                return points
+    db_file = occupancy_store.db_path_for(csv_file)
+    if db_file.exists():
+        oldest = occupancy_db.oldest_timestamp(db_file)
+        if oldest is not None and oldest <= start.isoformat():
+            return _raw_from_db(db_file, floor_record, start, end)
+    return _raw_from_csv(csv_file, floor_record.column, start, end)
+
+
+class HistoryQuery:
+    """
+    Validated /occupancy/history parameters.
+    """
+
+    RESOLUTIONS = ("raw", "auto", *occupancy_rollups.TIERS)
+
+    def __init__(self, params: dict, latest_timestamp, csv_file: Path = OCCUPANCY_CSV, registry=REGISTRY):
+        column = params.get("floor", "")
+        index = registry.column_index.get(column)
+        if index is None:
+            raise HTTPError(404 if column else 400, f"Unknown floor: {column}" if column else "Missing 'floor' parameter")
+        self.floor = registry.floors[index]
+
+        latest = _parse_time(latest_timestamp, "latest") if latest_timestamp else None
+        self.end = _parse_time(params.get("to"), "to")
+        self.start = _parse_time(params.get("from"), "from")
+        if self.start is None:
+            self.start = (self.end or latest or datetime.now(TIMEZONE).replace(tzinfo=None)) - DEFAULT_WINDOW
+        if self.end is not None and self.end <= self.start:
+            raise HTTPError(400, "'to' must be after 'from'")
+
+        resolution = params.get("resolution", "auto")
+        if resolution not in self.RESOLUTIONS:
+            raise HTTPError(400, f"Unknown resolution: {resolution} (use {', '.join(self.RESOLUTIONS)})")
+        span = (self.end or latest or self.start) - self.start
+        if resolution == "auto":
+            # Raw 5-second points for short windows, rollups when they exist for longer ones
+            short = span.total_seconds() <= occupancy_rollups.MAX_POINTS * TICK_INTERVAL
+            if short or not occupancy_store.rollups_path_for(csv_file).exists():
+                resolution = "raw"
+            else:
+                resolution = occupancy_rollups.pick_tier(self.start, self.start + span)
+        elif resolution == "raw" and span.total_seconds() > MAX_RAW_POINTS * TICK_INTERVAL:
+            raise HTTPError(400, f"Window too long for raw points; use resolution=auto or one of {', '.join(occupancy_rollups.TIERS)}")
+        self.resolution = resolution
+
+        # A window that closed before the newest row no longer changes
+        closed = self.end is not None and latest is not None and self.end <= latest
+        self.etag = _etag(
+            "history", self.floor.column, self.start.isoformat(), self.end.isoformat() if self.end else "",
+            resolution, "" if closed else latest_timestamp,
+        )
+
+    def payload(self, points: list) -> dict:
+        return {
+            "library": self.floor.library,
+            "floor": self.floor.floor,
+            "column": self.floor.column,
+            "from": self.start.isoformat(),
+            "to": self.end.isoformat() if self.end else None,
+            "resolution": self.resolution,
+            "points": points,
+        }
+
+
+# ---------- HTTP ----------
+
+class OccupancyAPI:
+    """
+    Routes requests to the occupancy endpoints and owns the response caches.
+    """
+
+    def __init__(self, csv_file: Path = OCCUPANCY_CSV, snapshots=None):
+        self.csv_file = Path(csv_file)
+        if snapshots is None:
+            # The process-wide service reads the default store (or the daemon's shared
+            # memory snapshot of it); another store gets its own, read from its files only
+            if self.csv_file == OCCUPANCY_CSV:
+                snapshots = get_snapshot
+            else:
+                snapshots = SnapshotService(lambda: get_latest_occupancy_from_csv(self.csv_file)).get
+        self.latest = LatestResponses(snapshots)
+        self._history = OrderedDict()
+
+    async def handle(self, method: str, target: str, headers: dict) -> tuple:
+        """
+        Returns:
+            (status, headers, body) of the response
+        """
+        if method not in ("GET", "HEAD"):
+            raise HTTPError(405, f"Method not allowed: {method}")
+        url = urlsplit(target)
+        path = url.path.rstrip("/")
+        if path == "/occupancy/latest":
+            etag, body = self.latest.get()
+        elif path == "/occupancy/history":
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            etag, body = await self._history_response(HistoryQuery(params, self.latest.latest_timestamp(), self.csv_file))
+        elif path.startswith("/occupancy/") and path.count("/") == 2:
+            etag, body = self.latest.get(unquote(path[len("/occupancy/"):]))
+        else:
+            raise HTTPError(404, f"Not found: {url.path}")
+
+        response_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if _etag_matches(headers.get("if-none-match", ""), etag):
+            return 304, response_headers, b""
+        response_headers["Content-Type"] = "application/json"
+        return 200, response_headers, body
+
+    async def _history_response(self, query: HistoryQuery) -> tuple:
+        body = self._history.get(query.etag)
+        if body is not None:
+            self._history.move_to_end(query.etag)
+            return query.etag, body
+        # Store reads (memmap, SQLite, CSV) block; keep them off the event loop
+        loop = asyncio.get_running_loop()
+        points = await loop.run_in_executor(
+            None, read_history, self.csv_file, query.floor, query.start, query.end, query.resolution
+        )
+        if query.resolution == "raw" and len(points) > MAX_RAW_POINTS:
+            raise HTTPError(400, f"More than {MAX_RAW_POINTS} raw points; use resolution=auto")
+        body = _encode(query.payload(points))
+        self._history[query.etag] = body
+        if len(self._history) > HISTORY_CACHE_ENTRIES:
+            self._history.popitem(last=False)
+        return query.etag, body
+
+
+async def _read_request(reader: asyncio.StreamReader):
+    """
+    Read a request line and headers. Returns (method, target, version, headers),
+    or None when the client closed the connection.
+    """
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEPALIVE_TIMEOUT)
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise HTTPError(431, "Request headers too large")
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    # Bodies are not used by any endpoint; drain a declared one to keep the stream in sync
+    length = headers.get("content-length", "0")
+    if length.isdigit() and int(length):
+        await reader.readexactly(int(length))
+    return method, target, version, headers
+
+
+def _response_head(status: int, headers: dict, length: int, keep_alive: bool) -> bytes:
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+    headers = {
+        **headers,
+        "Date": formatdate(usegmt=True),
+        "Access-Control-Allow-Origin": "*",
+        "Connection": "keep-alive" if keep_alive else "close",
+    }
+    if status != 304:
+        headers["Content-Length"] = str(length)
+    lines.extend(f"{name}: {value}" for name, value in headers.items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def serve_connection(api: OccupancyAPI, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            method, keep_alive = "GET", False
+            try:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, target, version, headers = request
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+                status, response_headers, body = await api.handle(method, target, headers)
+            except HTTPError as e:
+                status, response_headers, body = e.status, {"Content-Type": "application/json"}, _encode({"error": e.message})
+            except (asyncio.TimeoutError, ConnectionError):
+                break
+            except Exception as e:
+                print(f"❌ Occupancy API error: {e}")
+                status, response_headers, body = 500, {"Content-Type": "application/json"}, _encode({"error": "internal error"})
+            writer.write(_response_head(status, response_headers, len(body), keep_alive))
+            if method != "HEAD" and status != 304:
+                writer.write(body)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host: str = API_HOST, port: int = API_PORT, csv_file: Path = OCCUPANCY_CSV):
+    api = OccupancyAPI(csv_file)
+    server = await asyncio.start_server(
+        lambda reader, writer: serve_connection(api, reader, writer), host, port, limit=MAX_HEADER_BYTES
+    )
+    print(f"🌐 Occupancy API listening on http://{host}:{port}/occupancy/latest")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="JSON API for current and historical library occupancy")
+    parser.add_argument("--host", default=API_HOST, help="Interface to bind (default settings.API_HOST)")
+    parser.add_argument("--port", type=int, default=API_PORT, help="Port to listen on (default settings.API_PORT)")
+    parser.add_argument("--csv", type=Path, default=OCCUPANCY_CSV, help="Occupancy CSV store (other backends alongside it)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.csv))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
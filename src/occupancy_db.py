@@ -0,0 +1,174 @@
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+try:
+    from .lib_configs import REGISTRY
+except ImportError:
+    project_root = Path(__file__).parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+    from src.lib_configs import REGISTRY
+
+# SQLite time-series backend for occupancy history
+# Snapshots are stored in long format, one row per (timestamp, library, floor).
+# The database runs in WAL mode so the counter thread can commit while
+# Streamlit sessions read without blocking each other. Timestamps are the same
+# naive ISO strings as in the CSV, which sort and index chronologically.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS occupancy (
+    timestamp TEXT NOT NULL,
+    library TEXT NOT NULL,
+    floor INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (library, floor, timestamp)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_occupancy_timestamp ON occupancy (timestamp);
+"""
+
+# Snapshots per transaction when importing history
+BATCH_ROWS = 1000
+
+_local = threading.local()
+
+
+def connect(db_file: Path, schema: str = SCHEMA) -> sqlite3.Connection:
+    """
+    Return this thread's connection to db_file, creating the schema on first use.
+    """
+    db_file = Path(db_file)
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    key = str(db_file.resolve())
+    conn = connections.get(key)
+    if conn is None:
+        conn = sqlite3.connect(db_file, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(schema)
+        connections[key] = conn
+    return conn
+
+
+# CSV column name ("{name} Floor {n}") -> (library, floor), from the compiled registry
+_COLUMNS = {f.column: (f.library, f.floor) for f in REGISTRY.floors}
+
+
+def column_map() -> dict:
+    """
+    Map CSV column names ("{name} Floor {n}") to (library, floor).
+    """
+    return _COLUMNS
+
+
+def _long_rows(rows: list, columns: dict):
+    for row in rows:
+        timestamp = row["timestamp"]
+        for col_name, (library, floor) in columns.items():
+            value = row.get(col_name)
+            if value in (None, ""):
+                continue
+            try:
+                yield timestamp, library, floor, int(value)
+            except (ValueError, TypeError):
+                continue
+
+
+def append_rows(db_file: Path, rows: list):
+    """
+    Insert snapshot rows (dicts shaped like the CSV rows) in batched transactions.
+
+    Args:
+        db_file: Path to the SQLite database
+        rows: List of row dictionaries
+    """
+    conn = connect(db_file)
+    columns = column_map()
+    for i in range(0, len(rows), BATCH_ROWS):
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO occupancy (timestamp, library, floor, count) VALUES (?, ?, ?, ?)",
+                _long_rows(rows[i:i + BATCH_ROWS], columns),
+            )
+
+
+def append_row(db_file: Path, row_data: dict):
+    """
+    Insert one snapshot; all floors are committed in a single transaction.
+    """
+    append_rows(db_file, [row_data])
+
+
+def query_range(db_file: Path, library: str, floor: int = None, start=None, end=None) -> list:
+    """
+    Indexed range query, e.g. Olin Library floor 3 over the last 2 hours.
+
+    Args:
+        db_file: Path to the SQLite database
+        library: Library name as in LIBRARIES
+        floor: Floor number, or None for every floor of the library
+        start: datetime/ISO string lower bound (inclusive), or None
+        end: datetime/ISO string upper bound (exclusive), or None
+
+    Returns:
+        List of (timestamp, floor, count) tuples ordered by floor then time
+    """
+    sql = "SELECT timestamp, floor, count FROM occupancy WHERE library = ?"
+    params = [library]
+    if floor is not None:
+        sql += " AND floor = ?"
+        params.append(floor)
+    if start is not None:
+        sql += " AND timestamp >= ?"
+        params.append(start if isinstance(start, str) else start.isoformat())
+    if end is not None:
+        sql += " AND timestamp < ?"
+        params.append(end if isinstance(end, str) else end.isoformat())
+    sql += " ORDER BY floor, timestamp"
+    return connect(db_file).execute(sql, params).fetchall()
+
+
+def latest_row(db_file: Path):
+    """
+    Return the newest snapshot as a dictionary shaped like a CSV row, or None.
+    """
+    conn = connect(db_file)
+    rows = conn.execute(
+        "SELECT timestamp, library, floor, count FROM occupancy "
+        "WHERE timestamp = (SELECT MAX(timestamp) FROM occupancy)"
+    ).fetchall()
+    if not rows:
+        return None
+    row_data = {"timestamp": rows[0][0]}
+    for _, library, floor, count in rows:
+        index = REGISTRY.floor_index.get((library, floor))
+        if index is not None:
+            row_data[REGISTRY.columns[index]] = count
+    return row_data
+
+
+def oldest_timestamp(db_file: Path):
+    """
+    Return the timestamp (ISO string) of the oldest snapshot, or None if there is none.
+    """
+    return connect(db_file).execute("SELECT MIN(timestamp) FROM occupancy").fetchone()[0]
+
+
+def prune(db_file: Path, before) -> int:
+    """
+    Delete snapshots older than `before` (datetime/ISO string).
+
+    Returns:
+        Number of long-format rows deleted
+    """
+    conn = connect(db_file)
+    with conn:
+        cursor = conn.execute(
+            "DELETE FROM occupancy WHERE timestamp < ?",
+            (before if isinstance(before, str) else before.isoformat(),),
+        )
+    return cursor.rowcount
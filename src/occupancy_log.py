@@ -0,0 +1,381 @@
+import csv
+import json
+import os
+import struct
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+# Fixed-width binary occupancy log
+# Layout: a HEADER_SIZE-aligned header followed by packed records of
+#   int64 timestamp (UTC seconds since the epoch)
+#   int16 count per floor, in get_column_names() order
+# The file can be memory-mapped as a NumPy structured array, so history reads
+# slice the mapping instead of parsing CSV text. CSV stays an export format.
+#
+# Rows carry naive America/New_York wall-clock timestamps, which repeat an hour
+# at the DST fall-back. The writer stores true UTC instants (the second pass
+# through the repeated hour gets fold=1), so timestamps stay monotonic and
+# windows are found by binary search. Should a record still arrive out of
+# order (the clock stepped back), the header is flagged and readers fall back
+# to a linear scan until the next compaction re-sorts the log.
+#
+# Retention: once the log spans RETENTION + COMPACT_SLACK it is rewritten
+# with only the last RETENTION of records (atomically, via a temporary file),
+# so the file stays bounded like the rotated CSV segments.
+
+MAGIC = b"FLOCCLOG"
+VERSION = 2
+HEADER_SIZE = 4096
+# magic, version, header size, floor count, flags
+_HEADER_STRUCT = struct.Struct("<8sIIII")
+_FLAGS_OFFSET = 20
+# Some records are out of timestamp order; read_window scans instead of bisecting
+FLAG_UNSORTED = 1
+
+# Wall clock of the naive row timestamps (see people_counter)
+TIMEZONE = ZoneInfo("America/New_York")
+
+# Raw history kept in the log, like occupancy_store.RAW_RETENTION for SQLite
+RETENTION = timedelta(days=2)
+# How far the log may grow past RETENTION before it is compacted
+COMPACT_SLACK = timedelta(hours=6)
+
+_log_state = {}
+_log_lock = threading.Lock()
+
+
+def record_dtype(fieldnames: list) -> np.dtype:
+    """
+    Structured dtype for one record. Field names match the CSV columns,
+    so log["Olin Library Floor 3"] selects a floor just like the CSV header.
+    """
+    floor_columns = [name for name in fieldnames if name != "timestamp"]
+    return np.dtype([("timestamp", "<i8")] + [(name, "<i2") for name in floor_columns])
+
+
+def to_epoch(timestamp, after: int = None) -> int:
+    """
+    Encode a timestamp (datetime or ISO string) as UTC epoch seconds.
+    Naive values are America/New_York wall-clock time, like the CSV timestamps.
+
+    Args:
+        timestamp: Naive or aware datetime, or ISO string
+        after: Epoch of the previous record; a wall-clock time in the repeated
+            fall-back hour that would land before it is taken as the second pass
+    """
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    if timestamp.tzinfo is not None:
+        return int(timestamp.timestamp())
+    epoch = int(timestamp.replace(tzinfo=TIMEZONE).timestamp())
+    if after is not None and epoch < after:
+        second_pass = int(timestamp.replace(tzinfo=TIMEZONE, fold=1).timestamp())
+        if second_pass >= after:
+            return second_pass
+    return epoch
+
+
+def from_epoch(epoch: int) -> datetime:
+    """
+    Decode an epoch value from the log back into a naive America/New_York datetime.
+    """
+    return datetime.fromtimestamp(int(epoch), tz=timezone.utc).astimezone(TIMEZONE).replace(tzinfo=None)
+
+
+def _encode_header(fieldnames: list, flags: int = 0) -> bytes:
+    floor_columns = [name for name in fieldnames if name != "timestamp"]
+    columns = json.dumps(floor_columns).encode("utf-8")
+    size = HEADER_SIZE
+    while _HEADER_STRUCT.size + 4 + len(columns) > size:
+        size += HEADER_SIZE
+    header = _HEADER_STRUCT.pack(MAGIC, VERSION, size, len(floor_columns), flags)
+    header += struct.pack("<I", len(columns)) + columns
+    return header.ljust(size, b"\0")
+
+
+def read_header(log_file: Path):
+    """
+    Read the log header.
+
+    Returns:
+        (header_size, fieldnames, flags) or None if the file is missing or not a log
+    """
+    try:
+        with open(log_file, "rb") as f:
+            fixed = f.read(_HEADER_STRUCT.size + 4)
+            if len(fixed) < _HEADER_STRUCT.size + 4:
+                return None
+            magic, version, header_size, n_floors, flags = _HEADER_STRUCT.unpack_from(fixed)
+            if magic != MAGIC or version != VERSION:
+                return None
+            (columns_len,) = struct.unpack_from("<I", fixed, _HEADER_STRUCT.size)
+            floor_columns = json.loads(f.read(columns_len).decode("utf-8"))
+    except (OSError, ValueError):
+        return None
+    if len(floor_columns) != n_floors:
+        return None
+    return header_size, ["timestamp"] + floor_columns, flags
+
+
+def _write_log(log_file: Path, fieldnames: list, records: np.ndarray = None):
+    """
+    Atomically replace log_file with a log holding `records`, flagged unsorted
+    if they are not in time order. Readers that already mapped the old file
+    keep reading it.
+
+    Returns:
+        The header flags written
+    """
+    tmp_file = log_file.with_name(f".{log_file.name}.tmp")
+    flags = 0
+    if records is not None and len(records) > 1 and np.any(np.diff(records["timestamp"]) < 0):
+        flags = FLAG_UNSORTED
+    with open(tmp_file, "wb") as f:
+        f.write(_encode_header(fieldnames, flags))
+        if records is not None:
+            f.write(records.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, log_file)
+    return flags
+
+
+def _open_for_append(log_file: Path, fieldnames: list) -> dict:
+    """
+    Validate an existing log against fieldnames and trim a torn last record.
+    A log of another format version or written for a different library
+    configuration is moved aside.
+    """
+    header = read_header(log_file) if log_file.exists() else None
+    if header is None or header[1] != list(fieldnames):
+        if log_file.exists():
+            stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+            os.replace(log_file, log_file.with_name(f"{log_file.stem}.{stamp}{log_file.suffix}"))
+        _write_log(log_file, fieldnames)
+        header = read_header(log_file)
+
+    header_size, _, flags = header
+    dtype = record_dtype(fieldnames)
+    size = log_file.stat().st_size
+    extra = (size - header_size) % dtype.itemsize
+    if extra:
+        with open(log_file, "rb+") as f:
+            f.truncate(size - extra)
+            size -= extra
+
+    # Earliest and latest record times drive the DST fold choice, out-of-order
+    # detection and compaction; in a sorted log they are the first and last record
+    first_epoch = last_epoch = None
+    if size > header_size and flags & FLAG_UNSORTED:
+        timestamps = open_log(log_file)["timestamp"]
+        first_epoch, last_epoch = int(timestamps.min()), int(timestamps.max())
+        del timestamps
+    elif size > header_size:
+        with open(log_file, "rb") as f:
+            first_epoch = int(np.frombuffer(f.read(header_size + 8)[header_size:], "<i8")[0])
+            f.seek(size - dtype.itemsize)
+            last_epoch = int(np.frombuffer(f.read(8), "<i8")[0])
+    return {
+        "dtype": dtype, "fieldnames": list(fieldnames), "flags": flags,
+        "first_epoch": first_epoch, "last_epoch": last_epoch,
+    }
+
+
+def encode_rows(rows: list, fieldnames: list, after: int = None) -> np.ndarray:
+    """
+    Pack snapshot rows (dicts as written to the CSV) into log records.
+
+    Args:
+        rows: Row dictionaries, oldest first
+        fieldnames: List of column names
+        after: Epoch of the record preceding `rows` (resolves the repeated DST hour)
+    """
+    dtype = record_dtype(fieldnames)
+    records = np.zeros(len(rows), dtype=dtype)
+    for i, row in enumerate(rows):
+        after = records["timestamp"][i] = to_epoch(row["timestamp"], after=after)
+        for name in dtype.names[1:]:
+            try:
+                value = int(row.get(name, 0) or 0)
+            except (ValueError, TypeError):
+                value = 0
+            records[name][i] = max(-32768, min(32767, value))
+    return records
+
+
+def _compact(log_file: Path, state: dict, retention: timedelta):
+    """
+    Rewrite the log with only the records of the last `retention`, in time order.
+    """
+    log = open_log(log_file)
+    keep = np.array(log[log["timestamp"] >= state["last_epoch"] - int(retention.total_seconds())])
+    del log
+    keep = keep[np.argsort(keep["timestamp"], kind="stable")]
+    state["flags"] = _write_log(log_file, state["fieldnames"], keep)
+    # Bounds of what was kept, not of the last append (which may have stepped back)
+    if len(keep):
+        state["first_epoch"] = int(keep["timestamp"].min())
+        state["last_epoch"] = int(keep["timestamp"].max())
+    else:
+        state["first_epoch"] = state["last_epoch"] = None
+
+
+def append_rows(log_file: Path, rows: list, fieldnames: list, retention: timedelta = RETENTION):
+    """
+    Append snapshot rows to the binary log with a single write().
+    Readers only map whole records, so a concurrent read never sees a
+    partially written record.
+
+    Args:
+        log_file: Path to the .bin log
+        rows: List of row dictionaries (same shape as the CSV rows)
+        fieldnames: List of column names
+        retention: History kept when the log is compacted
+    """
+    if not rows:
+        return
+    log_file = Path(log_file)
+    key = str(log_file.resolve())
+
+    with _log_lock:
+        state = _log_state.get(key)
+        if state is None or state["fieldnames"] != list(fieldnames) or not log_file.exists():
+            state = _open_for_append(log_file, fieldnames)
+            _log_state[key] = state
+
+        records = encode_rows(rows, fieldnames, after=state["last_epoch"])
+        timestamps = records["timestamp"]
+        out_of_order = (state["last_epoch"] is not None and timestamps[0] < state["last_epoch"]) or (
+            len(records) > 1 and np.any(np.diff(timestamps) < 0)
+        )
+
+        if out_of_order and not state["flags"] & FLAG_UNSORTED:
+            # Flag before the record lands so no reader bisects unsorted data.
+            # Not through the O_APPEND descriptor: that would append the flag.
+            state["flags"] |= FLAG_UNSORTED
+            with open(log_file, "rb+") as f:
+                f.seek(_FLAGS_OFFSET)
+                f.write(struct.pack("<I", state["flags"]))
+                f.flush()
+                os.fsync(f.fileno())
+
+        fd = os.open(log_file, os.O_WRONLY | os.O_APPEND)
+        try:
+            os.write(fd, records.tobytes())
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+        # The latest time so far: a later record before it leaves the log unsorted
+        first, last = int(timestamps.min()), int(timestamps.max())
+        state["first_epoch"] = first if state["first_epoch"] is None else min(state["first_epoch"], first)
+        state["last_epoch"] = last if state["last_epoch"] is None else max(state["last_epoch"], last)
+        if state["last_epoch"] - state["first_epoch"] > (retention + COMPACT_SLACK).total_seconds():
+            try:
+                _compact(log_file, state, retention)
+            except OSError as e:
+                # e.g. Windows refuses to replace a file a reader has mapped; retried next append
+                print(f"Error compacting binary occupancy log: {e}")
+
+
+def append_row(log_file: Path, row_data: dict, fieldnames: list, retention: timedelta = RETENTION):
+    """
+    Append a single snapshot row to the binary log.
+    """
+    append_rows(log_file, [row_data], fieldnames, retention)
+
+
+def _map(log_file: Path) -> tuple:
+    header = read_header(log_file)
+    if header is None:
+        return np.zeros(0, dtype=record_dtype(["timestamp"])), 0
+    header_size, fieldnames, flags = header
+    dtype = record_dtype(fieldnames)
+    n_records = (Path(log_file).stat().st_size - header_size) // dtype.itemsize
+    if n_records <= 0:
+        return np.zeros(0, dtype=dtype), flags
+    return np.memmap(log_file, dtype=dtype, mode="r", offset=header_size, shape=(n_records,)), flags
+
+
+def open_log(log_file: Path) -> np.ndarray:
+    """
+    Memory-map the log as a read-only NumPy structured array.
+    Nothing is read from disk until the returned array is sliced.
+    Returns an empty array if the log does not exist yet.
+    """
+    return _map(log_file)[0]
+
+
+def read_window(log_file: Path, start=None, end=None) -> np.ndarray:
+    """
+    Return the zero-copy slice of records with start <= timestamp < end.
+
+    Args:
+        log_file: Path to the .bin log
+        start: datetime/ISO string lower bound (inclusive), or None
+        end: datetime/ISO string upper bound (exclusive), or None
+
+    Returns:
+        Structured array view into the memory map (a copy, in log order,
+        while the log is flagged unsorted)
+    """
+    log, flags = _map(log_file)
+    if len(log) == 0:
+        return log
+    timestamps = log["timestamp"]
+    if flags & FLAG_UNSORTED:
+        mask = np.ones(len(log), dtype=bool)
+        if start is not None:
+            mask &= timestamps >= to_epoch(start)
+        if end is not None:
+            mask &= timestamps < to_epoch(end)
+        return log[mask]
+    lo = 0 if start is None else int(np.searchsorted(timestamps, to_epoch(start), side="left"))
+    hi = len(log) if end is None else int(np.searchsorted(timestamps, to_epoch(end), side="left"))
+    return log[lo:hi]
+
+
+def first_timestamp(log_file: Path):
+    """
+    Return the time of the oldest record (naive America/New_York), or None if the log is empty.
+    """
+    log, flags = _map(log_file)
+    if len(log) == 0:
+        return None
+    timestamps = log["timestamp"]
+    return from_epoch(timestamps.min() if flags & FLAG_UNSORTED else timestamps[0])
+
+
+def latest_record(log_file: Path):
+    """
+    Return the newest record as a dictionary shaped like a CSV row, or None.
+    """
+    log = open_log(log_file)
+    if len(log) == 0:
+        return None
+    record = log[-1]
+    row = {"timestamp": from_epoch(record["timestamp"]).isoformat()}
+    for name in log.dtype.names[1:]:
+        row[name] = int(record[name])
+    return row
+
+
+def export_csv(log_file: Path, csv_file: Path, start=None, end=None) -> int:
+    """
+    Export a window of the binary log to a CSV file with the usual header.
+
+    Returns:
+        Number of rows written
+    """
+    window = read_window(log_file, start, end)
+    names = window.dtype.names
+    with open(csv_file, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(names)
+        for record in window:
+            writer.writerow([from_epoch(record[0]).isoformat()] + [int(v) for v in record.tolist()[1:]])
+    return len(window)
@@ -0,0 +1,182 @@
+import sys
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+try:
+    from . import occupancy_db
+except ImportError:
+    project_root = Path(__file__).parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+    from src import occupancy_db
+
+# Multi-resolution rollups of occupancy history
+# Every tick upserts the current bucket of each tier with min/max/sum/samples/
+# last per floor, so maintaining the rollups is O(1) per tick and an open
+# bucket survives a restart. Each tier has its own retention: fine tiers age out
+# quickly, the hourly tier is kept for a semester. Charts over a day or a week
+# read a few hundred pre-aggregated points instead of raw 5-second rows.
+
+# tier name -> (bucket width, retention)
+TIERS = {
+    "1min": (timedelta(minutes=1), timedelta(days=2)),
+    "15min": (timedelta(minutes=15), timedelta(days=30)),
+    "1h": (timedelta(hours=1), timedelta(days=120)),
+}
+
+# Upper bound on points returned when a tier is picked for a time span
+MAX_POINTS = 400
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup (
+    tier TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    library TEXT NOT NULL,
+    floor INTEGER NOT NULL,
+    min_count INTEGER NOT NULL,
+    max_count INTEGER NOT NULL,
+    total_count INTEGER NOT NULL,
+    samples INTEGER NOT NULL,
+    last_count INTEGER NOT NULL,
+    PRIMARY KEY (tier, library, floor, bucket)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_rollup_bucket ON rollup (tier, bucket);
+"""
+
+UPSERT = """
+INSERT INTO rollup (tier, bucket, library, floor, min_count, max_count, total_count, samples, last_count)
+VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?)
+ON CONFLICT (tier, library, floor, bucket) DO UPDATE SET
+    min_count = MIN(min_count, excluded.min_count),
+    max_count = MAX(max_count, excluded.max_count),
+    total_count = total_count + excluded.total_count,
+    samples = samples + 1,
+    last_count = excluded.last_count
+"""
+
+# Time of the last retention sweep per (database, tier)
+_last_prune = {}
+_prune_lock = threading.Lock()
+
+
+def bucket_start(timestamp: datetime, width: timedelta) -> datetime:
+    """
+    Start of the bucket containing timestamp. Widths must divide a day.
+    """
+    midnight = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    offset = (timestamp - midnight) // width * width
+    return midnight + offset
+
+
+def _upsert_params(rows: list, columns: dict):
+    for row in rows:
+        timestamp = datetime.fromisoformat(row["timestamp"])
+        for tier, (width, _) in TIERS.items():
+            bucket = bucket_start(timestamp, width).isoformat()
+            for col_name, (library, floor) in columns.items():
+                value = row.get(col_name)
+                if value in (None, ""):
+                    continue
+                try:
+                    count = int(value)
+                except (ValueError, TypeError):
+                    continue
+                yield tier, bucket, library, floor, count, count, count, count
+
+
+def _prune(conn, db_key: str, latest: datetime):
+    """
+    Apply tier retention, at most once per bucket width for each tier.
+    """
+    for tier, (width, retention) in TIERS.items():
+        with _prune_lock:
+            last = _last_prune.get((db_key, tier))
+            if last is not None and latest - last < width:
+                continue
+            _last_prune[(db_key, tier)] = latest
+        with conn:
+            conn.execute(
+                "DELETE FROM rollup WHERE tier = ? AND bucket < ?",
+                (tier, (latest - retention).isoformat()),
+            )
+
+
+def update_rollups(db_file: Path, rows: list):
+    """
+    Fold snapshot rows (dicts shaped like the CSV rows) into every tier
+    in a single transaction, then apply retention if a sweep is due.
+
+    Args:
+        db_file: Path to the rollup SQLite database
+        rows: List of row dictionaries, oldest first
+    """
+    if not rows:
+        return
+    conn = occupancy_db.connect(db_file, SCHEMA)
+    with conn:
+        conn.executemany(UPSERT, _upsert_params(rows, occupancy_db.column_map()))
+    _prune(conn, str(Path(db_file).resolve()), datetime.fromisoformat(rows[-1]["timestamp"]))
+
+
+def pick_tier(start: datetime, end: datetime) -> str:
+    """
+    Finest tier that covers [start, end) in at most MAX_POINTS buckets.
+    """
+    span = end - start
+    for tier, (width, _) in TIERS.items():
+        if span / width <= MAX_POINTS:
+            return tier
+    return list(TIERS)[-1]
+
+
+def read_rollups(db_file: Path, tier: str, start=None, end=None, library: str = None, floor: int = None) -> list:
+    """
+    Read pre-aggregated buckets for charting.
+
+    Args:
+        db_file: Path to the rollup SQLite database
+        tier: One of TIERS ("1min", "15min", "1h")
+        start: datetime/ISO string lower bound on bucket start (inclusive), or None
+        end: datetime/ISO string upper bound on bucket start (exclusive), or None
+        library: Restrict to one library, or None for all
+        floor: Restrict to one floor of `library`, or None for all
+
+    Returns:
+        List of dictionaries with bucket, library, floor, min, max, mean, last
+    """
+    if tier not in TIERS:
+        raise ValueError(f"Unknown rollup tier: {tier}")
+    sql = (
+        "SELECT bucket, library, floor, min_count, max_count, total_count, samples, last_count "
+        "FROM rollup WHERE tier = ?"
+    )
+    params = [tier]
+    if start is not None:
+        sql += " AND bucket >= ?"
+        params.append(start if isinstance(start, str) else start.isoformat())
+    if end is not None:
+        sql += " AND bucket < ?"
+        params.append(end if isinstance(end, str) else end.isoformat())
+    if library is not None:
+        sql += " AND library = ?"
+        params.append(library)
+        if floor is not None:
+            sql += " AND floor = ?"
+            params.append(floor)
+    sql += " ORDER BY bucket, library, floor"
+
+    conn = occupancy_db.connect(db_file, SCHEMA)
+    return [
+        {
+            "bucket": bucket,
+            "library": lib_name,
+            "floor": floor_num,
+            "min": min_count,
+            "max": max_count,
+            "mean": total / samples if samples else 0.0,
+            "last": last_count,
+        }
+        for bucket, lib_name, floor_num, min_count, max_count, total, samples, last_count
+        in conn.execute(sql, params)
+    ]
@@ -0,0 +1,288 @@
+import hashlib
+import os
+import struct
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+
+try:
+    from .readiness import STATES
+except ImportError:
+    project_root = Path(__file__).parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+    from src.readiness import STATES
+
+# Latest occupancy snapshot in shared memory
+# The counter daemon (counter_daemon) publishes its snapshot (every row it
+# persists, and floor counts as soon as their inference chunk completes) into a
+# small multiprocessing.shared_memory segment; page processes map the same
+# segment and read the newest row without touching disk.
+#
+# Layout (little-endian):
+#   header  magic, layout version, column count, sequence, publish time,
+#           row timestamp (ISO, NUL padded), writer pid, layout hash,
+#           counter readiness (index into readiness.STATES) and when it was entered
+#   counts  int32 per registry column (-1 = no value)
+#   stale   uint8 per registry column, 1 while the count is an earlier one
+#           reused because the counter shed that floor (see tick_scheduler)
+#
+# Updates use a seqlock: the writer makes the sequence odd, writes the row and
+# makes it even again. A reader copies the row between two reads of the
+# sequence and retries if they differ or are odd, so it never sees a torn row
+# and never blocks the writer. Readers keep the last decoded row and return it
+# as long as the sequence has not moved.
+
+MAGIC = b"FLOC"
+RETIRED = b"DEAD"
+LAYOUT_VERSION = 3
+HEADER = struct.Struct("<4sIIQd32sQQ")
+SEQ_OFFSET = 12
+SEQ = struct.Struct("<Q")
+# Readiness follows the row header and is written on its own, outside the seqlock
+STATE = struct.Struct("<Id")
+STATE_OFFSET = HEADER.size
+COUNTS_OFFSET = HEADER.size + STATE.size
+MISSING = -1
+# Row key listing the columns whose count is stale (not a CSV column)
+STALE_KEY = "stale"
+READ_RETRIES = 100
+# Re-map the segment when the sequence has not moved for this long: a new
+# leader may have replaced a segment whose writer died without retiring it
+REATTACH_AFTER = 30.0
+
+
+def layout_hash(fieldnames) -> int:
+    """
+    64-bit fingerprint of a column layout; readers ignore snapshots written for another layout.
+    """
+    digest = hashlib.blake2b("\x1f".join(fieldnames).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def snapshot_name(project_root, configured: str = "") -> str:
+    """
+    Segment name: the configured one, or one derived from the project root so
+    separate checkouts on a host do not share a segment.
+    """
+    if configured:
+        return configured
+    return "futurelibs_" + hashlib.blake2b(str(project_root).encode("utf-8"), digest_size=5).hexdigest()
+
+
+def stale_offset(n_columns: int) -> int:
+    return COUNTS_OFFSET + 4 * n_columns
+
+
+def segment_size(n_columns: int) -> int:
+    return stale_offset(n_columns) + n_columns
+
+
+def _attach(name: str):
+    """
+    Map an existing segment without handing it to this process's resource
+    tracker, which would otherwise unlink it when a reader exits (Python < 3.13).
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+class SnapshotWriter:
+    """
+    Single writer of the snapshot segment (the elected counter leader).
+    """
+
+    def __init__(self, name: str, fieldnames):
+        self.name = name
+        self.fieldnames = list(fieldnames)
+        self.columns = self.fieldnames[1:]
+        self._hash = layout_hash(self.fieldnames)
+        size = segment_size(len(self.columns))
+        try:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by an earlier leader; reuse it if it has the right size
+            # (attached with tracking: the leader owns the segment and removes it on exit)
+            shm = shared_memory.SharedMemory(name=name)
+            if shm.size >= size and bytes(shm.buf[:4]) == MAGIC and struct.unpack_from("<I", shm.buf, 8)[0] == len(self.columns):
+                self._shm = shm
+            else:
+                self._retire(shm)
+                shm.unlink()
+                self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self._size = size
+        self._seq = SEQ.unpack_from(self._shm.buf, SEQ_OFFSET)[0] if bytes(self._shm.buf[:4]) == MAGIC else 0
+        # Stay even: an earlier leader may have died mid-update
+        self._seq += self._seq & 1
+        HEADER.pack_into(
+            self._shm.buf, 0, MAGIC, LAYOUT_VERSION, len(self.columns), self._seq, 0.0, b"", os.getpid(), self._hash
+        )
+        self.set_state(STATES[0])
+
+    @staticmethod
+    def _retire(shm):
+        # Attached readers detach and re-map the new segment
+        shm.buf[:4] = RETIRED
+        shm.close()
+
+    def set_state(self, state: str, detail: str = ""):
+        """
+        Publish the counter's readiness state (readiness.STATES); `detail` is not shared.
+        """
+        STATE.pack_into(self._shm.buf, STATE_OFFSET, STATES.index(state), time.time())
+
+    def publish(self, row: dict):
+        """
+        Make `row` (timestamp plus one value per column) the current snapshot.
+        Columns listed under row["stale"] are flagged as stale.
+        """
+        timestamp = row.get("timestamp", "")
+        if not isinstance(timestamp, str):
+            timestamp = timestamp.isoformat()
+        buf = self._shm.buf
+        self._seq += 1
+        SEQ.pack_into(buf, SEQ_OFFSET, self._seq)
+        stale = set(row.get(STALE_KEY, ()))
+        offset = stale_offset(len(self.columns))
+        with buf[COUNTS_OFFSET:offset].cast("i") as counts:
+            for i, column in enumerate(self.columns):
+                value = row.get(column)
+                try:
+                    counts[i] = int(value) if value not in (None, "") else MISSING
+                except (TypeError, ValueError):
+                    counts[i] = MISSING
+        buf[offset:self._size] = bytes(column in stale for column in self.columns)
+        HEADER.pack_into(
+            buf, 0, MAGIC, LAYOUT_VERSION, len(self.columns), self._seq, time.time(),
+            timestamp.encode("ascii")[:32], os.getpid(), self._hash,
+        )
+        self._seq += 1
+        SEQ.pack_into(buf, SEQ_OFFSET, self._seq)
+
+    def close(self, unlink: bool = True):
+        """
+        Release the segment; with unlink, remove it so readers fall back to disk.
+        """
+        if unlink:
+            self._shm.buf[:4] = RETIRED
+            self._shm.close()
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+        else:
+            self._shm.close()
+
+
+class SnapshotReader:
+    """
+    Lock-free reader of the snapshot segment, shared by all sessions of a page process.
+    """
+
+    def __init__(self, name: str, fieldnames):
+        self.name = name
+        self.fieldnames = list(fieldnames)
+        self.columns = self.fieldnames[1:]
+        self._hash = layout_hash(self.fieldnames)
+        self._shm = None
+        self._last_seq = None
+        self._last_row = None
+        self._changed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _open(self) -> bool:
+        if self._shm is not None:
+            return True
+        try:
+            shm = _attach(self.name)
+        except (FileNotFoundError, OSError):
+            return False
+        if shm.size < segment_size(len(self.columns)):
+            shm.close()
+            return False
+        self._shm = shm
+        return True
+
+    def _detach(self):
+        if self._shm is not None:
+            self._shm.close()
+        self._shm = None
+        self._last_seq = self._last_row = None
+
+    def read(self):
+        """
+        Latest snapshot as a row dictionary (like occupancy_store.read_latest_row)
+        plus the tuple of stale columns under "stale", or None if no counter
+        publishes one for this column layout.
+        """
+        with self._lock:
+            return self._read()
+
+    def _read(self):
+        if not self._open():
+            return None
+        buf = self._shm.buf
+        for _ in range(READ_RETRIES):
+            magic, version, n_columns, seq, _, timestamp, _, fingerprint = HEADER.unpack_from(buf, 0)
+            if magic != MAGIC:
+                # Segment retired by its writer; re-map on the next read
+                self._detach()
+                return None
+            if version != LAYOUT_VERSION or n_columns != len(self.columns) or fingerprint != self._hash:
+                return None
+            if seq == self._last_seq:
+                if time.monotonic() - self._changed_at > REATTACH_AFTER:
+                    row = self._last_row
+                    self._detach()
+                    self._changed_at = time.monotonic()
+                    return self._read() or row
+                return self._last_row
+            if seq & 1:
+                time.sleep(0)
+                continue
+            offset = stale_offset(len(self.columns))
+            with buf[COUNTS_OFFSET:offset].cast("i") as counts:
+                values = counts.tolist()
+            flags = bytes(buf[offset:segment_size(len(self.columns))])
+            if SEQ.unpack_from(buf, SEQ_OFFSET)[0] != seq:
+                continue
+            if seq == 0:
+                # Nothing published yet
+                return None
+            row = {"timestamp": timestamp.rstrip(b"\0").decode("ascii")}
+            for column, value in zip(self.columns, values):
+                if value != MISSING:
+                    row[column] = value
+            row[STALE_KEY] = tuple(column for column, flag in zip(self.columns, flags) if flag)
+            self._last_seq, self._last_row = seq, row
+            self._changed_at = time.monotonic()
+            return row
+        return self._last_row
+
+    def status(self) -> dict:
+        """
+        Publisher pid, sequence, seconds since the last publish, and the counter's
+        readiness state and since when (None when not attached).
+        """
+        with self._lock:
+            if not self._open():
+                return None
+            magic, version, _, seq, published, _, pid, _ = HEADER.unpack_from(self._shm.buf, 0)
+            if magic != MAGIC:
+                self._detach()
+                return None
+            if version != LAYOUT_VERSION:
+                return None
+            state, state_since = STATE.unpack_from(self._shm.buf, STATE_OFFSET)
+        return {
+            "pid": pid, "seq": seq, "age": time.time() - published if published else None,
+            "state": STATES[state] if state < len(STATES) else None, "state_since": state_since,
+        }
@@ -0,0 +1,340 @@
+import csv
+import io
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+try:
+    from . import occupancy_db, occupancy_log, occupancy_rollups
+    from .settings import STORAGE_BACKENDS
+except ImportError:
+    project_root = Path(__file__).parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+    from src import occupancy_db, occupancy_log, occupancy_rollups
+    from src.settings import STORAGE_BACKENDS
+
+# Occupancy history store
+# The active file (data/library_occupancy.csv) is append-only: every tick adds
+# exactly one line with a single write() call, so a write costs O(1) no matter
+# how much history is on disk. When the active file reaches SEGMENT_ROWS rows it
+# is renamed to a numbered segment (library_occupancy.000001.csv, ...) and a
+# fresh active file is published atomically. Retention is enforced by deleting
+# the oldest segments instead of rewriting rows.
+# Depending on settings.STORAGE_BACKENDS every snapshot is also written to a
+# fixed-width binary log (library_occupancy.bin, see occupancy_log) and/or a
+# SQLite database (library_occupancy.sqlite, see occupancy_db) next to the CSV,
+# and folded into 1-minute/15-minute/hourly rollups (occupancy_rollups).
+
+# One day of 5-second ticks per segment. Raw rows only need to cover recent
+# charts; longer horizons are served by the rollup tiers.
+SEGMENT_ROWS = 17280
+MAX_SEGMENTS = 2
+RAW_RETENTION = timedelta(days=2)
+_last_raw_prune = {}
+
+# Per-file state so the active segment is only scanned once per process
+_active_state = {}
+_store_lock = threading.Lock()
+
+# Latest-row cache keyed by (size, mtime) so every session shares one parse per tick
+TAIL_BLOCK_SIZE = 4096
+_latest_cache = {}
+_latest_lock = threading.Lock()
+
+
+def _segment_path(csv_file: Path, seq: int) -> Path:
+    return csv_file.with_name(f"{csv_file.stem}.{seq:06d}{csv_file.suffix}")
+
+
+def list_segments(csv_file: Path) -> list:
+    """
+    List the rotated segments of an occupancy CSV, oldest first.
+    The active file itself is not included.
+    """
+    csv_file = Path(csv_file)
+    segments = []
+    for path in csv_file.parent.glob(f"{csv_file.stem}.*{csv_file.suffix}"):
+        seq = path.name[len(csv_file.stem) + 1:-len(csv_file.suffix)]
+        if seq.isdigit():
+            segments.append((int(seq), path))
+    return [path for _, path in sorted(segments)]
+
+
+def _format_line(values: list) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(values)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _publish_header(csv_file: Path, fieldnames: list):
+    """
+    Atomically replace csv_file with a header-only file.
+    Readers see either the old file or the new one, never a partial header.
+    """
+    tmp_file = csv_file.with_name(f".{csv_file.name}.tmp")
+    with open(tmp_file, "wb") as f:
+        f.write(_format_line(fieldnames))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, csv_file)
+
+
+def _open_active(csv_file: Path, fieldnames: list) -> dict:
+    """
+    Inspect the active file once: validate its header, drop a torn last line
+    left behind by a crash, and count the rows already stored.
+    """
+    if not csv_file.exists() or csv_file.stat().st_size == 0:
+        _publish_header(csv_file, fieldnames)
+        return {"rows": 0}
+
+    with open(csv_file, "rb+") as f:
+        header = next(csv.reader([f.readline().decode("utf-8")]), [])
+        if header != list(fieldnames):
+            # Library configuration changed - keep the old data as a segment
+            f.close()
+            _rotate(csv_file, fieldnames)
+            return {"rows": 0}
+
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            # A crash interrupted the last append; cut back to the last full row
+            keep = data.rfind(b"\n") + 1
+            f.truncate(f.tell() - len(data) + keep)
+            data = data[:keep]
+
+    return {"rows": data.count(b"\n")}
+
+
+def _rotate(csv_file: Path, fieldnames: list):
+    """
+    Move the active file into the next numbered segment and start a new one.
+    Deletes the oldest segments beyond MAX_SEGMENTS.
+    """
+    segments = list_segments(csv_file)
+    next_seq = 1
+    if segments:
+        last = segments[-1]
+        next_seq = int(last.name[len(csv_file.stem) + 1:-len(csv_file.suffix)]) + 1
+
+    os.replace(csv_file, _segment_path(csv_file, next_seq))
+    _publish_header(csv_file, fieldnames)
+
+    segments = list_segments(csv_file)
+    for old in segments[:max(0, len(segments) - MAX_SEGMENTS)]:
+        try:
+            old.unlink()
+        except OSError as e:
+            print(f"Error removing old occupancy segment {old}: {e}")
+
+
+def append_row(csv_file: Path, row_data: dict, fieldnames: list):
+    """
+    Append a single snapshot row to the occupancy store.
+
+    The row is encoded up front and written with one write() on an O_APPEND
+    descriptor, then fsynced, so readers only ever see complete rows.
+
+    Args:
+        csv_file: Path to the active CSV file
+        row_data: Dictionary with row data
+        fieldnames: List of column names
+    """
+    csv_file = Path(csv_file)
+    line = _format_line([row_data.get(name, "") for name in fieldnames])
+    key = str(csv_file.resolve())
+
+    with _store_lock:
+        state = _active_state.get(key)
+        if state is None or state.get("fieldnames") != list(fieldnames) or not csv_file.exists():
+            state = _open_active(csv_file, fieldnames)
+            state["fieldnames"] = list(fieldnames)
+            _active_state[key] = state
+
+        if state["rows"] >= SEGMENT_ROWS:
+            _rotate(csv_file, fieldnames)
+            state["rows"] = 0
+
+        fd = os.open(csv_file, os.O_WRONLY | os.O_APPEND)
+        try:
+            os.write(fd, line)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        state["rows"] += 1
+
+
+def read_rows(csv_file: Path) -> list:
+    """
+    Read all stored rows, oldest first, across rotated segments and the
+    active file. Intended for history/export, not for the per-tick path.
+    """
+    csv_file = Path(csv_file)
+    rows = []
+    for path in list_segments(csv_file) + [csv_file]:
+        try:
+            with open(path, "r", newline="") as f:
+                text = f.read()
+        except FileNotFoundError:
+            continue
+        # Ignore a row that is still being written
+        if text and not text.endswith("\n"):
+            text = text[:text.rfind("\n") + 1]
+        rows.extend(csv.DictReader(io.StringIO(text)))
+    return rows
+
+
+def _read_last_line(path: Path):
+    """
+    Seek backwards from the end of a CSV file and return (header, last_line).
+    last_line is None when the file holds only a header. A trailing line
+    without a newline is still being written and is ignored.
+    """
+    with open(path, "rb") as f:
+        header = f.readline()
+        header_end = f.tell()
+        end = f.seek(0, os.SEEK_END)
+
+        tail = b""
+        pos = end
+        while pos > header_end:
+            step = min(TAIL_BLOCK_SIZE, pos - header_end)
+            pos -= step
+            f.seek(pos)
+            tail = f.read(step) + tail
+            # Need the newline ending the last full row plus the one before it
+            complete = tail[:tail.rfind(b"\n") + 1]
+            if complete.count(b"\n") >= 2 or (pos == header_end and complete):
+                break
+
+    complete = tail[:tail.rfind(b"\n") + 1]
+    if not complete:
+        return header, None
+    last_line = complete[complete.rfind(b"\n", 0, len(complete) - 1) + 1:]
+    return header, last_line
+
+
+def read_latest_row(csv_file: Path):
+    """
+    Return the most recent row of the occupancy store as a dictionary.
+
+    Only the header and the last few KB of the file are read. The parsed row
+    is memoized per file and keyed by size and mtime, so concurrent readers
+    share one parse per new tick. Falls back to the newest rotated segment
+    right after a rotation. Returns None if there is no data yet.
+    """
+    csv_file = Path(csv_file)
+
+    def candidates():
+        yield csv_file
+        # Only listed right after a rotation, when the active file has no rows yet
+        yield from list_segments(csv_file)[::-1]
+
+    for path in candidates():
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        version = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        key = str(path)
+
+        with _latest_lock:
+            cached = _latest_cache.get(key)
+        if cached is not None and cached[0] == version:
+            row = cached[1]
+        else:
+            try:
+                header, last_line = _read_last_line(path)
+            except OSError:
+                continue
+            row = None
+            if last_line is not None:
+                fieldnames = next(csv.reader([header.decode("utf-8")]), [])
+                values = next(csv.reader([last_line.decode("utf-8")]), [])
+                row = dict(zip(fieldnames, values))
+            with _latest_lock:
+                _latest_cache[key] = (version, row)
+
+        if row is not None:
+            return dict(row)
+    return None
+
+
+def log_path_for(csv_file: Path) -> Path:
+    """
+    Path of the binary occupancy log kept alongside an occupancy CSV.
+    """
+    return Path(csv_file).with_suffix(".bin")
+
+
+def db_path_for(csv_file: Path) -> Path:
+    """
+    Path of the SQLite occupancy database kept alongside an occupancy CSV.
+    """
+    return Path(csv_file).with_suffix(".sqlite")
+
+
+def rollups_path_for(csv_file: Path) -> Path:
+    """
+    Path of the rollup database kept alongside an occupancy CSV.
+    """
+    csv_file = Path(csv_file)
+    return csv_file.with_name(f"{csv_file.stem}_rollups.sqlite")
+
+
+def save_snapshot(csv_file: Path, row_data: dict, fieldnames: list, backends: list = None):
+    """
+    Persist one snapshot row: append it to the CSV store and every enabled
+    backend. A backend file that does not exist yet is back-filled from the
+    CSV history on its first write.
+
+    Args:
+        csv_file: Path to the active CSV file
+        row_data: Dictionary with row data
+        fieldnames: List of column names
+        backends: Backend names to write, defaults to settings.STORAGE_BACKENDS
+    """
+    if backends is None:
+        backends = STORAGE_BACKENDS
+
+    if "binlog" in backends:
+        log_file = log_path_for(csv_file)
+        try:
+            if log_file.exists():
+                occupancy_log.append_row(log_file, row_data, fieldnames, RAW_RETENTION)
+            else:
+                occupancy_log.append_rows(log_file, read_rows(csv_file) + [row_data], fieldnames, RAW_RETENTION)
+        except Exception as e:
+            print(f"Error writing binary occupancy log: {e}")
+
+    if "sqlite" in backends:
+        db_file = db_path_for(csv_file)
+        try:
+            if db_file.exists():
+                occupancy_db.append_row(db_file, row_data)
+            else:
+                occupancy_db.append_rows(db_file, read_rows(csv_file) + [row_data])
+
+            # Raw rows age out like the CSV segments; swept once an hour
+            now = datetime.fromisoformat(row_data["timestamp"])
+            last = _last_raw_prune.get(str(db_file))
+            if last is None or now - last >= timedelta(hours=1):
+                _last_raw_prune[str(db_file)] = now
+                occupancy_db.prune(db_file, now - RAW_RETENTION)
+        except Exception as e:
+            print(f"Error writing occupancy database: {e}")
+
+    if "rollups" in backends:
+        rollups_file = rollups_path_for(csv_file)
+        try:
+            if rollups_file.exists():
+                occupancy_rollups.update_rollups(rollups_file, [row_data])
+            else:
+                occupancy_rollups.update_rollups(rollups_file, read_rows(csv_file) + [row_data])
+        except Exception as e:
+            print(f"Error updating occupancy rollups: {e}")
+
+    append_row(csv_file, row_data, fieldnames)
@@ -1,186 +1,721 @@
 import threading
+import queue
 import time
 import sys
+from concurrent.futures import FIRST_COMPLETED, wait
 from datetime import datetime
 from zoneinfo import ZoneInfo
 from pathlib import Path
-from ultralytics import YOLO
-import csv
+import numpy as np
+import torch
 
-# Import LIBRARIES from lib_configs
+# Import the compiled library registry from lib_configs
 try:
-    from .lib_configs import LIBRARIES
+    from .lib_configs import REGISTRY
+    from . import inference_backends, occupancy_shm, occupancy_store, sharded_counter
+    from .batcher import MicroBatcher
+    from .metrics import METRICS
+    from .profiling import make_profiler
+    from .readiness import COUNTER_READINESS, STATES
+    from .sampling import SamplingScheduler
+    from .tick_scheduler import TickScheduler
+    from .frame_cache import IMGSZ, PAD_VALUE, FrameCache, decode_frame
+    from .frame_gate import FrameGate
+    from .frame_sources import get_frame_index
+    from .result_cache import ResultCache, model_fingerprint
+    from .settings import (
+        BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS, COUNTER_BACKEND, COUNTER_INT8, COUNTER_WORKERS, FRAME_CACHE_MB, FRAME_GATE, FRAME_SOURCE,
+        GATE_THRESHOLD, LOAD_SHEDDING, METRICS_JSON, METRICS_JSON_INTERVAL, METRICS_PORT, PROFILE_CYCLES, RESULT_CACHE, RESULT_CACHE_ENTRIES, SAMPLING_ADAPTIVE, SAMPLING_MAX_INTERVAL,
+        TICK_INTERVAL,
+    )
 except ImportError:
     project_root = Path(__file__).parent.parent
     if str(project_root) not in sys.path:
         sys.path.insert(0, str(project_root))
-    from src.lib_configs import LIBRARIES
+    from src.lib_configs import REGISTRY
+    from src import inference_backends, occupancy_shm, occupancy_store, sharded_counter
+    from src.batcher import MicroBatcher
+    from src.metrics import METRICS
+    from src.profiling import make_profiler
+    from src.readiness import COUNTER_READINESS, STATES
+    from src.sampling import SamplingScheduler
+    from src.tick_scheduler import TickScheduler
+    from src.frame_cache import IMGSZ, PAD_VALUE, FrameCache, decode_frame
+    from src.frame_gate import FrameGate
+    from src.frame_sources import get_frame_index
+    from src.result_cache import ResultCache, model_fingerprint
+    from src.settings import (
+        BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS, COUNTER_BACKEND, COUNTER_INT8, COUNTER_WORKERS, FRAME_CACHE_MB, FRAME_GATE, FRAME_SOURCE,
+        GATE_THRESHOLD, LOAD_SHEDDING, METRICS_JSON, METRICS_JSON_INTERVAL, METRICS_PORT, PROFILE_CYCLES, RESULT_CACHE, RESULT_CACHE_ENTRIES, SAMPLING_ADAPTIVE, SAMPLING_MAX_INTERVAL,
+        TICK_INTERVAL,
+    )
 
 def get_column_names():
     """
-    Generate the CSV column names based on the LIBRARIES configuration.
+    CSV column names based on the LIBRARIES configuration (via the compiled registry).
     """
-    columns = ["timestamp"]
-    for lib in LIBRARIES:
-        for floor_data in lib["floors"]:
-            columns.append(f"{lib['name']} Floor {floor_data['floor']}")
-    return columns
+    return list(REGISTRY.fieldnames)
 
 def append_row_to_csv(csv_file: Path, row_data: dict, fieldnames: list):
     """
-    Append a single row to the CSV file.
+    Append a single row to the occupancy store (constant time, see occupancy_store).
+    The row is also written to every enabled storage backend.
     """
-    MAX_ROWS = 500
-    rows = []
+    occupancy_store.save_snapshot(csv_file, row_data, fieldnames)
+
+# Parameters passed to every YOLO call (ultralytics defaults); part of the result cache fingerprint.
+# Frames are letterboxed to imgsz before they reach the model (frame_cache).
+INFERENCE_PARAMS = {"conf": 0.25, "iou": 0.7, "imgsz": IMGSZ}
+
+# Max items waiting between two pipeline stages; decode runs at most this far ahead
+PIPELINE_DEPTH = 2
+
+# Instrumentation (exported by metrics.METRICS, see start_metrics)
+STAGE_SECONDS = METRICS.histogram(
+    "people_counter_stage_seconds", "Time per tick spent in each pipeline stage", ("stage",)
+)
+CYCLE_SECONDS = METRICS.histogram(
+    "people_counter_cycle_seconds", "Time from a tick's deadline until its row was persisted"
+)
+IMAGES_LOADED = METRICS.counter("people_counter_images_loaded_total", "Frames read and decoded")
+IMAGES_INFERRED = METRICS.counter("people_counter_images_inferred_total", "Frames sent through the model")
+STAGE_ERRORS = METRICS.counter("people_counter_errors_total", "Pipeline items dropped after an error", ("stage",))
+CACHE_HITS = METRICS.counter("people_counter_cache_hits_total", "Frames served without inference or decoding", ("cache",))
+CACHE_MISSES = METRICS.counter("people_counter_cache_misses_total", "Cache lookups that missed", ("cache",))
+SKIPPED_FLOORS = METRICS.counter("people_counter_skipped_floors_total", "Floor counts not taken on a tick", ("reason",))
+TICKS = METRICS.counter("people_counter_ticks_total", "Ticks by outcome", ("outcome",))
+QUEUE_DEPTH = METRICS.gauge("people_counter_queue_depth", "Items waiting in front of a pipeline stage", ("stage",))
+STALE_FLOORS = METRICS.gauge("people_counter_stale_floors", "Floors whose last row reused an earlier count because they were shed")
+SECONDS_SINCE_ROW = METRICS.gauge("people_counter_seconds_since_last_row", "Age of the newest persisted row")
+MODEL_STATE = METRICS.gauge("people_counter_model_state", "Model readiness: 0 loading, 1 warming, 2 ready, 3 failed")
+MODEL_STATE.set_function(lambda: STATES.index(COUNTER_READINESS.state))
+
+def collect_image_paths(image_index, floors=None, registry=REGISTRY, frames=None):
+    """
+    Collect the frame to count for every library floor that has one.
+    In "demo" mode this is the i-th frame (image_index), in "spool" mode the newest
+    frame not processed yet (image_index is ignored); spool frames stay claimed
+    until settle_frames is called for them. Lookups go through the watched
+    frame index, so no file system calls are made per floor.
+    `floors` restricts the scan to a subset of registry floor indices (a worker shard).
+    `registry` and `frames` (a FrameIndex over it) default to the configured libraries.
+    Returns (keys, image_paths, mtimes) where keys are "Library Floor N" column names
+    and mtimes the indexed modification times of spool frames (so the frame cache needs
+    no stat call). Demo frames are rewritten in place, which the polling watcher cannot
+    see, so their mtime is None and the cache stats them.
+    """
+    if frames is None:
+        frames = get_frame_index()
+    spool = FRAME_SOURCE == "spool"
     
-    # Read existing data
-    if csv_file.exists():
+    image_paths = []
+    keys = []
+    mtimes = []
+    
+    for index in range(len(registry)) if floors is None else floors:
+        if spool:
+            entry = frames.newest_unprocessed(index)
+        else:
+            # data/lib_images/{LibName}/floor{N}/frame{i}.png, 1-based (frame1..frame9)
+            entry = frames.demo_frame(index, image_index), None
+        
+        if entry is not None and entry[0] is not None:
+            image_paths.append(entry[0])
+            mtimes.append(entry[1])
+            keys.append(registry.floors[index].column)
+        # Missing images are skipped; the row builder fills in a default later
+    
+    return keys, image_paths, mtimes
+
+def settle_frames(keys, image_paths, counts, registry=REGISTRY, frames=None):
+    """
+    In "spool" mode, mark the collected frames whose floor was counted as processed
+    and release the others (decode or inference failed), so they are retried.
+    """
+    if FRAME_SOURCE != "spool" or not keys:
+        return
+    if frames is None:
+        frames = get_frame_index()
+    for key, path in zip(keys, image_paths):
+        index = registry.column_index[key]
+        if key in counts:
+            frames.mark_processed(index, path)
+        else:
+            frames.release(index, path)
+
+def read_frame(path):
+    """
+    Read an image file once, returning (content_hash, letterboxed BGR image).
+    The image is None if the file cannot be decoded.
+    """
+    return decode_frame(path, IMGSZ)
+
+def load_images(keys, image_paths, frame_cache=None, mtimes=None):
+    """
+    Decode and letterbox images (BGR arrays), through the FrameCache if one is given.
+    `mtimes` are the files' modification times from the frame index; without them
+    the cache stats every file. Images that fail to decode are dropped together with their key.
+    Returns (keys, images, digests).
+    """
+    loaded_keys = []
+    images = []
+    digests = []
+    if mtimes is None:
+        mtimes = [None] * len(image_paths)
+    for key, path, mtime_ns in zip(keys, image_paths, mtimes):
         try:
-            with open(csv_file, 'r') as f:
-                reader = csv.DictReader(f)
-                rows = list(reader)
-        except Exception as e:
-            print(f"Error reading CSV for append: {e}")
-            pass
+            digest, image = frame_cache.load(path, mtime_ns) if frame_cache is not None else read_frame(path)
+        except OSError as e:
+            print(f"Could not read image: {e}")
+            continue
+        if image is None:
+            print(f"Could not decode image: {path}")
+            continue
+        loaded_keys.append(key)
+        images.append(image)
+        digests.append(digest)
+    IMAGES_LOADED.inc(len(images))
+    return loaded_keys, images, digests
+
+def infer_people(model, images):
+    """
+    Run YOLO on a batch of decoded images.
+    Returns the raw number of detected people per image.
+    """
+    if not images:
+        return []
+    tensor = to_tensor(images)
+    with STAGE_SECONDS.time(stage="inference"):
+        # verbose=False reduces console noise
+        results = model(tensor, verbose=False, **INFERENCE_PARAMS)
+    IMAGES_INFERRED.inc(len(images))
+    # Count people (class 0 in COCO dataset is 'person')
+    return [int((result.boxes.cls == 0).sum().item()) for result in results]
+
+def to_tensor(images):
+    """
+    Stack letterboxed BGR frames into the normalized RGB BCHW tensor YOLO consumes,
+    so ultralytics skips its own per-image preprocessing. Frames of other sizes are
+    passed through as a list and preprocessed by ultralytics.
+    """
+    if any(image.shape != (IMGSZ, IMGSZ, 3) for image in images):
+        return list(images)
+    with STAGE_SECONDS.time(stage="preprocess"):
+        batch = np.stack(images)[..., ::-1].transpose(0, 3, 1, 2)
+        return torch.from_numpy(np.ascontiguousarray(batch)).float().div_(255)
+
+def warm_up(model, batch_size=None):
+    """
+    Run the model once on a dummy batch of padding-colored frames, so lazy
+    initialization (weight upload, kernel selection, allocator growth) happens
+    before the counter reports ready instead of on the first tick.
+    """
+    if batch_size is None:
+        batch_size = min(BATCH_MAX_SIZE or len(REGISTRY), len(REGISTRY))
+    tensor = torch.full((max(1, batch_size), 3, IMGSZ, IMGSZ), PAD_VALUE / 255)
+    model(tensor, verbose=False, **INFERENCE_PARAMS)
+
+def make_frame_gate():
+    """
+    Build the change-detection gate from settings, or None if it is disabled.
+    Floors may set their own "gate_threshold" in LIBRARIES.
+    """
+    if not FRAME_GATE:
+        return None
+    thresholds = {f.column: f.gate_threshold for f in REGISTRY.floors if f.gate_threshold is not None}
+    return FrameGate(GATE_THRESHOLD, thresholds)
 
-    # Append new row
-    rows.append(row_data)
+def load_model(model_path):
+    """
+    Load the detector for the configured backend (settings.COUNTER_BACKEND).
+    Returns (model, artifact_path).
+    """
+    return inference_backends.load_model(model_path, COUNTER_BACKEND, COUNTER_INT8)
+
+def make_frame_cache():
+    """
+    Build the decoded frame cache from settings, or None if it is disabled.
+    """
+    if FRAME_CACHE_MB <= 0:
+        return None
+    return FrameCache(FRAME_CACHE_MB * 1024 * 1024, IMGSZ)
+
+def make_batcher(model, profiler=None):
+    """
+    Build the micro-batcher that runs all inference for `model`, or None if
+    batching is disabled (every tick is then sent to the model as one batch).
+    """
+    if BATCH_MAX_SIZE <= 0:
+        return None
     
-    # Prune if needed
-    if len(rows) > MAX_ROWS:
-        rows = rows[-MAX_ROWS:]
+    def run_batch(images):
+        if profiler is None:
+            return infer_people(model, images)
+        with profiler.section():
+            return infer_people(model, images)
     
-    # Write back entire file
-    with open(csv_file, 'w', newline='') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
+    return MicroBatcher(run_batch, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS / 1000)
 
-def count_people_in_images(model, image_index):
+def make_sampling_scheduler():
     """
-    Batch process images for the i-th frame (image_index) across all library floors.
-    Returns a dictionary mapping "Library Floor N" -> count.
+    Build the adaptive per-floor sampling scheduler, or None if every floor is
+    counted on every tick. The shortest interval is one tick.
     """
-    
+    if not SAMPLING_ADAPTIVE:
+        return None
+    return SamplingScheduler(TICK_INTERVAL, SAMPLING_MAX_INTERVAL)
+
+def make_result_cache(artifact_path):
+    """
+    Open the persistent result cache for this model, or None if it is disabled.
+    """
+    if not RESULT_CACHE:
+        return None
     project_root = Path(__file__).parent.parent
-    images_base_path = project_root / "data/lib_images"
+    # The x8 multiplier and capacity clamp are applied after the cache, so only
+    # the model, backend and inference parameters go into the fingerprint
+    fingerprint = model_fingerprint(
+        artifact_path, backend=COUNTER_BACKEND, int8=COUNTER_INT8, preprocess="letterbox", **INFERENCE_PARAMS
+    )
+    return ResultCache(project_root / "data/cache/inference_cache.sqlite", fingerprint, RESULT_CACHE_ENTRIES)
+
+def infer_people_gated(model, gate, keys, images, digests, cache=None, batcher=None, on_result=None):
+    """
+    Like infer_people, but avoids running the model where possible:
+    frames the gate considers unchanged reuse their floor's previous count,
+    and frames whose content hash is in the result cache reuse the cached count.
+    The remaining frames go through the MicroBatcher if one is given, and its
+    results are taken chunk by chunk as they complete.
+    `on_result(keys, people)` is called for every group of floors as soon as
+    their counts are known (gate and cache hits first, then each completed
+    chunk), so they can be published before the whole tick is done.
+    """
+    people = [None] * len(keys)
+    pending = list(range(len(keys)))
     
-    image_paths = []
-    keys = []
+    if gate is not None:
+        pending = []
+        for i, (key, image, digest) in enumerate(zip(keys, images, digests)):
+            people[i] = gate.check(key, digest, image)
+            if people[i] is None:
+                pending.append(i)
+    
+    def resolved(indices, update_gate=True):
+        if gate is not None and update_gate:
+            for i in indices:
+                gate.update(keys[i], digests[i], images[i], people[i])
+        if on_result is not None and indices:
+            on_result([keys[i] for i in indices], [people[i] for i in indices])
     
-    # Collect all image paths for the current index
-    for lib in LIBRARIES:
-        lib_name = lib["name"]
-        for floor_data in lib["floors"]:
-            floor_num = floor_data["floor"]
-            
-            # Construct expected image path: data/lib_images/{LibName}/floor{N}/frame{i}.png
-            # Note: frame index is 1-based (frame1..frame9)
-            img_path = images_base_path / lib_name / f"floor{floor_num}" / f"frame{image_index}.png"
-            
-            if img_path.exists():
-                image_paths.append(str(img_path))
-                keys.append(f"{lib_name} Floor {floor_num}")
-            else:
-                # If image missing, we can't count. We'll handle this gracefully (e.g. 0 or previous value)
-                # For batch inference, we skip it and handle the missing key later
-                pass
+    resolved([i for i in range(len(keys)) if people[i] is not None], update_gate=False)
+    
+    cached = cache.get_many([digests[i] for i in pending]) if cache is not None else {}
+    for i in pending:
+        if digests[i] in cached:
+            people[i] = cached[digests[i]]
+    resolved([i for i in pending if digests[i] in cached])
+    
+    to_infer = [i for i in pending if digests[i] not in cached]
+    if batcher is None:
+        for i, count in zip(to_infer, infer_people(model, [images[i] for i in to_infer])):
+            people[i] = count
+        resolved(to_infer)
+    else:
+        futures = {batcher.submit(images[i]): i for i in to_infer}
+        waiting = set(futures)
+        while waiting:
+            # A chunk's futures resolve together, so this returns one chunk at a time
+            done, waiting = wait(waiting, return_when=FIRST_COMPLETED)
+            indices = sorted(futures[future] for future in done)
+            for future in done:
+                people[futures[future]] = future.result()
+            resolved(indices)
+    
+    if cache is not None:
+        cache.put_many({digests[i]: people[i] for i in to_infer})
+    return people
+
+def postprocess_counts(keys, people_counts, registry=REGISTRY):
+    """
+    Turn raw detections into floor occupancy.
+    Returns a dictionary mapping "Library Floor N" -> count.
+    """
+    column_index = registry.column_index
+    capacities = registry.capacities
     
     counts = {}
+    for key, people_count in zip(keys, people_counts):
+        # Multiply by 8 as requested, clamped to the floor capacity
+        counts[key] = min(int(people_count * 8), capacities[column_index[key]])
+    return counts
+
+def count_people_in_images(model, image_index, floors=None, gate=None, cache=None, frame_cache=None, batcher=None,
+                           registry=REGISTRY, frames=None, on_counts=None):
+    """
+    Batch process images for the i-th frame (image_index) across all library floors
+    (or only the registry floor indices in `floors`). Unchanged frames are skipped if a
+    FrameGate is given, and previously seen images if a ResultCache is given; a
+    FrameCache avoids decoding the same file twice, and a MicroBatcher bounds the batch size.
+    `on_counts` optionally receives the counts of each group of floors (e.g. a batcher
+    chunk) as soon as they are known.
+    Returns a dictionary mapping "Library Floor N" -> count.
+    """
+    on_result = None
+    if on_counts is not None:
+        def on_result(result_keys, people):
+            on_counts(postprocess_counts(result_keys, people, registry))
     
-    if image_paths:
-        # Batch inference
-        # verbose=False reduces console noise
-        results = model(image_paths, verbose=False)
-        
-        for key, result in zip(keys, results):
-            # Count people (class 0 in COCO dataset is 'person')
-            # result.boxes.cls contains class indices
-            people_count = (result.boxes.cls == 0).sum().item()
-            
-            # Multiply by 8 as requested
-            final_count = int(people_count * 8)
-            
-            # Check capacity for this floor and clamp if needed
-            # We need to find the capacity for the library/floor corresponding to 'key'
-            # key format is "{LibName} Floor {N}"
-            for lib in LIBRARIES:
-                if lib["name"] in key:
-                    for floor_data in lib["floors"]:
-                        if f"{lib['name']} Floor {floor_data['floor']}" == key:
-                            capacity = floor_data["capacity"]
-                            if final_count > capacity:
-                                final_count = capacity
-                            break
-            
-            counts[key] = final_count
-            
+    keys, image_paths, mtimes = collect_image_paths(image_index, floors, registry, frames)
+    counts = {}
+    try:
+        loaded_keys, images, digests = load_images(keys, image_paths, frame_cache, mtimes)
+        counts = postprocess_counts(
+            loaded_keys, infer_people_gated(model, gate, loaded_keys, images, digests, cache, batcher, on_result), registry
+        )
+    finally:
+        settle_frames(keys, image_paths, counts, registry, frames)
     return counts
 
-def start_background_generator():
+def build_row(timestamp, counts, defaults=None, registry=REGISTRY):
+    """
+    Construct a CSV row from per-floor counts. Floors without a count take their
+    value from `defaults` (e.g. the previous row), or 0 if an image was missing.
+    """
+    defaults = defaults or {}
+    row_data = {"timestamp": timestamp.isoformat()}
+    for column in registry.columns:
+        row_data[column] = counts.get(column, defaults.get(column, 0))
+    return row_data
+
+def _run_stage(name, work, inbox, outbox=None, profiler=None, on_error=None):
+    """
+    Pipeline stage loop: take an item from inbox, process it, pass it on.
+    A failing item is dropped (after on_error(item)) so one bad frame does not
+    stall the pipeline.
+    """
+    QUEUE_DEPTH.set_function(inbox.qsize, stage=name)
+    while True:
+        item = inbox.get()
+        try:
+            with STAGE_SECONDS.time(stage=name), profiler.section():
+                item = work(item)
+        except Exception as e:
+            STAGE_ERRORS.inc(stage=name)
+            print(f"Error in people counter ({name} stage): {e}")
+            if on_error is not None:
+                on_error(item)
+            continue
+        if outbox is not None:
+            outbox.put(item)
+
+_metrics_started = threading.Event()
+
+def start_metrics(project_root):
+    """
+    Expose METRICS on the local HTTP port and as a rolling JSON file, as configured in settings.
+    Only the first call per process has an effect (the counter may be restarted).
+    """
+    if _metrics_started.is_set():
+        return
+    _metrics_started.set()
+    if METRICS_PORT > 0 and METRICS.serve(METRICS_PORT) is not None:
+        print(f"📈 Metrics at http://127.0.0.1:{METRICS_PORT}/metrics")
+    if METRICS_JSON:
+        METRICS.start_json_writer(project_root / METRICS_JSON, METRICS_JSON_INTERVAL)
+
+def _export_stats(metric, stats_fn, field, **labels):
+    """
+    Back a metric series by one field of a stats() method (which may be None or return None).
+    """
+    if stats_fn is not None:
+        metric.set_function(lambda: (stats_fn() or {}).get(field), **labels)
+
+def start_background_generator(publish=None):
     """
     Starts a background thread that generates occupancy data using YOLO.
+
+    Each tick flows through a pipeline of threads connected by bounded queues:
+    decode -> infer -> postprocess -> persist. Frame i+1 is read and decoded
+    while YOLO runs on frame i, and persistence overlaps the next inference,
+    so a cycle costs about as much as its slowest stage. When a stage falls
+    behind, the full queues block the decode stage (backpressure).
+
+    With settings.COUNTER_WORKERS > 0 the decode/infer/postprocess work runs
+    in worker processes that each own a shard of the floors (sharded_counter).
+    With adaptive sampling only the floors the SamplingScheduler reports as due
+    are counted on a tick; the others keep their last count.
+
+    Ticks follow a drift-free TickScheduler. When cycles overrun the tick
+    interval, low-priority floors are deferred (load shedding) and their last
+    count is reused; the published snapshot lists them under "stale" until
+    they are counted again.
+
+    Profiling sessions (profiling.Profiler) can be started at runtime with
+    FUTURELIBS_PROFILE=N, SIGUSR1 or the data/profiles/PROFILE control file.
+
+    Progress is reported through readiness.COUNTER_READINESS: loading while
+    the model loads, warming while it runs once on a dummy batch, then ready
+    (or failed, in which case the thread ends).
+
+    Each floor's count is published as soon as its inference chunk completes
+    (per shard in sharded mode), before the tick's row is persisted.
+
+    Args:
+        publish: Optional callable receiving the current snapshot row whenever
+            counts complete or a row is persisted (e.g. the shared-memory
+            snapshot writer of counter_daemon)
     """
+    project_root = Path(__file__).parent.parent
+    profiler = make_profiler(project_root, PROFILE_CYCLES)
+    # Only possible when called from the main thread (not under Streamlit)
+    if profiler.install_signal_handler():
+        print("🔬 Send SIGUSR1 to profile the people counter")
+    
     def run_loop():
-        project_root = Path(__file__).parent.parent
         output_file = project_root / "data/library_occupancy.csv"
         output_file.parent.mkdir(parents=True, exist_ok=True)
         
         model_path = project_root / "models/yolo11n.pt"
+        fieldnames = get_column_names()
+        COUNTER_READINESS.set("loading")
+
+        if COUNTER_WORKERS > 0:
+            # Worker processes decode, infer and postprocess their own shards
+            print(f"🚀 Starting sharded people counter with {COUNTER_WORKERS} workers...")
+            # Export once here so the workers do not race to create the same artifact
+            try:
+                inference_backends.export_model(model_path, COUNTER_BACKEND, COUNTER_INT8)
+            except Exception as e:
+                print(f"❌ Failed to export YOLO model: {e}")
+                COUNTER_READINESS.set("failed", f"export: {e}")
+                return
+            counter = sharded_counter.ShardedCounter(model_path, COUNTER_WORKERS)
+            # Workers load and warm up their models in parallel
+            COUNTER_READINESS.set("warming")
+            if counter.wait_ready() == 0:
+                COUNTER_READINESS.set("failed", "no inference worker started")
+                return
+            gate_stats = counter.gate_stats
+            cache_stats = counter.cache_stats
+            frame_stats = counter.frame_cache_stats
+            batch_stats = counter.batch_stats
+
+            def decode(frame_index, floors):
+                # Workers collect, count and settle their own frames
+                return [], [], [], ([], [])
+
+            def infer(item):
+                start = time.monotonic()
+                item["counts"] = counter.count(
+                    item["frame_index"], item["floors"], on_counts=lambda counts: publish_counts(item, counts)
+                )
+                ticker.record_inference(len(item["floors"]), time.monotonic() - start)
+                return item
+
+            def postprocess(item):
+                return item
+        else:
+            print(f"🚀 Loading YOLO model ({COUNTER_BACKEND}{' int8' if COUNTER_INT8 else ''})...")
+            # Load YOLO model
+            try:
+                model, artifact_path = load_model(model_path)
+            except Exception as e:
+                print(f"❌ Failed to load YOLO model: {e}")
+                COUNTER_READINESS.set("failed", str(e))
+                return
+            COUNTER_READINESS.set("warming")
+            try:
+                warm_up(model)
+            except Exception as e:
+                print(f"❌ YOLO warm-up failed: {e}")
+                COUNTER_READINESS.set("failed", f"warm-up: {e}")
+                return
+            gate = make_frame_gate()
+            gate_stats = gate.stats if gate is not None else None
+            cache = make_result_cache(artifact_path)
+            cache_stats = cache.stats if cache is not None else None
+            frame_cache = make_frame_cache()
+            frame_stats = frame_cache.stats if frame_cache is not None else None
+            batcher = make_batcher(model, profiler)
+            batch_stats = batcher.stats if batcher is not None else None
+
+            def decode(frame_index, floors):
+                keys, image_paths, mtimes = collect_image_paths(frame_index, floors)
+                try:
+                    loaded = load_images(keys, image_paths, frame_cache, mtimes)
+                except Exception:
+                    settle_frames(keys, image_paths, {})
+                    raise
+                # Spool frames are marked processed once the row is persisted
+                return (*loaded, (keys, image_paths))
+
+            def infer(item):
+                def on_result(result_keys, people):
+                    publish_counts(item, postprocess_counts(result_keys, people))
+
+                start = time.monotonic()
+                item["people"] = infer_people_gated(
+                    model, gate, item["keys"], item["images"], item["digests"], cache, batcher,
+                    on_result if publish is not None else None,
+                )
+                ticker.record_inference(len(item["floors"]), item["decode_seconds"] + time.monotonic() - start)
+                # Decoded images are no longer needed downstream
+                item["images"] = None
+                return item
+
+            def postprocess(item):
+                item["counts"] = postprocess_counts(item["keys"], item["people"])
+                return item
+
+        scheduler = make_sampling_scheduler()
+        ticker = TickScheduler(TICK_INTERVAL, LOAD_SHEDDING)
+        last_persisted = [time.monotonic()]
         
-        print("🚀 Loading YOLO model...")
-        # Load YOLO model
-        try:
-            model = YOLO(str(model_path))
-        except Exception as e:
-            print(f"❌ Failed to load YOLO model: {e}")
-            return
+        _export_stats(CACHE_HITS, gate_stats, "exact_hits", cache="gate_exact")
+        _export_stats(CACHE_HITS, gate_stats, "similar_hits", cache="gate_similar")
+        _export_stats(CACHE_MISSES, gate_stats, "misses", cache="gate")
+        _export_stats(CACHE_HITS, cache_stats, "hits", cache="result")
+        _export_stats(CACHE_MISSES, cache_stats, "misses", cache="result")
+        _export_stats(CACHE_HITS, frame_stats, "hits", cache="frame")
+        _export_stats(CACHE_MISSES, frame_stats, "misses", cache="frame")
+        _export_stats(SKIPPED_FLOORS, scheduler.stats if scheduler is not None else None, "skipped", reason="not_due")
+        _export_stats(SKIPPED_FLOORS, ticker.stats, "shed_floors", reason="shed")
+        _export_stats(TICKS, ticker.stats, "ticks", outcome="run")
+        _export_stats(TICKS, ticker.stats, "missed_ticks", outcome="missed")
+        _export_stats(TICKS, ticker.stats, "overruns", outcome="overrun")
+        _export_stats(STALE_FLOORS, ticker.stats, "stale_floors")
+        SECONDS_SINCE_ROW.set_function(lambda: time.monotonic() - last_persisted[0])
+        start_metrics(project_root)
+        # A floor without a fresh count (no new spool frame, not due, or shed)
+        # keeps its last count
+        last_row = {}
+        # Published snapshot: the newest count of every floor with the tick
+        # deadline it belongs to. Floors are published as soon as their chunk
+        # completes, so the snapshot can be ahead of the last persisted row.
+        live = {}
+        live_timestamp = [None]
+        # Column -> deadline of the last tick that shed it; the floor is stale
+        # until it has a count from that tick or a later one
+        shed = {}
+        publish_lock = threading.Lock()
 
-        fieldnames = get_column_names()
+        def publish_counts(item, counts):
+            if publish is None:
+                return
+            with publish_lock:
+                for column, count in counts.items():
+                    # An older tick persisted after a newer one was published must not undo it
+                    if column not in live or live[column][0] <= item["deadline"]:
+                        live[column] = (item["deadline"], count)
+                for column in item["shed"]:
+                    shed[column] = max(shed.get(column, item["deadline"]), item["deadline"])
+                for column in [c for c, deadline in shed.items() if c in live and live[c][0] >= deadline]:
+                    del shed[column]
+                if live_timestamp[0] is None or item["timestamp"] > live_timestamp[0]:
+                    live_timestamp[0] = item["timestamp"]
+                row = build_row(live_timestamp[0], {column: count for column, (_, count) in live.items()}, last_row)
+                row[occupancy_shm.STALE_KEY] = tuple(shed)
+                try:
+                    publish(row)
+                except Exception as e:
+                    print(f"Error publishing occupancy snapshot: {e}")
+
+        def persist(item):
+            if scheduler is not None:
+                scheduler.observe(item["counts"])
+            row = build_row(item["timestamp"], item["counts"], last_row)
+            append_row_to_csv(output_file, row, fieldnames)
+            settle_frames(*item["claims"], item["counts"])
+            last_row.update(row)
+            publish_counts(item, item["counts"])
+            ticker.record_cycle(item["deadline"], len(item["shed"]))
+            last_persisted[0] = time.monotonic()
+            CYCLE_SECONDS.observe(last_persisted[0] - item["deadline"])
+            gate_info = ""
+            stats = gate_stats() if gate_stats is not None else None
+            if stats:
+                hits = stats["exact_hits"] + stats["similar_hits"]
+                gate_info = f", gate hits {hits}/{hits + stats['misses']} ({stats['hit_rate']:.0%})"
+            stats = cache_stats() if cache_stats is not None else None
+            if stats:
+                gate_info += f", cache hits {stats['hits']}/{stats['hits'] + stats['misses']} ({stats['hit_rate']:.0%})"
+            stats = frame_stats() if frame_stats is not None else None
+            if stats:
+                gate_info += f", decoded frames cached {stats['hit_rate']:.0%} ({stats['bytes'] / 2**20:.0f} MiB, {stats['evictions']} evicted)"
+            stats = batch_stats() if batch_stats is not None else None
+            if stats:
+                gate_info += f", mean batch {stats['mean_batch_size']:.1f} (wait p95 {stats['wait_ms_p95']:.0f} ms)"
+            if scheduler is not None:
+                stats = scheduler.stats()
+                gate_info += f", sampled {stats['sampled_share']:.0%} (intervals {stats['min_interval']:.0f}-{stats['max_interval']:.0f}s)"
+            stats = ticker.stats()
+            if stats["overruns"] or stats["missed_ticks"]:
+                gate_info += (f", overruns {stats['overruns']}, missed ticks {stats['missed_ticks']}, "
+                              f"shed {stats['shed_floors']} floors, {stats['stale_floors']} stale")
+            source = "new frames" if FRAME_SOURCE == "spool" else f"frame{item['frame_index']}"
+            print(f"[{item['timestamp'].strftime('%H:%M:%S')}] Processed {source} (Batch size: {len(item['counts'])}{gate_info})")
+
+        decoded = queue.Queue(maxsize=PIPELINE_DEPTH)
+        inferred = queue.Queue(maxsize=PIPELINE_DEPTH)
+        counted = queue.Queue(maxsize=PIPELINE_DEPTH)
+        stages = [
+            ("infer", infer, decoded, inferred),
+            ("postprocess", postprocess, inferred, counted),
+            ("persist", persist, counted, None),
+        ]
+        def release_claims(item):
+            # Frames of a dropped tick are handed out again
+            settle_frames(*item["claims"], {})
+
+        for name, work, inbox, outbox in stages:
+            threading.Thread(
+                target=_run_stage, args=(name, work, inbox, outbox, profiler, release_claims),
+                name=f"people-counter-{name}", daemon=True,
+            ).start()
         
+        COUNTER_READINESS.set("ready")
         print(f"🚀 People counter started! Writing to {output_file}")
         
         # We cycle through frames 1 to 9
         frame_index = 1
         
+        # This thread is the decode stage and paces the pipeline
         while True:
             try:
-                start_time = time.time()
+                # Sleep until the next absolute deadline (missed ticks are skipped and counted)
+                deadline = ticker.wait()
+                profiler.start_cycle()
                 # Use Eastern Time, but keep naive format for CSV consistency
                 timestamp = datetime.now(ZoneInfo("America/New_York")).replace(microsecond=0, tzinfo=None)
                 
-                # Get counts for current frame index
-                counts = count_people_in_images(model, frame_index)
-                
-                # Construct row data
-                row_data = {"timestamp": timestamp.isoformat()}
+                floors = scheduler.due() if scheduler is not None else list(range(len(REGISTRY)))
+                floors, deferred = ticker.select(floors)
+                if scheduler is not None and deferred:
+                    scheduler.defer(deferred)
+                start = time.monotonic()
+                with profiler.section():
+                    keys, images, digests, claims = decode(frame_index, floors)
+                STAGE_SECONDS.observe(time.monotonic() - start, stage="load")
                 
-                # Fill in counts, defaulting to 0 if image was missing
-                # (Or could default to capacity/last value if preferred)
-                for lib in LIBRARIES:
-                    for floor_data in lib["floors"]:
-                        key = f"{lib['name']} Floor {floor_data['floor']}"
-                        row_data[key] = counts.get(key, 0)
-                
-                append_row_to_csv(output_file, row_data, fieldnames)
-                
-                print(f"[{timestamp.strftime('%H:%M:%S')}] Processed frame{frame_index} (Batch size: {len(counts)})")
+                # Blocks while downstream stages are still busy with earlier frames
+                decoded.put({
+                    "timestamp": timestamp, "deadline": deadline, "frame_index": frame_index, "floors": floors,
+                    "keys": keys, "images": images, "digests": digests, "claims": claims,
+                    "shed": [REGISTRY.columns[index] for index in deferred],
+                    "decode_seconds": time.monotonic() - start,
+                })
                 
                 # Cycle frame index 1-9
                 frame_index += 1
                 if frame_index > 9:
                     frame_index = 1
                 
-                # Wait for remainder of 5 seconds
-                elapsed = time.time() - start_time
-                sleep_time = max(0, 5 - elapsed)
-                time.sleep(sleep_time)
-                
             except Exception as e:
+                STAGE_ERRORS.inc(stage="load")
                 print(f"Error in people counter: {e}")
-                time.sleep(5)
+            profiler.end_cycle()
 
-    t = threading.Thread(target=run_loop, daemon=True)
+    t = threading.Thread(target=run_loop, name="people-counter-loop", daemon=True)
     t.start()
     return t
 
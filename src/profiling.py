@@ -0,0 +1,196 @@
+import cProfile
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+# On-demand profiling of the background people counter
+# A profiling session covers N cycles (ticks) of the counter's run loop and is
+# started without a restart by any of
+#   - FUTURELIBS_PROFILE=N in the environment (profile the first N cycles)
+#   - SIGUSR1 (only where the counter is started from the main thread; Streamlit
+#     runs app code in a script thread, where signal handlers cannot be installed)
+#   - creating the control file data/profiles/PROFILE (its content may give N)
+# During a session every pipeline thread runs its work under its own
+# cProfile.Profile, tracemalloc traces allocations, and a sampler thread
+# records the stacks of all threads. At the end the results are written to
+# data/profiles/ as timestamped files:
+#   {stamp}_{thread}.prof       cProfile stats (python -m pstats, snakeviz)
+#   {stamp}_tracemalloc.txt     top allocation growth since the session start
+#   {stamp}_tracemalloc.snap    full tracemalloc snapshot (tracemalloc.Snapshot.load)
+#   {stamp}_stacks.txt          sampled stacks in collapsed format (flamegraph.pl, speedscope)
+
+DEFAULT_CYCLES = 10
+CONTROL_FILE_NAME = "PROFILE"
+SAMPLE_INTERVAL = 0.01
+TRACEMALLOC_FRAMES = 25
+TOP_ALLOCATIONS = 50
+
+
+class Profiler:
+    """
+    Cycle-bounded profiling session controller for the counter pipeline.
+    """
+
+    def __init__(self, output_dir, default_cycles: int = DEFAULT_CYCLES):
+        self.output_dir = Path(output_dir)
+        self.control_file = self.output_dir / CONTROL_FILE_NAME
+        self.default_cycles = default_cycles
+        self._lock = threading.Lock()
+        self._requested = 0
+        self._cycles_left = 0
+        self._profiles = {}
+        self._stacks = Counter()
+        self._sampler = None
+        self._tracemalloc_started = False
+        self._start_snapshot = None
+        self.active = False
+
+    def request(self, cycles: int = None):
+        """
+        Ask for a session of `cycles` cycles, starting with the next cycle.
+        Safe to call from a signal handler.
+        """
+        self._requested = cycles or self.default_cycles
+
+    def install_signal_handler(self) -> bool:
+        """
+        Start a session on SIGUSR1. Returns False where that is not possible
+        (not the main thread, or no SIGUSR1 on this platform).
+        """
+        try:
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.request())
+            return True
+        except (AttributeError, ValueError):
+            return False
+
+    def _check_control_file(self):
+        try:
+            text = self.control_file.read_text().strip()
+        except FileNotFoundError:
+            return
+        except OSError:
+            text = ""
+        try:
+            self.control_file.unlink()
+        except OSError:
+            pass
+        self.request(int(text) if text.isdigit() else None)
+
+    def start_cycle(self):
+        """
+        Called by the run loop at the start of every cycle; starts a requested session.
+        """
+        if not self.active:
+            self._check_control_file()
+            if self._requested:
+                self._start(self._requested)
+                self._requested = 0
+
+    def end_cycle(self):
+        """
+        Called by the run loop at the end of every cycle; finishes the session after N cycles.
+        """
+        if self.active:
+            self._cycles_left -= 1
+            if self._cycles_left <= 0:
+                self._stop()
+
+    @contextmanager
+    def section(self):
+        """
+        Run a block under the calling thread's cProfile profile while a session is active.
+        """
+        if not self.active:
+            yield
+            return
+        name = threading.current_thread().name
+        with self._lock:
+            profile = self._profiles.setdefault(name, cProfile.Profile())
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows only one active cProfile at a time; the stack sampler still covers this thread
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+
+    def _start(self, cycles: int):
+        print(f"🔬 Profiling the people counter for {cycles} cycles...")
+        with self._lock:
+            self._profiles = {}
+            self._stacks = Counter()
+            self._cycles_left = cycles
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._tracemalloc_started = True
+        self._start_snapshot = tracemalloc.take_snapshot()
+        self.active = True
+        self._sampler = threading.Thread(target=self._sample_stacks, name="profiler-sampler", daemon=True)
+        self._sampler.start()
+
+    def _sample_stacks(self):
+        own_id = threading.get_ident()
+        while self.active:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                with self._lock:
+                    self._stacks[";".join(reversed(stack))] += 1
+            time.sleep(SAMPLE_INTERVAL)
+
+    def _stop(self):
+        self.active = False
+        self._sampler.join()
+        end_snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if self._tracemalloc_started:
+            tracemalloc.stop()
+            self._tracemalloc_started = False
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        with self._lock:
+            profiles, stacks = self._profiles, self._stacks
+        for name, profile in profiles.items():
+            safe_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+            profile.dump_stats(self.output_dir / f"{stamp}_{safe_name}.prof")
+
+        end_snapshot.dump(str(self.output_dir / f"{stamp}_tracemalloc.snap"))
+        with open(self.output_dir / f"{stamp}_tracemalloc.txt", "w") as f:
+            f.write(f"Top {TOP_ALLOCATIONS} allocation sites by growth during the session\n")
+            for stat in end_snapshot.compare_to(self._start_snapshot, "lineno")[:TOP_ALLOCATIONS]:
+                f.write(f"{stat}\n")
+            f.write(f"\nTraced memory: current {current / 2**20:.1f} MiB, peak {peak / 2**20:.1f} MiB\n")
+
+        with open(self.output_dir / f"{stamp}_stacks.txt", "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        self._start_snapshot = None
+        print(f"🔬 Profile written to {self.output_dir}/{stamp}_*")
+
+
+def make_profiler(project_root, cycles_from_env: int = 0) -> Profiler:
+    """
+    Profiler writing to data/profiles/, with a session already requested
+    if the environment asked for one (FUTURELIBS_PROFILE=N).
+    """
+    profiler = Profiler(Path(project_root) / "data/profiles")
+    if cycles_from_env > 0:
+        profiler.request(cycles_from_env)
+    return profiler
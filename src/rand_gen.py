@@ -4,10 +4,10 @@ from datetime import datetime, timedelta
 from pathlib import Path
 import sys
 
-# Import LIBRARIES from lib_configs
+# Import the compiled library registry from lib_configs
 # Handle both relative import (when used as module) and absolute import (when run as script)
 try:
-    from .lib_configs import LIBRARIES
+    from .lib_configs import REGISTRY
 except ImportError:
     # If relative import fails, try absolute import (for script execution)
     # Add project root to path if not already there
@@ -15,7 +15,7 @@ except ImportError:
     project_root_str = str(project_root)
     if project_root_str not in sys.path:
         sys.path.insert(0, project_root_str)
-    from src.lib_configs import LIBRARIES
+    from src.lib_configs import REGISTRY
 
 def generate_realistic_occupancy(capacity: int, base_occupancy_rate: float = None) -> int:
     """
@@ -58,12 +58,7 @@ def get_column_names():
     Generate column names for CSV based on all library-floor combinations.
     Returns list of column names: ['timestamp', 'Olin Library Floor 1', ...]
     """
-    columns = ["timestamp"]
-    for lib in LIBRARIES:
-        for floor_data in lib["floors"]:
-            col_name = f"{lib['name']} Floor {floor_data['floor']}"
-            columns.append(col_name)
-    return columns
+    return list(REGISTRY.fieldnames)
 
 
 def update_occupancy_csv(output_path: str = "data/library_occupancy.csv"):
@@ -85,20 +80,15 @@ def update_occupancy_csv(output_path: str = "data/library_occupancy.csv"):
     timestamp = datetime.now().isoformat()
     row_data = {"timestamp": timestamp}
     
-    for lib in LIBRARIES:
+    for floor_indices in REGISTRY.library_floors:
         # Use a base occupancy rate per library to add correlation between floors
         # (if one floor is busy, others in the same library might be too)
         library_base_rate = random.uniform(0.35, 0.65)
         
-        for floor_data in lib["floors"]:
-            capacity = floor_data["capacity"]
-            
-            # Generate realistic occupancy
-            occupied = generate_realistic_occupancy(capacity, library_base_rate)
-            
-            # Store in row with column name format: "Library Name Floor N"
-            col_name = f"{lib['name']} Floor {floor_data['floor']}"
-            row_data[col_name] = occupied
+        for index in floor_indices:
+            floor = REGISTRY.floors[index]
+            # Generate realistic occupancy, stored under the "Library Name Floor N" column
+            row_data[floor.column] = generate_realistic_occupancy(floor.capacity, library_base_rate)
     
     # Check if file exists to determine if we need headers
     file_exists = output_file.exists()
@@ -151,20 +141,15 @@ def generate_batch_occupancy_csv(
     for i in range(num_rows):
         row_data = {"timestamp": current_time.isoformat()}
         
-        for lib in LIBRARIES:
+        for floor_indices in REGISTRY.library_floors:
             # Use a base occupancy rate per library to add correlation between floors
             # (if one floor is busy, others in the same library might be too)
             library_base_rate = random.uniform(0.35, 0.65)
             
-            for floor_data in lib["floors"]:
-                capacity = floor_data["capacity"]
-                
-                # Generate realistic occupancy
-                occupied = generate_realistic_occupancy(capacity, library_base_rate)
-                
-                # Store in row with column name format: "Library Name Floor N"
-                col_name = f"{lib['name']} Floor {floor_data['floor']}"
-                row_data[col_name] = occupied
+            for index in floor_indices:
+                floor = REGISTRY.floors[index]
+                # Generate realistic occupancy, stored under the "Library Name Floor N" column
+                row_data[floor.column] = generate_realistic_occupancy(floor.capacity, library_base_rate)
         
         all_rows.append(row_data)
         
@@ -0,0 +1,60 @@
+import threading
+import time
+
+# Readiness of the people counter's model
+# The dashboard renders before the inference stack is imported and the model
+# is loaded, so pages report where the counter is instead of blocking on it.
+# This module is deliberately light (no ultralytics/torch) so pages can import it.
+#   loading  importing the inference stack and loading the weights
+#   warming  running the model once on a dummy batch (lazy initialization,
+#            kernel selection and allocator warm-up happen here, not on the first tick)
+#   ready    counting
+#   failed   loading or warm-up raised; `detail` holds the error
+
+STATES = ("loading", "warming", "ready", "failed")
+
+
+class Readiness:
+    """
+    Thread-safe readiness state with change listeners.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.state = "loading"
+        self.detail = ""
+        self.since = time.time()
+
+    def set(self, state: str, detail: str = ""):
+        """
+        Move to `state` and notify listeners (e.g. the shared-memory publisher).
+        """
+        if state not in STATES:
+            raise ValueError(f"Unknown readiness state: {state}")
+        with self._lock:
+            self.state, self.detail, self.since = state, detail, time.time()
+            listeners = list(self._listeners)
+        print(f"⏳ People counter {state}{': ' + detail if detail else ''}")
+        for listener in listeners:
+            try:
+                listener(state, detail)
+            except Exception as e:
+                print(f"Error publishing readiness state: {e}")
+
+    def subscribe(self, listener):
+        """
+        Call listener(state, detail) now and on every change.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+            state, detail = self.state, self.detail
+        listener(state, detail)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "detail": self.detail, "since": self.since}
+
+
+# Readiness of the people counter running in this process
+COUNTER_READINESS = Readiness()
@@ -1,5 +1,4 @@
 import time
-import csv
 import signal
 import sys
 import random
@@ -10,10 +9,11 @@ from pathlib import Path
 # Handle both relative import (when used as module) and absolute import (when run as script)
 try:
     from .rand_gen import (
-        LIBRARIES,
+        REGISTRY,
         generate_realistic_occupancy,
         get_column_names
     )
+    from . import occupancy_store
 except ImportError:
     # If relative import fails, try absolute import (for script execution)
     # Add project root to path if not already there
@@ -22,10 +22,11 @@ except ImportError:
     if project_root_str not in sys.path:
         sys.path.insert(0, project_root_str)
     from src.rand_gen import (
-        LIBRARIES,
+        REGISTRY,
         generate_realistic_occupancy,
         get_column_names
     )
+    from src import occupancy_store
 
 # Global flag for graceful shutdown
 running = True
@@ -51,19 +52,12 @@ def get_last_timestamp(csv_file: Path) -> datetime:
     Get the last timestamp from the CSV file.
     If file doesn't exist or is empty, return None.
     """
-    if not csv_file.exists():
+    row = occupancy_store.read_latest_row(csv_file)
+    if not row:
         return None
-    
     try:
-        with open(csv_file, 'r') as f:
-            reader = csv.DictReader(f)
-            rows = list(reader)
-            if not rows:
-                return None
-            # Get the last row's timestamp
-            last_timestamp_str = rows[-1]['timestamp']
-            return datetime.fromisoformat(last_timestamp_str)
-    except (KeyError, ValueError, IndexError):
+        return datetime.fromisoformat(row['timestamp'])
+    except (KeyError, ValueError, TypeError):
         return None
 
 
@@ -78,21 +72,16 @@ def generate_snapshot_row(timestamp: datetime) -> dict:
         Dictionary with timestamp and all library-floor occupancy data
     """
     row_data = {"timestamp": timestamp.isoformat()}
+    floors = REGISTRY.floors
     
-    for lib in LIBRARIES:
+    for floor_indices in REGISTRY.library_floors:
         # Use a base occupancy rate per library to add correlation between floors
         # (if one floor is busy, others in the same library might be too)
         library_base_rate = random.uniform(0.35, 0.65)
         
-        for floor_data in lib["floors"]:
-            capacity = floor_data["capacity"]
-            
-            # Generate realistic occupancy
-            occupied = generate_realistic_occupancy(capacity, library_base_rate)
-            
-            # Store in row with column name format: "Library Name Floor N"
-            col_name = f"{lib['name']} Floor {floor_data['floor']}"
-            row_data[col_name] = occupied
+        for index in floor_indices:
+            # Generate realistic occupancy, stored under the "Library Name Floor N" column
+            row_data[floors[index].column] = generate_realistic_occupancy(floors[index].capacity, library_base_rate)
     
     return row_data
 
@@ -101,40 +90,17 @@ def append_row_to_csv(csv_file: Path, row_data: dict, fieldnames: list):
     """
     Append a single row to the CSV file.
     Creates the file with headers if it doesn't exist.
-    Maintains a maximum of 500 rows (plus header).
+    Old rows are retired by segment rotation in occupancy_store, so the
+    existing history is never re-read or rewritten. The row is also written
+    to every enabled storage backend (settings.STORAGE_BACKENDS: binary log,
+    SQLite, rollups).
     
     Args:
         csv_file: Path to the CSV file
         row_data: Dictionary with row data
         fieldnames: List of column names
     """
-    MAX_ROWS = 500
-    rows = []
-    
-    # Read existing data
-    if csv_file.exists():
-        try:
-            with open(csv_file, 'r') as f:
-                reader = csv.DictReader(f)
-                rows = list(reader)
-        except Exception as e:
-            print(f"Error reading CSV for append: {e}")
-            # If error reading, we might overwrite corrupt file or start fresh
-            # Let's try to append anyway by starting fresh if read failed significantly
-            pass
-
-    # Append new row
-    rows.append(row_data)
-    
-    # Prune if needed
-    if len(rows) > MAX_ROWS:
-        rows = rows[-MAX_ROWS:]
-    
-    # Write back entire file (atomic-ish update)
-    with open(csv_file, 'w', newline='') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
+    occupancy_store.save_snapshot(csv_file, row_data, fieldnames)
 
 
 def real_time_generate(
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+try:
+    from . import occupancy_db
+except ImportError:
+    project_root = Path(__file__).parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+    from src import occupancy_db
+
+# Persistent inference result cache
+# Maps (image content hash, model/config fingerprint) -> raw person count in a
+# small SQLite database, so a restarted counter or a re-run over archived
+# frames never infers the same image twice. The fingerprint covers the model
+# weights and every inference parameter, so changing either invalidates old
+# entries. Size is bounded by evicting the least recently used entries.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS inference_cache (
+    key TEXT PRIMARY KEY,
+    people INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_inference_cache_last_used ON inference_cache (last_used);
+"""
+
+# Read size for hashing model weights
+_CHUNK_SIZE = 1 << 20
+
+
+def model_fingerprint(model_path, **params) -> str:
+    """
+    Fingerprint of the model weights plus inference parameters.
+
+    Args:
+        model_path: Path to the weights file (or exported model directory)
+        params: Anything else that changes the result (thresholds, image size, backend)
+    """
+    digest = hashlib.sha256()
+    model_path = Path(model_path)
+    files = sorted(p for p in model_path.rglob("*") if p.is_file()) if model_path.is_dir() else [model_path]
+    for path in files:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class ResultCache:
+    """
+    Size-bounded LRU cache of person counts keyed by image content hash.
+    """
+
+    def __init__(self, db_file, fingerprint: str, max_entries: int):
+        self.db_file = Path(db_file)
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        conn = occupancy_db.connect(self.db_file, SCHEMA)
+        self._size = conn.execute("SELECT COUNT(*) FROM inference_cache").fetchone()[0]
+
+    def _key(self, digest: str) -> str:
+        return f"{digest}:{self.fingerprint}"
+
+    def get_many(self, digests: list) -> dict:
+        """
+        Look up several content hashes at once and mark the hits as recently used.
+        Returns a dictionary digest -> people count for the hits only.
+        """
+        if not digests:
+            return {}
+        keys = {self._key(d): d for d in digests}
+        conn = occupancy_db.connect(self.db_file, SCHEMA)
+        placeholders = ",".join("?" * len(keys))
+        found = {
+            keys[key]: people
+            for key, people in conn.execute(
+                f"SELECT key, people FROM inference_cache WHERE key IN ({placeholders})", list(keys)
+            )
+        }
+        if found:
+            now = time.time()
+            with conn:
+                conn.executemany(
+                    "UPDATE inference_cache SET last_used = ? WHERE key = ?",
+                    [(now, self._key(d)) for d in found],
+                )
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(digests) - len(found)
+        return found
+
+    def put_many(self, results: dict):
+        """
+        Store digest -> people count pairs and evict the least recently used
+        entries if the cache grew beyond max_entries.
+        """
+        if not results:
+            return
+        conn = occupancy_db.connect(self.db_file, SCHEMA)
+        now = time.time()
+        with conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO inference_cache (key, people, last_used) VALUES (?, ?, ?)",
+                [(self._key(d), int(people), now) for d, people in results.items()],
+            )
+            added = conn.total_changes - before
+            with self._lock:
+                self._size += added
+                over = self._size > self.max_entries
+            if over:
+                # Other processes (inference shards) may share the file, so
+                # recount before evicting instead of trusting the local estimate
+                size = conn.execute("SELECT COUNT(*) FROM inference_cache").fetchone()[0]
+                excess = max(0, size - self.max_entries)
+                conn.execute(
+                    "DELETE FROM inference_cache WHERE key IN "
+                    "(SELECT key FROM inference_cache ORDER BY last_used LIMIT ?)",
+                    (excess,),
+                )
+                with self._lock:
+                    self._size = size - excess
+                    self.evictions += excess
+
+    def stats(self) -> dict:
+        """
+        Hit/miss/eviction counters since the cache was opened.
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": self._size,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,135 @@
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+try:
+    from .lib_configs import REGISTRY
+except ImportError:
+    project_root = Path(__file__).parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+    from src.lib_configs import REGISTRY
+
+# Adaptive per-floor sampling
+# Every floor gets its own polling interval between min_interval and
+# max_interval. The interval shrinks with the floor's urgency, a weighted sum of
+#   - volatility: recent rate of change of its count (moving average of
+#                 |delta| per minute as a share of capacity)
+#   - fullness:   how close the floor is to capacity (above half full)
+#   - time of day: whether it is within the libraries' busy hours
+# so inference time goes to floors whose numbers are moving, while a floor
+# sitting at a stable 20% overnight is only looked at every max_interval.
+
+# Urgency weights (they add up to 1: a floor maxing out all three is polled every min_interval)
+VOLATILITY_WEIGHT = 0.6
+FULLNESS_WEIGHT = 0.25
+BUSY_HOURS_WEIGHT = 0.15
+
+# Change per minute (share of capacity) that counts as fully volatile
+VOLATILE_RATE = 0.05
+# Smoothing factor of the change-rate moving average
+RATE_ALPHA = 0.3
+# Local hours [start, end) in which libraries are busy
+BUSY_HOURS = (9, 22)
+TIMEZONE = ZoneInfo("America/New_York")
+
+
+class SamplingScheduler:
+    """
+    Decides which floors are due for a count on each tick.
+    """
+
+    def __init__(self, min_interval: float, max_interval: float, registry=REGISTRY):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.registry = registry
+        n = len(registry.floors)
+        self._lock = threading.Lock()
+        # Every floor is due right away so the first row is complete
+        self._next_due = [0.0] * n
+        self._intervals = [float(min_interval)] * n
+        self._sampled_at = [0.0] * n
+        self._last = [None] * n  # (sample time, count)
+        self._rates = [0.0] * n
+        self.samples = 0
+        self.skipped = 0
+
+    def due(self, now: float = None) -> list:
+        """
+        Registry floor indices whose interval has elapsed, most overdue first.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            floors = [i for _, i in sorted((d, i) for i, d in enumerate(self._next_due) if d <= now)]
+            self.samples += len(floors)
+            self.skipped += len(self._next_due) - len(floors)
+            for index in floors:
+                self._sampled_at[index] = now
+                # Until a count comes back, retry after the current interval
+                self._next_due[index] = now + self._intervals[index]
+        return floors
+
+    def defer(self, floors: list):
+        """
+        Hand floors returned by due() back unsampled (e.g. shed under load),
+        so they are due again on the next tick.
+        """
+        with self._lock:
+            for index in floors:
+                self._next_due[index] = self._sampled_at[index]
+            self.samples -= len(floors)
+            self.skipped += len(floors)
+
+    def _urgency(self, index: int, count: int, hour: int) -> float:
+        capacity = self.registry.capacities[index] or 1
+        volatility = min(1.0, self._rates[index] / VOLATILE_RATE)
+        fullness = max(0.0, min(1.0, (count / capacity - 0.5) / 0.5))
+        busy = 1.0 if BUSY_HOURS[0] <= hour < BUSY_HOURS[1] else 0.0
+        return VOLATILITY_WEIGHT * volatility + FULLNESS_WEIGHT * fullness + BUSY_HOURS_WEIGHT * busy
+
+    def observe(self, counts: dict):
+        """
+        Feed fresh counts ("Library Floor N" -> count) back and reschedule those
+        floors, relative to when they were handed out by due().
+        """
+        hour = datetime.now(TIMEZONE).hour
+        column_index = self.registry.column_index
+        with self._lock:
+            for column, count in counts.items():
+                index = column_index[column]
+                now = self._sampled_at[index]
+                last = self._last[index]
+                if last is not None and now > last[0]:
+                    capacity = self.registry.capacities[index] or 1
+                    rate = abs(count - last[1]) / capacity / ((now - last[0]) / 60)
+                    self._rates[index] += RATE_ALPHA * (rate - self._rates[index])
+                self._last[index] = (now, count)
+                urgency = self._urgency(index, count, hour)
+                interval = self.max_interval - (self.max_interval - self.min_interval) * urgency
+                self._intervals[index] = interval
+                self._next_due[index] = now + interval
+
+    def intervals(self) -> dict:
+        """
+        Current polling interval (seconds) per "Library Floor N".
+        """
+        with self._lock:
+            return {record.column: self._intervals[record.index] for record in self.registry.floors}
+
+    def stats(self) -> dict:
+        """
+        Floors sampled vs. skipped since start and the current interval spread.
+        """
+        with self._lock:
+            total = self.samples + self.skipped
+            return {
+                "samples": self.samples,
+                "skipped": self.skipped,
+                "sampled_share": self.samples / total if total else 0.0,
+                "min_interval": min(self._intervals),
+                "mean_interval": sum(self._intervals) / len(self._intervals),
+                "max_interval": max(self._intervals),
+            }
@@ -0,0 +1,105 @@
+# Runtime settings
+# Read from environment variables so a deployment can be tuned without code
+# changes. The defaults reproduce the demo setup.
+
+import os
+
+
+def _env_list(name: str, default: list) -> list:
+    value = os.environ.get(name)
+    if value is None:
+        return list(default)
+    return [item.strip().lower() for item in value.split(",") if item.strip()]
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Seconds between occupancy snapshots; the dashboard refreshes at the same rate
+TICK_INTERVAL = _env_float("FUTURELIBS_TICK_INTERVAL", 5)
+
+# Storage backends written in addition to the CSV store:
+#   "binlog" - fixed-width binary log (occupancy_log)
+#   "sqlite" - SQLite time-series database (occupancy_db)
+#   "rollups" - 1-minute/15-minute/hourly aggregates (occupancy_rollups)
+STORAGE_BACKENDS = _env_list("FUTURELIBS_STORAGE", ["binlog", "rollups"])
+
+# Inference worker processes, each owning a shard of the libraries (0 = run in-thread)
+COUNTER_WORKERS = _env_int("FUTURELIBS_COUNTER_WORKERS", 0)
+
+# Skip inference on frames that have not changed since the camera's last inference
+FRAME_GATE = _env_bool("FUTURELIBS_FRAME_GATE", True)
+# Default per-camera difference threshold (fraction of the 0-255 range); a floor
+# can override it with a "gate_threshold" entry in lib_configs.LIBRARIES
+GATE_THRESHOLD = _env_float("FUTURELIBS_GATE_THRESHOLD", 0.02)
+
+# Memory budget (MiB) for decoded, letterboxed frames kept between ticks (0 = off)
+FRAME_CACHE_MB = _env_int("FUTURELIBS_FRAME_CACHE_MB", 256)
+
+# Micro-batching: at most BATCH_MAX_SIZE frames per model call (0 = one batch per
+# tick); a partial batch is run once its oldest frame waited BATCH_MAX_WAIT_MS
+BATCH_MAX_SIZE = _env_int("FUTURELIBS_BATCH_MAX_SIZE", 16)
+BATCH_MAX_WAIT_MS = _env_float("FUTURELIBS_BATCH_MAX_WAIT_MS", 20)
+
+# Adaptive per-floor sampling: floors are counted between every tick and every
+# SAMPLING_MAX_INTERVAL seconds depending on how much their counts move (see sampling)
+SAMPLING_ADAPTIVE = _env_bool("FUTURELIBS_ADAPTIVE_SAMPLING", True)
+SAMPLING_MAX_INTERVAL = _env_float("FUTURELIBS_SAMPLING_MAX_INTERVAL", 60)
+
+# Defer low-priority floors (reusing their last count) while ticks overrun the interval
+LOAD_SHEDDING = _env_bool("FUTURELIBS_LOAD_SHEDDING", True)
+
+# Persistent inference result cache keyed by image content hash
+RESULT_CACHE = _env_bool("FUTURELIBS_RESULT_CACHE", True)
+RESULT_CACHE_ENTRIES = _env_int("FUTURELIBS_RESULT_CACHE_ENTRIES", 100000)
+
+# Inference backend: "torch", "onnx" or "openvino" (see inference_backends).
+# torch stays the default: the other backends have not been measured yet
+COUNTER_BACKEND = os.environ.get("FUTURELIBS_BACKEND", "torch").strip().lower()
+# Use an int8-quantized export of the selected backend
+COUNTER_INT8 = _env_bool("FUTURELIBS_INT8", False)
+
+# Where the counter gets frames: "demo" cycles frame1..frame9.png, "spool"
+# counts the newest unprocessed frame of every floor (see frame_sources)
+FRAME_SOURCE = os.environ.get("FUTURELIBS_FRAME_SOURCE", "demo").strip().lower()
+
+# Metrics: Prometheus text on a local HTTP port (0 = off) and a JSON file
+# rewritten every METRICS_JSON_INTERVAL seconds (empty = off), relative to the project root
+METRICS_PORT = _env_int("FUTURELIBS_METRICS_PORT", 9464)
+METRICS_JSON = os.environ.get("FUTURELIBS_METRICS_JSON", "data/metrics/people_counter.json").strip()
+METRICS_JSON_INTERVAL = _env_float("FUTURELIBS_METRICS_JSON_INTERVAL", 10)
+
+# Profile the first N cycles of the people counter (0 = only on SIGUSR1 or the
+# data/profiles/PROFILE control file, see profiling)
+PROFILE_CYCLES = _env_int("FUTURELIBS_PROFILE", 0)
+
+# How the dashboard runs the people counter: "daemon" spawns one standalone
+# counter process per host (file-lock leader election, see counter_daemon) that
+# publishes snapshots through shared memory; "thread" runs it inside the app
+# process; "off" starts none (the counter is run separately, or for benchmarks)
+COUNTER_MODE = os.environ.get("FUTURELIBS_COUNTER_MODE", "daemon").strip().lower()
+# Shared-memory segment of the latest snapshot (empty = derived from the project path)
+SNAPSHOT_SHM = os.environ.get("FUTURELIBS_SNAPSHOT_SHM", "").strip()
+
+# Occupancy JSON API (python -m src.occupancy_api) for signage and the mobile app;
+# bind to 0.0.0.0 to serve other hosts
+API_HOST = os.environ.get("FUTURELIBS_API_HOST", "127.0.0.1").strip()
+API_PORT = _env_int("FUTURELIBS_API_PORT", 8080)
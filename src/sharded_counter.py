@@ -0,0 +1,263 @@
+import multiprocessing
+import queue
+import sys
+import time
+from pathlib import Path
+
+try:
+    from .lib_configs import REGISTRY
+except ImportError:
+    project_root = Path(__file__).parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+    from src.lib_configs import REGISTRY
+
+# Process-pool sharded inference
+# Each worker process loads its own YOLO model once and owns a fixed shard of
+# libraries (as registry floor indices), so per-camera state stays in one
+# process and inference runs outside the Streamlit process (and its GIL).
+# The coordinator broadcasts a frame index to every shard and merges the
+# per-shard counts into one snapshot. Workers are started with "spawn"
+# because torch is not fork-safe. Messages are (tick_id, shard_index, counts,
+# error, stats); a worker also sends the counts of each completed inference
+# chunk as a partial message (stats None) before its final answer.
+
+# Seconds the coordinator waits for all shards before giving up on a tick
+SHARD_TIMEOUT = 60
+# Seconds to wait for the workers to load and warm up their models
+STARTUP_TIMEOUT = 300
+# tick_id of the message a worker sends once its model is warmed up (ticks start at 1)
+READY_TICK = 0
+
+
+def shard_libraries(n_shards: int) -> list:
+    """
+    Split libraries into at most n_shards groups with balanced floor counts
+    (largest library first onto the least loaded shard). A library is never
+    split across shards.
+
+    Returns:
+        List of shards, each a sorted tuple of registry floor indices
+    """
+    library_floors = REGISTRY.library_floors
+    n_shards = max(1, min(n_shards, len(library_floors)))
+    shards = [[] for _ in range(n_shards)]
+    for floors in sorted(library_floors, key=len, reverse=True):
+        target = min(range(n_shards), key=lambda i: len(shards[i]))
+        shards[target].extend(floors)
+    return [tuple(sorted(shard)) for shard in shards]
+
+
+def _worker_main(shard_index: int, floors: tuple, model_path: str, inbox, outbox):
+    """
+    Worker process loop: load and warm up the model once, then count people for this
+    shard for every (tick_id, frame_index, floors) job until a None job arrives.
+    `floors` optionally limits a job to some of the shard's floors. Counts are
+    also sent as partial messages while the job runs.
+    """
+    project_root = Path(__file__).parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+    from src import people_counter
+
+    try:
+        model, artifact_path = people_counter.load_model(model_path)
+        people_counter.warm_up(model, min(people_counter.BATCH_MAX_SIZE or len(floors), len(floors)))
+    except Exception as e:
+        outbox.put((None, shard_index, {}, f"Failed to load YOLO model: {e}", {}))
+        return
+    outbox.put((READY_TICK, shard_index, {}, None, {}))
+    gate = people_counter.make_frame_gate()
+    cache = people_counter.make_result_cache(artifact_path)
+    frame_cache = people_counter.make_frame_cache()
+    batcher = people_counter.make_batcher(model)
+
+    while True:
+        job = inbox.get()
+        if job is None:
+            return
+        tick_id, frame_index, wanted = job
+        job_floors = floors if wanted is None else tuple(f for f in floors if f in wanted)
+        def send_partial(counts):
+            outbox.put((tick_id, shard_index, counts, None, None))
+
+        try:
+            counts = people_counter.count_people_in_images(
+                model, frame_index, job_floors, gate, cache, frame_cache, batcher, on_counts=send_partial
+            )
+            error = None
+        except Exception as e:
+            counts, error = {}, str(e)
+        stats = {}
+        if gate is not None:
+            stats["gate"] = gate.stats()
+        if cache is not None:
+            stats["cache"] = cache.stats()
+        if frame_cache is not None:
+            stats["frames"] = frame_cache.stats()
+        if batcher is not None:
+            stats["batches"] = batcher.stats()
+        outbox.put((tick_id, shard_index, counts, error, stats))
+
+
+class ShardedCounter:
+    """
+    Coordinator for a pool of per-shard inference processes.
+    """
+
+    def __init__(self, model_path, n_workers: int):
+        ctx = multiprocessing.get_context("spawn")
+        self.shards = shard_libraries(n_workers)
+        self.results = ctx.Queue()
+        self.inboxes = []
+        self.workers = []
+        self.tick_id = 0
+        self.shard_stats = {}
+        for shard_index, floors in enumerate(self.shards):
+            inbox = ctx.Queue()
+            worker = ctx.Process(
+                target=_worker_main,
+                args=(shard_index, floors, str(model_path), inbox, self.results),
+                name=f"people-counter-shard-{shard_index}",
+                daemon=True,
+            )
+            worker.start()
+            self.inboxes.append(inbox)
+            self.workers.append(worker)
+        print(f"🚀 Started {len(self.workers)} inference workers: "
+              + ", ".join(f"{len(s)} floors" for s in self.shards))
+
+    def wait_ready(self, timeout: float = STARTUP_TIMEOUT) -> int:
+        """
+        Wait until every worker has warmed up its model or failed.
+        Returns the number of workers ready to count.
+        """
+        waiting = set(range(len(self.workers)))
+        ready = 0
+        deadline = time.time() + timeout
+        while waiting:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                print(f"Inference shards {sorted(waiting)} did not start within {timeout:.0f}s")
+                break
+            try:
+                result_tick, shard_index, _, error, _ = self.results.get(timeout=min(remaining, 1))
+            except queue.Empty:
+                # A worker that died without a message (e.g. out of memory) is not waited for
+                waiting = {i for i in waiting if self.workers[i].is_alive()}
+                continue
+            if error:
+                print(f"Error in inference shard {shard_index}: {error}")
+            elif result_tick == READY_TICK:
+                ready += 1
+            waiting.discard(shard_index)
+        return ready
+
+    def count(self, frame_index: int, floors=None, timeout: float = SHARD_TIMEOUT, on_counts=None) -> dict:
+        """
+        Count people for frame_index on every shard and merge the results.
+        `floors` optionally restricts the tick to some registry floor indices;
+        shards owning none of them are not asked. `on_counts` optionally
+        receives partial counts as the shards' inference chunks complete.
+        Shards that fail or miss the deadline are left out of the returned
+        dictionary (the row builder fills in the default for them).
+        """
+        self.tick_id += 1
+        tick_id = self.tick_id
+        wanted = frozenset(floors) if floors is not None else None
+        pending = set()
+        for shard_index, (inbox, worker) in enumerate(zip(self.inboxes, self.workers)):
+            if wanted is not None and wanted.isdisjoint(self.shards[shard_index]):
+                continue
+            # A worker that died (e.g. failed to load the model) is not waited for
+            if worker.is_alive():
+                inbox.put((tick_id, frame_index, wanted))
+                pending.add(shard_index)
+
+        counts = {}
+        deadline = time.time() + timeout
+        while pending:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                print(f"Inference shards {sorted(pending)} missed the deadline for frame{frame_index}")
+                break
+            try:
+                result_tick, shard_index, shard_counts, error, shard_stats = self.results.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            if shard_stats is None:
+                # Partial counts of a tick still running on that shard
+                if result_tick == tick_id and on_counts is not None:
+                    on_counts(shard_counts)
+                continue
+            if shard_stats:
+                self.shard_stats[shard_index] = shard_stats
+            if error:
+                print(f"Error in inference shard {shard_index}: {error}")
+            if result_tick is None:
+                # Worker could not start; stop waiting for it
+                pending.discard(shard_index)
+                continue
+            if result_tick != tick_id:
+                # Late answer for a tick we already gave up on
+                continue
+            counts.update(shard_counts)
+            pending.discard(shard_index)
+        return counts
+
+    def _sum_stats(self, name: str, counters: tuple, hits: tuple):
+        per_shard = [stats[name] for stats in self.shard_stats.values() if name in stats]
+        if not per_shard:
+            return None
+        totals = {counter: sum(stats[counter] for stats in per_shard) for counter in counters}
+        total = sum(totals[counter] for counter in counters if counter in hits or counter == "misses")
+        totals["hit_rate"] = sum(totals[counter] for counter in hits) / total if total else 0.0
+        return totals
+
+    def gate_stats(self):
+        """
+        Change-detection gate counters summed over all shards, or None if
+        the workers run without a gate.
+        """
+        return self._sum_stats("gate", ("exact_hits", "similar_hits", "misses"), ("exact_hits", "similar_hits"))
+
+    def cache_stats(self):
+        """
+        Result cache counters summed over all shards, or None if the workers
+        run without a result cache.
+        """
+        return self._sum_stats("cache", ("hits", "misses", "evictions", "entries"), ("hits",))
+
+    def frame_cache_stats(self):
+        """
+        Decoded frame cache counters summed over all shards, or None if the
+        workers run without a frame cache.
+        """
+        return self._sum_stats("frames", ("hits", "misses", "evictions", "entries", "bytes"), ("hits",))
+
+    def batch_stats(self):
+        """
+        Micro-batching stats over all shards (counts summed, wait times worst
+        shard), or None if the workers run without a batcher.
+        """
+        per_shard = [stats["batches"] for stats in self.shard_stats.values() if "batches" in stats]
+        if not per_shard:
+            return None
+        batches = sum(stats["batches"] for stats in per_shard)
+        items = sum(stats["items"] for stats in per_shard)
+        return {
+            "batches": batches,
+            "items": items,
+            "mean_batch_size": items / batches if batches else 0.0,
+            "wait_ms_p95": max(stats["wait_ms_p95"] for stats in per_shard),
+            "wait_ms_max": max(stats["wait_ms_max"] for stats in per_shard),
+        }
+
+    def close(self):
+        """
+        Ask every worker to exit and wait for them.
+        """
+        for inbox in self.inboxes:
+            inbox.put(None)
+        for worker in self.workers:
+            worker.join(timeout=5)
@@ -0,0 +1,167 @@
+import sys
+import threading
+from pathlib import Path
+from types import MappingProxyType
+from typing import NamedTuple
+
+try:
+    from .lib_configs import LIBRARIES, REGISTRY
+    from .availability import get_latest_occupancy
+except ImportError:
+    project_root = Path(__file__).parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+    from src.lib_configs import LIBRARIES, REGISTRY
+    from src.availability import get_latest_occupancy
+
+# Process-wide occupancy snapshots for the dashboard
+# Every Streamlit session of a process reads the same immutable snapshot for
+# the current data version: per-floor rates and levels, per-library totals
+# and the libraries ranked by available seats are computed once per new row
+# (one tick), not per session and rerun. Sessions keep no copy of the data -
+# only which library they have selected.
+
+# Occupancy rate thresholds for the status levels (rate < threshold)
+LEVELS = (
+    (0.4, "Low", "#22c55e", "green"),
+    (0.7, "Medium", "#fbbf24", "orange"),
+    (float("inf"), "High", "#ef4444", "red"),
+)
+
+
+def level_and_color(rate: float):
+    """
+    Status level, hex color and Streamlit color name for an occupancy rate.
+    """
+    for threshold, level, color, status_color in LEVELS:
+        if rate < threshold:
+            return level, color, status_color
+    return LEVELS[-1][1:]
+
+
+class FloorStatus(NamedTuple):
+    floor: int
+    capacity: int
+    occupied: int
+    available: int
+    rate: float
+    level: str
+    color: str
+    status_color: str
+    stale: bool = False   # earlier count reused because the counter shed this floor
+
+
+class LibraryStatus(NamedTuple):
+    name: str
+    address: str
+    floors: tuple         # FloorStatus per floor, in configuration order
+    capacity: int
+    occupied: int
+    available: int
+    rate: float
+    level: str
+    color: str
+    status_color: str
+
+
+def _rate(occupied: int, capacity: int) -> float:
+    return occupied / capacity if capacity else 0
+
+
+class OccupancySnapshot:
+    """
+    Immutable, precomputed view of one occupancy row, shared by all sessions.
+    """
+
+    __slots__ = ("version", "timestamp", "libraries", "by_name", "recommendation")
+
+    def __init__(self, version: int, row: dict, libraries: list = LIBRARIES, registry=REGISTRY):
+        """
+        Args:
+            version: Data version (increases with every new row)
+            row: Occupancy row (column name -> count), or None for the configured static data
+            libraries: The LIBRARIES configuration (capacities, static fallback counts)
+            registry: Compiled registry for `libraries`
+        """
+        row = row or {}
+        stale = set(row.get("stale", ()))
+        statuses = []
+        for lib, floor_indices in zip(libraries, registry.library_floors):
+            floors = []
+            for floor_data, index in zip(lib["floors"], floor_indices):
+                # Fall back to the configured count when the row has no value
+                try:
+                    occupied = int(row[registry.columns[index]])
+                except (KeyError, ValueError, TypeError):
+                    occupied = floor_data.get("occupied", 0)
+                capacity = registry.capacities[index]
+                rate = _rate(occupied, capacity)
+                floors.append(FloorStatus(
+                    floor_data["floor"], capacity, occupied, capacity - occupied, rate, *level_and_color(rate),
+                    registry.columns[index] in stale,
+                ))
+            capacity = sum(f.capacity for f in floors)
+            occupied = sum(f.occupied for f in floors)
+            rate = _rate(occupied, capacity)
+            statuses.append(LibraryStatus(
+                lib["name"], lib.get("address") or "", tuple(floors), capacity, occupied, capacity - occupied, rate,
+                *level_and_color(rate),
+            ))
+
+        set_ = object.__setattr__
+        set_(self, "version", version)
+        set_(self, "timestamp", row.get("timestamp"))
+        set_(self, "libraries", tuple(statuses))
+        set_(self, "by_name", MappingProxyType({lib.name: lib for lib in statuses}))
+        # Most available seats first; ties keep the configuration order
+        set_(self, "recommendation", tuple(lib.name for lib in sorted(statuses, key=lambda lib: -lib.available)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("OccupancySnapshot is immutable")
+
+    @property
+    def best(self) -> LibraryStatus:
+        """
+        The recommended library (most available seats).
+        """
+        return self.by_name[self.recommendation[0]]
+
+
+class SnapshotService:
+    """
+    Builds a new OccupancySnapshot only when the latest row changes.
+    """
+
+    def __init__(self, read_latest=get_latest_occupancy, libraries: list = LIBRARIES, registry=REGISTRY):
+        self._read_latest = read_latest
+        self._libraries = libraries
+        self._registry = registry
+        self._lock = threading.Lock()
+        self._row = None
+        self._key = None
+        self._snapshot = OccupancySnapshot(0, None, libraries, registry)
+
+    def get(self) -> OccupancySnapshot:
+        """
+        Current snapshot. Unchanged data returns the same object; the shared-memory
+        reader hands out the same row object until the counter publishes again,
+        so that case costs one identity check.
+        """
+        row = self._read_latest()
+        if row is self._row:
+            return self._snapshot
+        key = tuple(row.items()) if row else None
+        with self._lock:
+            if key != self._key:
+                self._snapshot = OccupancySnapshot(self._snapshot.version + 1, row, self._libraries, self._registry)
+                self._key = key
+            self._row = row
+            return self._snapshot
+
+
+# Shared by every session of this process
+SNAPSHOTS = SnapshotService()
+
+
+def get_snapshot() -> OccupancySnapshot:
+    return SNAPSHOTS.get()
@@ -0,0 +1,136 @@
+import threading
+import time
+
+# Drift-free tick scheduling with load shedding
+# Ticks are placed on a fixed grid (start + k * interval) of monotonic
+# deadlines instead of sleeping "interval - elapsed", so a slow cycle does not
+# push every later tick back. If the loop wakes up a whole interval or more
+# behind, the ticks it slept through are counted as missed and skipped rather
+# than run back to back.
+#
+# A cycle overruns when its row is persisted more than one interval after its
+# deadline. While the last cycle overran, the scheduler sheds load: each tick
+# only keeps as many floors as the measured inference speed can count within
+# BUDGET_FRACTION of an interval, highest priority first. The other floors are
+# deferred to the next tick (ahead of everything else) and their last count is
+# reused in the meantime, reported as stale.
+
+# Share of the tick interval that inference may use while shedding
+BUDGET_FRACTION = 0.8
+# Smoothing factor of the seconds-per-floor estimate
+SPEED_ALPHA = 0.3
+
+
+class TickScheduler:
+    """
+    Absolute-deadline ticker that tracks missed ticks and overruns and picks
+    which floors to shed when the counter falls behind.
+    """
+
+    def __init__(self, interval: float, shedding: bool = True, budget_fraction: float = BUDGET_FRACTION):
+        self.interval = interval
+        self.shedding = shedding
+        self.budget_fraction = budget_fraction
+        self._lock = threading.Lock()
+        self._next = None
+        self._seconds_per_floor = None
+        self._overloaded = False
+        self._deferred = []
+        self.ticks = 0
+        self.missed_ticks = 0
+        self.overruns = 0
+        self.shed_ticks = 0
+        self.shed_floors = 0
+        self.stale_floors = 0
+        self.last_latency = 0.0
+
+    def wait(self) -> float:
+        """
+        Sleep until the next deadline and return it (time.monotonic() clock).
+        Deadlines that already passed by a whole interval are counted as missed.
+        """
+        now = time.monotonic()
+        if self._next is None:
+            self._next = now
+        elif now < self._next:
+            time.sleep(self._next - now)
+        else:
+            missed = int((now - self._next) // self.interval)
+            if missed:
+                with self._lock:
+                    self.missed_ticks += missed
+                self._next += missed * self.interval
+        deadline = self._next
+        self._next += self.interval
+        with self._lock:
+            self.ticks += 1
+        return deadline
+
+    def select(self, floors: list) -> tuple:
+        """
+        Split the floors due on this tick (highest priority first) into the ones
+        to count now and the ones deferred by load shedding.
+
+        Returns:
+            (kept, deferred) lists of registry floor indices
+        """
+        with self._lock:
+            # Floors deferred last time go first, so no floor starves
+            due = set(floors)
+            ordered = [f for f in self._deferred if f in due]
+            first = set(ordered)
+            ordered += [f for f in floors if f not in first]
+            if not (self.shedding and self._overloaded and self._seconds_per_floor):
+                self._deferred = []
+                return ordered, []
+            budget = max(1, int(self.interval * self.budget_fraction / self._seconds_per_floor))
+            kept, deferred = ordered[:budget], ordered[budget:]
+            self._deferred = deferred
+            if deferred:
+                self.shed_ticks += 1
+                self.shed_floors += len(deferred)
+            return kept, deferred
+
+    def record_inference(self, n_floors: int, seconds: float):
+        """
+        Update the inference speed estimate from one tick's decode-to-counts time.
+        """
+        if n_floors <= 0:
+            return
+        per_floor = seconds / n_floors
+        with self._lock:
+            if self._seconds_per_floor is None:
+                self._seconds_per_floor = per_floor
+            else:
+                self._seconds_per_floor += SPEED_ALPHA * (per_floor - self._seconds_per_floor)
+
+    def record_cycle(self, deadline: float, stale_floors: int = 0):
+        """
+        Record that the row for the tick with this deadline was persisted.
+        `stale_floors` is the number of floors shed on that tick, whose earlier
+        count the row reused (not floors that were simply not due or had no frame).
+        """
+        latency = time.monotonic() - deadline
+        with self._lock:
+            self.last_latency = latency
+            self._overloaded = latency > self.interval
+            if self._overloaded:
+                self.overruns += 1
+            self.stale_floors = stale_floors
+
+    def stats(self) -> dict:
+        """
+        Tick, missed-tick, overrun and shedding counters since start.
+        """
+        with self._lock:
+            return {
+                "ticks": self.ticks,
+                "missed_ticks": self.missed_ticks,
+                "overruns": self.overruns,
+                "overloaded": self._overloaded,
+                "shed_ticks": self.shed_ticks,
+                "shed_floors": self.shed_floors,
+                "stale_floors": self.stale_floors,
+                "last_latency": self.last_latency,
+                "seconds_per_floor": self._seconds_per_floor or 0.0,
+            }